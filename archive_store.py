@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from shared_state import file_lock, load_json, read_json, save_json
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SECTIONS = ["important_announcements", "upcoming_deadlines_events", "milestones"]
+
+class ArchiveStore:
+    """
+    Archived announcements split into time-partitioned shard files.
+
+    Each shard holds the archives of one month (or one academic year) in the same
+    shape the old archived_data.json used. A small manifest maps every archive_id to
+    its shard, so looking up or appending archives only touches the shards involved.
+    The manifest also gives each dated shard's first and last day, which the archive
+    page uses to list shards newest first.
+    """
+
+    def __init__(self, archive_dir: str = "static/data/archives",
+                 legacy_file: str = "static/data/archived_data.json",
+                 shard_by: str = None):
+        self.archive_dir = archive_dir
+        self.legacy_file = legacy_file
+        self.manifest_file = os.path.join(archive_dir, "manifest.json")
+
+        # "month" (default) or "academic_year"
+        self.shard_by = shard_by or os.environ.get("ARCHIVE_SHARD_BY", "month")
+
+        # The folder and the manifest are created on first use, not at import
+        self._initialized = False
+
+    def initialize(self):
+        """Create the archive folder and migrate archived_data.json now instead of on first use"""
+        if self._initialized:
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with file_lock(self.manifest_file):
+            # Another worker may have finished the migration while we waited
+            if not os.path.exists(self.manifest_file):
+                self._migrate_legacy_file()
+            else:
+                self._add_missing_date_ranges()
+        self._initialized = True
+
+    # Storage helpers: reads come from the shared per-process cache, writes are atomic
+    def _read_json(self, file_path: str, cached: bool = True) -> Dict:
+        return load_json(file_path) if cached else read_json(file_path)
+
+    def _write_json(self, file_path: str, data: Dict):
+        save_json(file_path, data, indent=2)
+
+    def _empty_manifest(self) -> Dict:
+        return {"version": 1, "shard_by": self.shard_by, "next_archive_id": 1, "total": 0, "shards": {}, "index": {}}
+
+    def _empty_shard(self) -> Dict:
+        return {section: [] for section in ARCHIVE_SECTIONS}
+
+    def _shard_path(self, shard_key: str) -> str:
+        return os.path.join(self.archive_dir, f"{shard_key}.json")
+
+    def shard_key(self, announcement: Dict) -> str:
+        """Work out which shard an archived announcement belongs to"""
+        try:
+            sorting_date = datetime.strptime(announcement["sorting_date"], "%m/%d/%Y")
+        except (KeyError, ValueError):
+            return "undated"
+
+        if self.shard_by == "academic_year":
+            # Academic years start in August
+            start_year = sorting_date.year if sorting_date.month >= 8 else sorting_date.year - 1
+            return f"AY{start_year}-{start_year + 1}"
+        return sorting_date.strftime("%Y-%m")
+
+    def shard_date_range(self, shard_key: str) -> Optional[Tuple[str, str]]:
+        """The first and last day (ISO dates) a shard covers; None for the undated shard"""
+        try:
+            if shard_key.startswith("AY"):
+                start_year, end_year = (int(year) for year in shard_key[2:].split("-"))
+                return date(start_year, 8, 1).isoformat(), date(end_year, 7, 31).isoformat()
+            first = datetime.strptime(shard_key, "%Y-%m").date()
+        except ValueError:
+            return None
+        last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        return first.isoformat(), last.isoformat()
+
+    def _shard_info(self, shard_key: str, count: int = 0) -> Dict:
+        info = {"file": f"{shard_key}.json", "count": count}
+        date_range = self.shard_date_range(shard_key)
+        if date_range:
+            info["start"], info["end"] = date_range
+        return info
+
+    def _add_missing_date_ranges(self):
+        """Manifests written before shards had date ranges get them once (call with the lock held)"""
+        manifest = self._read_json(self.manifest_file, cached=False)
+        missing = [shard_key for shard_key, info in manifest["shards"].items()
+                   if "start" not in info and self.shard_date_range(shard_key)]
+        if not missing:
+            return
+        for shard_key in missing:
+            info = manifest["shards"][shard_key]
+            info["start"], info["end"] = self.shard_date_range(shard_key)
+        self._write_json(self.manifest_file, manifest)
+
+    # Reading
+    def load_manifest(self, cached: bool = True) -> Dict:
+        """Load the shard manifest (the cached copy is shared, so treat it as read-only)"""
+        self.initialize()
+        if not os.path.exists(self.manifest_file):
+            return self._empty_manifest()
+        return self._read_json(self.manifest_file, cached)
+
+    def load_shard(self, shard_key: str, cached: bool = True) -> Dict:
+        """Load a single shard by key (the cached copy is shared, so treat it as read-only)"""
+        self.initialize()
+        file_path = self._shard_path(shard_key)
+        if not os.path.exists(file_path):
+            return self._empty_shard()
+        return self._read_json(file_path, cached)
+
+    def get(self, archive_id: int) -> Optional[Dict]:
+        """Find an archived announcement, reading only the shard that holds it"""
+        shard_key = self.load_manifest()["index"].get(str(archive_id))
+        if shard_key is None:
+            return None
+
+        for section in self.load_shard(shard_key).values():
+            for announcement in section:
+                if announcement.get("archive_id") == archive_id:
+                    return announcement
+        return None
+
+    def next_archive_id(self) -> int:
+        return self.load_manifest()["next_archive_id"]
+
+    # Writing
+    def add(self, announcements: List[Dict], section: str = "important_announcements"):
+        """
+        Append already-numbered archives (each needs an archive_id).
+
+        Shards are written first and the manifest last, so the index never points at
+        a record that is not on disk; if a write fails the touched shards are restored.
+        """
+        if not announcements:
+            return
+
+        self.initialize()
+        with file_lock(self.manifest_file):
+            self._add_locked(announcements, section)
+
+    def _add_locked(self, announcements: List[Dict], section: str):
+        manifest = self.load_manifest(cached=False)
+        by_shard = {}
+        for announcement in announcements:
+            by_shard.setdefault(self.shard_key(announcement), []).append(announcement)
+
+        previous_shards = {}
+        try:
+            for shard_key, shard_announcements in by_shard.items():
+                shard = self.load_shard(shard_key, cached=False)
+                previous_shards[shard_key] = json.loads(json.dumps(shard))
+                shard.setdefault(section, []).extend(shard_announcements)
+                self._write_json(self._shard_path(shard_key), shard)
+
+                shard_info = manifest["shards"].setdefault(shard_key, self._shard_info(shard_key))
+                shard_info["count"] += len(shard_announcements)
+                for announcement in shard_announcements:
+                    manifest["index"][str(announcement["archive_id"])] = shard_key
+
+            manifest["total"] = sum(info["count"] for info in manifest["shards"].values())
+            highest_id = max(announcement["archive_id"] for announcement in announcements)
+            manifest["next_archive_id"] = max(manifest["next_archive_id"], highest_id + 1)
+            self._write_json(self.manifest_file, manifest)
+        except Exception:
+            for shard_key, shard in previous_shards.items():
+                try:
+                    self._write_json(self._shard_path(shard_key), shard)
+                except Exception as e:
+                    logger.error("Error restoring archive shard %s: %s", shard_key, e)
+            raise
+
+    def remove(self, archive_ids: List[int]):
+        """Take archives back out (undoes add() when the rest of a batch fails)"""
+        if not archive_ids:
+            return
+
+        self.initialize()
+        with file_lock(self.manifest_file):
+            manifest = self.load_manifest(cached=False)
+            by_shard = {}
+            for archive_id in archive_ids:
+                shard_key = manifest["index"].pop(str(archive_id), None)
+                if shard_key is not None:
+                    by_shard.setdefault(shard_key, set()).add(archive_id)
+
+            for shard_key, ids in by_shard.items():
+                shard = self.load_shard(shard_key, cached=False)
+                removed = 0
+                for section, announcements in shard.items():
+                    kept = [announcement for announcement in announcements if announcement.get("archive_id") not in ids]
+                    removed += len(announcements) - len(kept)
+                    shard[section] = kept
+                self._write_json(self._shard_path(shard_key), shard)
+                manifest["shards"][shard_key]["count"] -= removed
+
+            manifest["total"] = sum(info["count"] for info in manifest["shards"].values())
+            self._write_json(self.manifest_file, manifest)
+
+    def _migrate_legacy_file(self):
+        """Split the old single-file archived_data.json into shards"""
+        manifest = self._empty_manifest()
+        if not os.path.exists(self.legacy_file):
+            self._write_json(self.manifest_file, manifest)
+            return
+
+        logger.info("🔄 Migrating archived_data.json to sharded archive storage...")
+        legacy_data = self._read_json(self.legacy_file, cached=False)
+        shards = {}
+        for section, announcements in legacy_data.items():
+            for announcement in announcements:
+                shard_key = self.shard_key(announcement)
+                shard = shards.setdefault(shard_key, self._empty_shard())
+                shard.setdefault(section, []).append(announcement)
+                manifest["index"][str(announcement["archive_id"])] = shard_key
+                manifest["next_archive_id"] = max(manifest["next_archive_id"], announcement["archive_id"] + 1)
+
+        for shard_key, shard in shards.items():
+            self._write_json(self._shard_path(shard_key), shard)
+            count = sum(len(items) for items in shard.values())
+            manifest["shards"][shard_key] = self._shard_info(shard_key, count)
+        manifest["total"] = sum(info["count"] for info in manifest["shards"].values())
+        self._write_json(self.manifest_file, manifest)
+
+        backup_file = f"{self.legacy_file}.backup"
+        os.replace(self.legacy_file, backup_file)
+        logger.info("✅ Archives migrated into %d shard(s). Old file kept at: %s", len(shards), backup_file)
+
+# Global instance for easy access
+archive_store = ArchiveStore()
@@ -1,71 +1,141 @@
-import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import schedule
 import time
 import os
 import shutil
+from archive_store import archive_store
+from board_data import read_board, save_board
+from records import ANNOUNCEMENTS
+from shared_state import file_lock
 
 DATA_FILE_PATH = 'static/data/data.json'
-ARCHIVE_FILE_PATH = 'static/data/archived_data.json'
 IMAGE_DIR = 'static/images/'
 ARCHIVE_IMAGE_DIR = 'static/images/archived/'
 
+# Image moves are I/O bound, so a small thread pool is enough to overlap them.
+ARCHIVE_MOVE_WORKERS = int(os.environ.get("ARCHIVE_MOVE_WORKERS", min(8, (os.cpu_count() or 1) * 2)))
+
 def load_data(file_path):
-    with open(file_path, 'r') as file:
-        return json.load(file)
+    return read_board(file_path, ANNOUNCEMENTS)
 
 def save_data(file_path, data):
-    with open(file_path, 'w') as file:
-        json.dump(data, file, indent=4)
-
-def generate_new_archive_id(archive_data):
-    max_id = 0
-    for category in archive_data.values():
-        for announcement in category:
-            if announcement.get('archive_id', 0) > max_id:
-                max_id = announcement['archive_id']
-    return max_id + 1
-
-def move_and_rename_image(announcement, archive_id):
-    if 'image_attachment' in announcement:
-        old_image_path = os.path.join(IMAGE_DIR, os.path.basename(announcement['image_attachment']))
-        new_image_name = f"{archive_id}{os.path.splitext(old_image_path)[1]}"
-        new_image_path = os.path.join(ARCHIVE_IMAGE_DIR, new_image_name)
-        if os.path.exists(old_image_path):
-            os.makedirs(ARCHIVE_IMAGE_DIR, exist_ok=True)
-            shutil.move(old_image_path, new_image_path)
-            announcement['image_attachment'] = f"/{new_image_path}"
+    # Written atomically so a crash never leaves half a JSON document behind
+    save_board(file_path, data, indent=4, codec=ANNOUNCEMENTS)
+
+def plan_image_move(announcement, archive_id):
+    """Return (old_path, new_path) for an announcement's image, or None if there is nothing to move"""
+    if announcement.image_attachment is None:
+        return None
+    old_image_path = os.path.join(IMAGE_DIR, os.path.basename(announcement.image_attachment))
+    if not os.path.exists(old_image_path):
+        return None
+    new_image_name = f"{archive_id}{os.path.splitext(old_image_path)[1]}"
+    new_image_path = os.path.join(ARCHIVE_IMAGE_DIR, new_image_name)
+    return old_image_path, new_image_path
+
+def rollback_image_moves(completed_moves):
+    """Move already-archived images back to where they came from"""
+    for old_image_path, new_image_path in completed_moves:
+        try:
+            shutil.move(new_image_path, old_image_path)
+        except Exception as e:
+            print(f"Error rolling back image {new_image_path}: {e}")
+
+def execute_image_moves(moves):
+    """Run the planned moves in a bounded thread pool; undo all of them if any move fails"""
+    if not moves:
+        return
+    os.makedirs(ARCHIVE_IMAGE_DIR, exist_ok=True)
+
+    completed_moves = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=ARCHIVE_MOVE_WORKERS) as executor:
+        futures = {executor.submit(shutil.move, *move): move for move in moves}
+        for future, move in futures.items():
+            try:
+                future.result()
+                completed_moves.append(move)
+            except Exception as e:
+                errors.append((move, e))
+
+    if errors:
+        rollback_image_moves(completed_moves)
+        failed_path, error = errors[0][0][0], errors[0][1]
+        raise RuntimeError(f"Failed to move {len(errors)} image(s), first was {failed_path}: {error}")
 
 def check_and_archive_expired_announcements():
+    # The web workers rewrite data.json too (likes, comments), so hold its lock for the whole batch
+    with file_lock(DATA_FILE_PATH):
+        archive_expired_announcements()
+
+def archive_expired_announcements():
     data = load_data(DATA_FILE_PATH)
-    archive_data = load_data(ARCHIVE_FILE_PATH)
     current_date = datetime.now().date()  # Convert to date object for comparison
 
-    if 'important_announcements' not in archive_data:
-        archive_data['important_announcements'] = []
-
+    # Plan the whole batch first: nothing on disk changes until every move is known
+    next_archive_id = archive_store.next_archive_id()
     expired_announcements = []
+    planned_moves = []
+    planned_sources = {}
+    kept_by_category = {}
     for category in data:
         if category == "milestones":
             continue  # Skip archiving for milestones
 
         announcements_to_keep = []
         for announcement in data[category]:
-            if datetime.strptime(announcement['sorting_date'], '%m/%d/%Y').date() < current_date:
-                archive_id = generate_new_archive_id(archive_data)
-                announcement['archive_id'] = archive_id
-                move_and_rename_image(announcement, archive_id)
-                expired_announcements.append(announcement)
-                # Update archive data to ensure unique IDs in subsequent iterations
-                archive_data['important_announcements'].append(announcement)
+            if announcement.sorting_day < current_date:
+                # Archive shards are plain JSON fetched by the browser
+                archived = dict(announcement.to_dict(), archive_id=next_archive_id)
+                move = plan_image_move(announcement, next_archive_id)
+                if move and move[0] in planned_sources:
+                    # Two announcements sharing one image file: both point at the single moved copy
+                    archived['image_attachment'] = f"/{planned_sources[move[0]]}"
+                elif move:
+                    planned_moves.append(move)
+                    planned_sources[move[0]] = move[1]
+                    archived['image_attachment'] = f"/{move[1]}"
+                expired_announcements.append(archived)
+                next_archive_id += 1
             else:
                 announcements_to_keep.append(announcement)
 
-        data[category] = announcements_to_keep
+        kept_by_category[category] = announcements_to_keep
+
+    if not expired_announcements:
+        print(f"Checked expired announcements at {current_date}, nothing to archive")
+        return
+
+    try:
+        execute_image_moves(planned_moves)
+    except Exception as e:
+        print(f"Archiving aborted, no announcements were moved: {e}")
+        return
+
+    # All images are in place, so commit the JSON changes. The archive shards are
+    # written before data.json; if either write fails, everything is undone so the
+    # next run archives the same announcements again from a clean state.
+    try:
+        archive_store.add(expired_announcements)
+    except Exception as e:
+        rollback_image_moves(planned_moves)
+        print(f"Archiving aborted while saving, images were restored: {e}")
+        return
+
+    data.update(kept_by_category)
+    try:
+        save_data(DATA_FILE_PATH, data)
+    except Exception as e:
+        try:
+            archive_store.remove([archived["archive_id"] for archived in expired_announcements])
+        except Exception as remove_error:
+            print(f"Error removing the new archives again: {remove_error}")
+        rollback_image_moves(planned_moves)
+        print(f"Archiving aborted while saving {DATA_FILE_PATH}, archives and images were restored: {e}")
+        return
 
-    save_data(DATA_FILE_PATH, data)
-    save_data(ARCHIVE_FILE_PATH, archive_data)
-    print(f"Checked and archived expired announcements at {current_date}")
+    print(f"Checked and archived {len(expired_announcements)} expired announcements at {current_date}")
 
 # Check expired announcements at startup
 check_and_archive_expired_announcements()
@@ -76,4 +146,4 @@ schedule.every().hour.do(check_and_archive_expired_announcements)
 if __name__ == "__main__":
     while True:
         schedule.run_pending()
-        time.sleep(1)
\ No newline at end of file
+        time.sleep(1)
@@ -0,0 +1,117 @@
+"""
+Per-request time of the app's middleware stack, measured without a network.
+
+    python benchmarks/asgi_overhead.py [--requests 2000]
+    python benchmarks/asgi_overhead.py --save-baseline before.json
+    python benchmarks/asgi_overhead.py --baseline before.json
+
+Requests are passed straight to main.app as ASGI calls, so the numbers are the
+middleware, routing and handler time alone: a static file, the health check, a guest
+page, an announcement and a request for an unknown host. The app runs in a
+temporary copy of the repository with the schedule always open.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import reporting
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUESTS: Tuple[Tuple[str, str, str], ...] = (
+    ("static file", "/static/css/common.css", "127.0.0.1"),
+    ("health", "/health", "127.0.0.1"),
+    ("guest page", "/important_guest", "127.0.0.1"),
+    ("announcement", "/announcement/1000", "127.0.0.1"),
+    ("unknown host", "/important_guest", "evil.example.com"),
+)
+
+def make_scope(path: str, host: str) -> Dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", host.encode()), (b"user-agent", b"asgi-overhead"), (b"accept", b"*/*")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+async def call(app, path: str, host: str) -> int:
+    status = []
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        # Like a server: the body once, then nothing until the client goes away
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    await app(make_scope(path, host), receive, send)
+    return status[0] if status else 0
+
+async def run(app, request_count: int) -> Dict[str, Dict]:
+    results = {}
+    for name, path, host in REQUESTS:
+        for _ in range(50):
+            await call(app, path, host)  # Warm caches and the middleware stack
+        latencies: List[float] = []
+        statuses = set()
+        for _ in range(request_count):
+            started = time.perf_counter()
+            statuses.add(await call(app, path, host))
+            latencies.append((time.perf_counter() - started) * 1000)
+        results[name] = reporting.summarize(latencies)
+        print(f"  {name}: {path} (host {host}) -> {sorted(statuses)}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per row")
+    reporting.add_baseline_arguments(parser, default_tolerance=0.25)
+    args = parser.parse_args()
+    for option in ("save_baseline", "baseline"):
+        if getattr(args, option):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+
+    work_dir = tempfile.mkdtemp(prefix="board-asgi-")
+    app_dir = os.path.join(work_dir, "app")
+    shutil.copytree(ROOT, app_dir, ignore=shutil.ignore_patterns(
+        ".git", "__pycache__", "benchmarks", "encrypted_data", "runtime_data", "profiles", "*.msgpack"))
+    os.environ.update(DEBUG="false", ALLOWED_HOSTS="127.0.0.1,localhost", RUNTIME_SCHEDULE="daily 00:00-24:00",
+                      RUNTIME_EXCEPTIONS="")
+    previous_dir = os.getcwd()
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+    try:
+        import main as board_app
+        results = asyncio.run(run(board_app.app, args.requests))
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    reporting.finish(args, results, {"requests": args.requests})
+
+if __name__ == "__main__":
+    main()
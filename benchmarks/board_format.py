@@ -0,0 +1,85 @@
+"""
+Load time, memory and file size of data.json versus its compact msgpack copy and records.
+
+    python benchmarks/board_format.py [--scale 1 10 100] [--repeat 20]
+
+The announcements in static/data/data.json are repeated --scale times (with fresh ids)
+so the numbers reflect a busier board than the sample data.
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import board_data
+import records
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "data", "data.json")
+
+def scaled_board(scale: int) -> dict:
+    with open(DATA_FILE, "r") as file:
+        sample = json.load(file)
+    board = {category: [] for category in sample}
+    next_id = 1
+    for _ in range(scale):
+        for category, announcements in sample.items():
+            for announcement in announcements:
+                board[category].append(dict(copy.deepcopy(announcement), announcement_id=next_id))
+                next_id += 1
+    return board
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+def held_kib(func) -> float:
+    """Memory still allocated while the loaded board is kept (what the cache holds)"""
+    tracemalloc.start()
+    result = func()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return held / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if board_data.msgpack is None:
+        print("msgpack is not installed: nothing to compare")
+        return
+
+    print(f"{'scale':>6} {'records':>8}  {'format':<16} {'file KiB':>9} {'load ms':>9} {'held KiB':>9}")
+    for scale in args.scale:
+        board = scaled_board(scale)
+        record_count = sum(len(items) for items in board.values())
+        as_json = json.dumps(board, indent=2).encode()
+        compact = board_data.encode(board)
+        assert board_data.decode(compact)[1] == board
+
+        rows = [
+            ("data.json", as_json, lambda: json.loads(as_json)),
+            ("compact msgpack", compact, lambda: board_data.decode(compact)[1]),
+            ("msgpack+records", compact, lambda: records.board_from_data(board_data.decode(compact)[1])),
+        ]
+        baseline = None
+        for name, payload, load in rows:
+            load_ms = timed(load, args.repeat)
+            held = held_kib(load)
+            baseline = baseline or (len(payload), load_ms, held)
+            print(f"{scale:>6} {record_count:>8}  {name:<16} {len(payload) / 1024:>9.1f} {load_ms:>9.2f} {held:>9.1f}"
+                  f"   ({len(payload) / baseline[0]:.0%} size, {load_ms / baseline[1]:.0%} load time,"
+                  f" {held / baseline[2]:.0%} memory)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Encrypt/decrypt time and file size of the users table per payload format.
+
+    python benchmarks/encrypted_tables.py [--records 100 1000 10000] [--repeat 20]
+
+Compares the old pretty-printed JSON with compact JSON and (if installed) msgpack.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet
+import serialization
+
+def make_users_table(record_count: int) -> dict:
+    return {
+        "records": [
+            {
+                "id": user_id,
+                "full_name": f"Student Number {user_id}",
+                "age": 18 + user_id % 10,
+                "email": f"student{user_id}@school.edu.ph",
+                "password": "scrypt$16384$8$1$c2FsdHNhbHRzYWx0c2FsdA$aGFzaGhhc2hoYXNoaGFzaGhhc2hoYXNoaGFzaGhhc2g",
+                "created_at": "2025-01-15 08:30:00"
+            }
+            for user_id in range(1, record_count + 1)
+        ],
+        "auto_increment": record_count + 1,
+        "schema": {"id": "integer", "full_name": "string", "age": "integer", "email": "string",
+                   "password": "string", "created_at": "datetime"}
+    }
+
+def encoders():
+    yield "json indent=2 (old)", lambda data: json.dumps(data, indent=2).encode(), lambda raw: json.loads(raw.decode())
+    yield "json compact", lambda data: serialization.dumps(data, "json"), serialization.loads
+    if serialization.msgpack is not None:
+        yield "msgpack", lambda data: serialization.dumps(data, "msgpack"), serialization.loads
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    cipher = Fernet(Fernet.generate_key())
+    if serialization.msgpack is None:
+        print("(msgpack not installed: skipping the msgpack rows)")
+
+    print(f"{'records':>8}  {'format':<20} {'file KiB':>9} {'write ms':>9} {'read ms':>9}")
+    for record_count in args.records:
+        table = make_users_table(record_count)
+        baseline = None
+        for name, encode, decode in encoders():
+            token = cipher.encrypt(encode(table))
+            assert decode(cipher.decrypt(token)) == table
+
+            write_ms = timed(lambda: cipher.encrypt(encode(table)), args.repeat)
+            read_ms = timed(lambda: decode(cipher.decrypt(token)), args.repeat)
+            baseline = baseline or (len(token), write_ms, read_ms)
+            print(f"{record_count:>8}  {name:<20} {len(token) / 1024:>9.1f} {write_ms:>9.2f} {read_ms:>9.2f}"
+                  f"   ({len(token) / baseline[0]:.0%} size, {read_ms / baseline[2]:.0%} read time)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Generate production-sized board data for performance work.
+
+    python benchmarks/generate_data.py TARGET [--announcements 200] [--users 10000]
+                                              [--archive-years 3] [--feedback 500] [--seed 42]
+
+TARGET is a copy of the app (not the repository itself, unless --force is given).
+Its board files are replaced with:
+
+- data.json: --announcements per section, with likes and comments following a Zipf
+  distribution (a few posts get most of the attention), images on some of them and
+  a share already expired so the archiver has work to do;
+- archive shards covering --archive-years of past announcements;
+- feedback.json with --feedback entries, some with an image attachment;
+- the users table, encrypted through EncryptedDatabase with the copy's key.
+
+A count of 0 leaves that part of TARGET as it is. Run it from the repository root
+like the other benchmarks (importing the app modules touches ./static/data).
+
+Scrypt hashes are slow to make, so only the first --login-users accounts get their
+own password (listed in bench_users.json for the load test); the rest share one
+hash of a password nobody knows.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import struct
+import sys
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive_store import ArchiveStore
+from board_data import compact_path
+from encrypted_db import EncryptedDatabase
+from passwords import hash_password
+from shared_state import save_json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECTIONS = ("important_announcements", "upcoming_deadlines_events", "milestones")
+ACCOUNTS_FILE = "bench_users.json"
+
+FIRST_NAMES = ("Maria", "Jose", "Juan", "Ana", "Mark", "Angel", "Paolo", "Kristine", "John", "Princess",
+               "Carlo", "Bea", "Miguel", "Nicole", "Rafael", "Andrea", "Joshua", "Camille")
+LAST_NAMES = ("Santos", "Reyes", "Cruz", "Bautista", "Ocampo", "Garcia", "Mendoza", "Torres", "Flores",
+              "Villanueva", "Ramos", "Aquino", "Castillo", "Dela Cruz", "Navarro", "Rivera")
+TOPICS = ("Enrollment", "Midterm Examinations", "Intramurals", "Scholarship Application", "Library Hours",
+          "Org Fair", "Clearance Signing", "Foundation Day", "Blood Drive", "Career Talk", "Thesis Defense",
+          "Uniform Inspection", "Christmas Party", "Sports Tryouts", "Faculty Evaluation", "Recognition Day")
+COMMENT_TEXTS = ("Thank you for the update!", "Is this open to second years?", "See you there!",
+                 "What time does it start?", "Where do we submit the form?", "Salamat po!",
+                 "Can irregular students join?", "Is there a dress code?", "Noted, thank you.",
+                 "Will this be online or face to face?")
+FEEDBACK_TEXTS = ("The board doesn't load on my phone", "Please add a dark mode", "Wrong date on an announcement",
+                  "The comments section is great", "Can we get notifications?", "Typo in the deadline post")
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    weights = [1 / rank ** exponent for rank in range(1, count + 1)]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+def zipf_counts(count: int, total: int, exponent: float, rng: random.Random) -> List[int]:
+    """Split total over count items by Zipf rank; ranks are shuffled so the popular items are anywhere"""
+    counts = [int(total * weight) for weight in zipf_weights(count, exponent)]
+    rng.shuffle(counts)
+    return counts
+
+def placeholder_png(rng: random.Random, size: int = 16) -> bytes:
+    """A small valid PNG of one colour"""
+    def chunk(kind: bytes, payload: bytes) -> bytes:
+        return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+    pixel = bytes(rng.randrange(256) for _ in range(3))
+    rows = b"".join(b"\x00" + pixel * size for _ in range(size))
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+def write_image(target: str, relative_path: str, rng: random.Random) -> str:
+    path = os.path.join(target, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(placeholder_png(rng))
+    return f"/{relative_path}"
+
+def make_emails(user_count: int) -> List[str]:
+    return [f"student{number}@school.edu.ph" for number in range(1, user_count + 1)]
+
+def make_announcement(announcement_id: int, day: date, rng: random.Random) -> Dict:
+    start = day - timedelta(days=rng.randrange(0, 30))
+    announcement = {
+        "date": f"{start:%b %d} - {day:%b %d, %Y}" if start != day else f"{day:%b %d, %Y}",
+        "title": f"{rng.choice(TOPICS)} AY {day.year}-{day.year + 1}",
+        "guest_mode": rng.random() < 0.7,
+        "announcement_id": announcement_id,
+        "sorting_date": day.strftime("%m/%d/%Y"),
+        "likes": {"amount": 0, "accounts": []},
+        "description": " ".join(rng.choice(COMMENT_TEXTS) for _ in range(rng.randrange(1, 6)))
+    }
+    if rng.random() < 0.3:
+        announcement["link"] = f"https://www.facebook.com/share/p/{rng.getrandbits(40):x}/"
+    return announcement
+
+def add_engagement(announcements: List[Dict], emails: List[str], likes_total: int, comments_total: int,
+                   exponent: float, rng: random.Random):
+    like_counts = zipf_counts(len(announcements), likes_total, exponent, rng)
+    comment_counts = zipf_counts(len(announcements), comments_total, exponent, rng)
+    for announcement, like_count, comment_count in zip(announcements, like_counts, comment_counts):
+        accounts = rng.sample(emails, min(like_count, len(emails)))
+        announcement["likes"] = {"amount": len(accounts), "accounts": accounts}
+        if comment_count:
+            posted = datetime.strptime(announcement["sorting_date"], "%m/%d/%Y") - timedelta(days=30)
+            announcement["comments"] = []
+            for _ in range(comment_count):
+                email = rng.choice(emails)
+                number = int(email[len("student"):email.index("@")])
+                announcement["comments"].append({
+                    "username": f"{FIRST_NAMES[number % len(FIRST_NAMES)]} {LAST_NAMES[number % len(LAST_NAMES)]}",
+                    "comment": rng.choice(COMMENT_TEXTS),
+                    "date": (posted + timedelta(seconds=rng.randrange(60 * 86400))).strftime("%Y-%m-%d %H:%M:%S"),
+                    "email": email
+                })
+
+def generate_board(target: str, per_section: int, emails: List[str], rng: random.Random, likes_per_post: int = 20,
+                   comments_per_post: int = 5, exponent: float = 1.1, image_share: float = 0.3,
+                   expired_share: float = 0.1) -> Dict:
+    today = date.today()
+    board = {}
+    next_id = 1000
+    for section in SECTIONS:
+        announcements = []
+        for _ in range(per_section):
+            if section == "milestones" or rng.random() < expired_share:
+                day = today - timedelta(days=rng.randrange(1, 365))
+            else:
+                day = today + timedelta(days=rng.randrange(0, 180))
+            announcement = make_announcement(next_id, day, rng)
+            if rng.random() < image_share:
+                announcement["image_attachment"] = write_image(target, f"static/images/{next_id}.png", rng)
+            announcements.append(announcement)
+            next_id += 1
+        add_engagement(announcements, emails, likes_per_post * per_section, comments_per_post * per_section,
+                       exponent, rng)
+        board[section] = announcements
+    return board
+
+def generate_archives(target: str, years: int, per_month: int, emails: List[str], rng: random.Random,
+                      exponent: float = 1.1, image_share: float = 0.3) -> int:
+    archive_dir = os.path.join(target, "static", "data", "archives")
+    shutil.rmtree(archive_dir, ignore_errors=True)
+    store = ArchiveStore(archive_dir=archive_dir, legacy_file=os.path.join(archive_dir, "none.json"))
+    today = date.today()
+    archive_id = 1
+    for month_index in range(years * 12, 0, -1):
+        month_start = (today.replace(day=1) - timedelta(days=31 * month_index)).replace(day=1)
+        by_section = {section: [] for section in SECTIONS[:2]}
+        for _ in range(per_month):
+            day = month_start + timedelta(days=rng.randrange(28))
+            announcement = make_announcement(100000 + archive_id, day, rng)
+            announcement["archive_id"] = archive_id
+            if rng.random() < image_share:
+                announcement["image_attachment"] = write_image(
+                    target, f"static/images/archived/{archive_id}.png", rng)
+            by_section[rng.choice(SECTIONS[:2])].append(announcement)
+            archive_id += 1
+        for section, announcements in by_section.items():
+            add_engagement(announcements, emails, 10 * len(announcements), 2 * len(announcements), exponent, rng)
+            store.add(announcements, section)
+    return archive_id - 1
+
+def generate_feedback(target: str, count: int, emails: List[str], rng: random.Random,
+                      image_share: float = 0.3) -> Dict:
+    started = datetime.now() - timedelta(days=365)
+    feedbacks = []
+    for feedback_id in range(1, count + 1):
+        feedback = {
+            "email": rng.choice(emails),
+            "feedback_title": rng.choice(FEEDBACK_TEXTS),
+            "feedback_description": " ".join(rng.choice(COMMENT_TEXTS) for _ in range(rng.randrange(1, 4))),
+            "date": (started + timedelta(seconds=rng.randrange(365 * 86400))).strftime("%Y-%m-%d %H:%M:%S"),
+            "feedback_id": feedback_id
+        }
+        if rng.random() < image_share:
+            feedback["image_attachment"] = write_image(target, f"static/images/Feedback/{feedback_id}.png", rng)
+        feedback["read"] = rng.random() < 0.5
+        feedbacks.append(feedback)
+    return {"update": [{"before": max(count - 1, 0), "current": count}], "feedbacks": feedbacks}
+
+def generate_users(target: str, emails: List[str], login_users: int, rng: random.Random) -> List[Dict]:
+    """Write the encrypted users table; returns the accounts that can log in"""
+    database = EncryptedDatabase(db_directory=os.path.join(target, "encrypted_data"),
+                                 encryption_key_file=os.path.join(target, "super_secret_stuff", "db_key.key"))
+    database.initialize()
+    shared_hash = hash_password(f"{rng.getrandbits(128):x}")
+    accounts = []
+    records = []
+    for number, email in enumerate(emails, start=1):
+        password_hash = shared_hash
+        if number <= login_users:
+            password = f"bench-password-{number}"
+            password_hash = hash_password(password)
+            accounts.append({"email": email, "password": password})
+        records.append({
+            "id": number,
+            "full_name": f"{FIRST_NAMES[number % len(FIRST_NAMES)]} {LAST_NAMES[number % len(LAST_NAMES)]}",
+            "age": 17 + number % 8,
+            "email": email,
+            "password": password_hash,
+            "created_at": (datetime(2024, 6, 1) + timedelta(minutes=number)).strftime("%Y-%m-%d %H:%M:%S")
+        })
+    table = database._read_table("users")
+    table["records"] = records
+    table["auto_increment"] = len(records) + 1
+    database._write_table("users", table)
+    return accounts
+
+def generate(target: str, announcements: int = 200, users: int = 10000, login_users: int = 100,
+             archive_years: int = 3, archives_per_month: int = 40, feedback: int = 500,
+             exponent: float = 1.1, seed: int = 42) -> Dict:
+    """Fill target with generated data; returns a summary of what was written"""
+    rng = random.Random(seed)
+    emails = make_emails(users)
+    data_dir = os.path.join(target, "static", "data")
+    os.makedirs(data_dir, exist_ok=True)
+    summary = {}
+    timings = {}
+
+    started = time.perf_counter()
+    accounts = generate_users(target, emails, min(login_users, users), rng)
+    with open(os.path.join(target, ACCOUNTS_FILE), "w") as file:
+        json.dump(accounts, file)
+    summary["users"] = users
+    timings["users"] = time.perf_counter() - started
+
+    if announcements:
+        started = time.perf_counter()
+        board = generate_board(target, announcements, emails, rng, exponent=exponent)
+        data_file = os.path.join(data_dir, "data.json")
+        save_json(data_file, board, indent=4)
+        if os.path.exists(compact_path(data_file)):
+            os.remove(compact_path(data_file))  # Rebuilt from the new data.json on first load
+        summary["announcements"] = sum(len(section) for section in board.values())
+        timings["board"] = time.perf_counter() - started
+
+    if archive_years and archives_per_month:
+        started = time.perf_counter()
+        summary["archives"] = generate_archives(target, archive_years, archives_per_month, emails, rng, exponent)
+        timings["archives"] = time.perf_counter() - started
+
+    if feedback:
+        started = time.perf_counter()
+        feedback_file = os.path.join(data_dir, "feedback.json")
+        save_json(feedback_file, generate_feedback(target, feedback, emails, rng), indent=4)
+        if os.path.exists(compact_path(feedback_file)):
+            os.remove(compact_path(feedback_file))
+        summary["feedback"] = feedback
+        timings["feedback"] = time.perf_counter() - started
+
+    summary["seconds"] = {name: round(seconds, 2) for name, seconds in timings.items()}
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("target", help="App directory to fill (a copy of the repository)")
+    parser.add_argument("--announcements", type=int, default=200, help="Announcements per section")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--login-users", type=int, default=100, help="Accounts given their own password")
+    parser.add_argument("--archive-years", type=int, default=3)
+    parser.add_argument("--archives-per-month", type=int, default=40)
+    parser.add_argument("--feedback", type=int, default=500)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent for likes and comments")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="Allow TARGET to be the repository itself")
+    args = parser.parse_args()
+
+    target = os.path.abspath(args.target)
+    if os.path.realpath(target) == os.path.realpath(ROOT) and not args.force:
+        parser.error("refusing to overwrite the repository's own data; pass a copy (or --force)")
+
+    summary = generate(target, args.announcements, args.users, args.login_users, args.archive_years,
+                       args.archives_per_month, args.feedback, args.zipf, args.seed)
+    print(f"🏗️ Generated in {target}: {json.dumps(summary)}")
+
+if __name__ == "__main__":
+    main()
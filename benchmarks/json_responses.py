@@ -0,0 +1,87 @@
+"""
+Time to encode a large JSON response: Starlette's JSONResponse against FastJSONResponse.
+
+    python benchmarks/json_responses.py [--items 100 1000 10000] [--repeat 50]
+
+The payload is a list of generated announcements (with likes and comments). Rows:
+
+- JSONResponse(dicts): the stdlib encoder, what the routes used before;
+- jsonable_encoder + JSONResponse: a route returning records without a response
+  class, as FastAPI handles it;
+- FastJSONResponse(dicts) and FastJSONResponse(records): orjson, given dicts or the
+  cached records directly;
+- stdlib fallback (records): FastJSONResponse without orjson.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reporting
+from generate_data import generate_board, make_emails
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+import responses
+from records import Announcement
+from responses import FastJSONResponse
+
+def measure(func, repeat: int):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def stdlib_response(content):
+    use_orjson = responses.USE_ORJSON
+    responses.USE_ORJSON = False
+    try:
+        return FastJSONResponse(content)
+    finally:
+        responses.USE_ORJSON = use_orjson
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    reporting.add_baseline_arguments(parser, default_tolerance=0.25)
+    args = parser.parse_args()
+
+    if responses.orjson is None:
+        print("(orjson is not installed: FastJSONResponse rows use the stdlib encoder)")
+    rng = random.Random(42)
+    emails = make_emails(2000)
+    results = {}
+    with tempfile.TemporaryDirectory() as target:
+        for item_count in args.items:
+            board = generate_board(target, item_count, emails, rng, image_share=0)
+            dicts = board["important_announcements"]
+            records = [Announcement.from_dict(item) for item in dicts]
+            expected = JSONResponse(dicts).body
+            # Same JSON; records write their fields in file order, so compare decoded
+            assert FastJSONResponse(dicts).body == expected
+            assert FastJSONResponse(records).body == stdlib_response(records).body
+            assert json.loads(FastJSONResponse(records).body) == dicts
+            size = f"{item_count} items ({len(expected) / 1024:.0f} KiB)"
+
+            rows = {
+                "JSONResponse(dicts)": lambda: JSONResponse(dicts),
+                "jsonable_encoder + JSONResponse": lambda: JSONResponse(jsonable_encoder(dicts)),
+                "FastJSONResponse(dicts)": lambda: FastJSONResponse(dicts),
+                "FastJSONResponse(records)": lambda: FastJSONResponse(records),
+                "stdlib fallback (records)": lambda: stdlib_response(records),
+            }
+            for name, func in rows.items():
+                results[f"{name}, {size}"] = reporting.summarize(measure(func, args.repeat))
+
+    reporting.finish(args, results, {"items": args.items, "repeat": args.repeat})
+
+if __name__ == "__main__":
+    main()
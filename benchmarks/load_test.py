@@ -0,0 +1,305 @@
+"""
+HTTP load test against a local copy of the app, with a stub SMTP server.
+
+    python benchmarks/load_test.py [--scenarios guest login storm reset] [--duration 15]
+                                   [--concurrency 20] [--users 1000] [--workers 1]
+                                   [--announcements 200 --archive-years 3 --feedback 500]
+    python benchmarks/load_test.py --save-baseline benchmarks/load_baseline.json
+    python benchmarks/load_test.py --baseline benchmarks/load_baseline.json   # exit 1 if slower
+
+The repository is copied to a temporary directory, filled by generate_data.py
+(--users accounts, and with --announcements/--archive-years/--feedback a board of
+that size instead of the sample data) and served by uvicorn on a free port, with
+the schedule always open and email going to benchmarks/smtp_stub.py. Scenarios:
+
+- guest: anonymous visitors browsing the guest pages, announcements and data.json;
+- login: every virtual user logs in a few times at once (a class all signing in);
+- storm: logged-in users liking and commenting, mostly on the same few announcements;
+- reset: password reset requests, each sending an email through the stub.
+
+Reports throughput and p50/p95/p99 per scenario and request. On Linux each virtual
+user connects from its own 127.0.0.x address so the per-IP rate limits behave as
+they would for separate students.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+import reporting
+from generate_data import ACCOUNTS_FILE
+from smtp_stub import SMTPStub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("guest", "login", "storm", "reset")
+GUEST_PAGES = ("/", "/important_guest", "/upcoming_guest", "/static/data/data.json")
+COMMENTS = ("Thank you for the update!", "Is this open to second years?", "See you there",
+            "What time does it start?", "this is sh1t")  # The last one is rejected by moderation
+
+# Runs inside the copy after generate_data.py: email settings and a session cookie per account
+SEED_SCRIPT = """
+import json
+from secure_config import secure_config
+from sessions import session_manager
+
+secure_config.load()
+secure_config.update_email_config("board@bench.local", "bench")
+with open(%r, "r") as file:
+    users = json.load(file)
+for user in users:
+    user["session_token"] = session_manager.issue(user["email"])
+with open(%r, "w") as file:
+    json.dump(users, file)
+""" % (ACCOUNTS_FILE, ACCOUNTS_FILE)
+
+class Recorder:
+    """Latencies and failures per request name for one scenario"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+
+    def add(self, name: str, started: float, status: Optional[int], expected: Tuple[int, ...]):
+        self.latencies.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        counts = self.statuses.setdefault(name, {})
+        counts[status or 0] = counts.get(status or 0, 0) + 1
+        if status not in expected:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str,
+                      expected: Tuple[int, ...] = (200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = None
+        self.add(name, started, status, expected)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def loopback_spread_available() -> bool:
+    try:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.2", 0))
+        return True
+    except OSError:
+        return False
+
+def client_address(index: int, spread: bool) -> Optional[str]:
+    return f"127.0.{index // 250}.{index % 250 + 2}" if spread else None
+
+def prepare_copy(args) -> Tuple[str, List[Dict]]:
+    work_dir = tempfile.mkdtemp(prefix="board-load-")
+    app_dir = os.path.join(work_dir, "app")
+    shutil.copytree(ROOT, app_dir, ignore=shutil.ignore_patterns(
+        ".git", "__pycache__", "benchmarks", "encrypted_data", "runtime_data", "profiles", "*.msgpack"))
+    started = time.perf_counter()
+    # Run from inside the copy: importing the app modules creates files in the working directory
+    subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "generate_data.py"), app_dir,
+                    "--users", str(args.users), "--login-users", str(min(args.users, args.concurrency)),
+                    "--announcements", str(args.announcements), "--archive-years", str(args.archive_years),
+                    "--feedback", str(args.feedback), "--seed", str(args.seed)],
+                   cwd=app_dir, check=True)
+    subprocess.run([sys.executable, "-c", SEED_SCRIPT], cwd=app_dir, check=True, stdout=subprocess.DEVNULL)
+    with open(os.path.join(app_dir, ACCOUNTS_FILE), "r") as file:
+        users = json.load(file)
+    print(f"🌱 Prepared the copy in {time.perf_counter() - started:.1f} s")
+    return work_dir, users
+
+def announcement_ids(app_dir: str) -> List[int]:
+    with open(os.path.join(app_dir, "static", "data", "data.json"), "r") as file:
+        board = json.load(file)
+    return [announcement["announcement_id"] for announcements in board.values() for announcement in announcements]
+
+def start_server(app_dir: str, port: int, smtp_port: int, workers: int, log_file) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DEBUG="false",
+        ALLOWED_HOSTS="127.0.0.1,localhost",
+        RUNTIME_SCHEDULE="daily 00:00-24:00",
+        RUNTIME_EXCEPTIONS="",
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT=str(smtp_port),
+        SMTP_STARTTLS="false",
+        WEB_CONCURRENCY=str(workers)
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=app_dir, env=env, stdout=log_file, stderr=subprocess.STDOUT
+    )
+
+async def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"The app exited with status {server.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"The app did not answer /health within {timeout:.0f} s")
+
+def hot_choice(ids: List[int], rng: random.Random) -> int:
+    """Mostly the first few announcements: a storm piles onto the same posts"""
+    return rng.choices(ids, weights=[1 / rank for rank in range(1, len(ids) + 1)])[0]
+
+async def guest_user(client: httpx.AsyncClient, recorder: Recorder, ids: List[int], deadline: float,
+                     rng: random.Random):
+    while time.monotonic() < deadline:
+        if rng.random() < 0.3:
+            await recorder.request(client, "GET /announcement/{id}", "GET", f"/announcement/{rng.choice(ids)}")
+        else:
+            page = rng.choice(GUEST_PAGES)
+            await recorder.request(client, f"GET {page}", "GET", page)
+
+async def login_user(client: httpx.AsyncClient, recorder: Recorder, user: Dict, attempts: int):
+    for _ in range(attempts):
+        await recorder.request(client, "POST /login", "POST", "/login", expected=(303,),
+                               json={"email": user["email"], "password": user["password"]})
+
+async def storm_user(client: httpx.AsyncClient, recorder: Recorder, user: Dict, ids: List[int],
+                     deadline: float, rng: random.Random):
+    client.cookies.set("session_token", user["session_token"])
+    while time.monotonic() < deadline:
+        announcement_id = hot_choice(ids, rng)
+        if rng.random() < 0.7:
+            await recorder.request(client, "POST /announcement/{id}/like", "POST",
+                                   f"/announcement/{announcement_id}/like")
+        else:
+            await recorder.request(client, "POST /announcement/{id}/comment", "POST",
+                                   f"/announcement/{announcement_id}/comment", expected=(200, 202, 400),
+                                   data={"comment": rng.choice(COMMENTS)})
+
+async def reset_user(client: httpx.AsyncClient, recorder: Recorder, user: Dict, attempts: int):
+    for _ in range(attempts):
+        await recorder.request(client, "POST /forgot_password/send_verification_code", "POST",
+                               "/forgot_password/send_verification_code", data={"email": user["email"]})
+
+async def run_scenario(name: str, args, base_url: str, users: List[Dict], ids: List[int],
+                       spread: bool) -> Tuple[Recorder, float]:
+    recorder = Recorder()
+    rng = random.Random(f"{args.seed}-{name}")
+    deadline = time.monotonic() + args.duration
+    clients = [
+        httpx.AsyncClient(base_url=base_url, follow_redirects=False, timeout=30,
+                          transport=httpx.AsyncHTTPTransport(local_address=client_address(index, spread)))
+        for index in range(args.concurrency)
+    ]
+    virtual_users = []
+    for index, client in enumerate(clients):
+        user = users[index % len(users)]
+        user_rng = random.Random(rng.random())
+        if name == "guest":
+            virtual_users.append(guest_user(client, recorder, ids, deadline, user_rng))
+        elif name == "login":
+            virtual_users.append(login_user(client, recorder, user, args.login_attempts))
+        elif name == "storm":
+            virtual_users.append(storm_user(client, recorder, user, ids, deadline, user_rng))
+        elif name == "reset":
+            virtual_users.append(reset_user(client, recorder, user, args.reset_attempts))
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*virtual_users)
+    finally:
+        for client in clients:
+            await client.aclose()
+    return recorder, time.perf_counter() - started
+
+async def run(args) -> Dict[str, Dict]:
+    spread = loopback_spread_available() and not args.single_address
+    if not spread:
+        print("⚠️ All virtual users share 127.0.0.1, so login/reset bursts will hit the per-IP rate limits")
+
+    work_dir, users = prepare_copy(args)
+    app_dir = os.path.join(work_dir, "app")
+    ids = announcement_ids(app_dir)
+    smtp = SMTPStub(delay_ms=args.smtp_delay_ms)
+    smtp_port = await smtp.start()
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(work_dir, "server.log")
+    results = {}
+    with open(log_path, "w") as log_file:
+        server = start_server(app_dir, port, smtp_port, args.workers, log_file)
+        try:
+            await wait_until_ready(base_url, server)
+            print(f"🚀 App ready on {base_url} ({args.workers} worker(s)), SMTP stub on port {smtp_port}")
+            for name in args.scenarios:
+                recorder, elapsed = await run_scenario(name, args, base_url, users, ids, spread)
+                for request_name, latencies in recorder.latencies.items():
+                    results[f"{name}: {request_name}"] = reporting.summarize(
+                        latencies, recorder.errors.get(request_name, 0), elapsed)
+                    if recorder.errors.get(request_name):
+                        print(f"⚠️ {name}: {request_name} statuses {recorder.statuses[request_name]}")
+                all_latencies = [value for values in recorder.latencies.values() for value in values]
+                results[f"{name}: all"] = reporting.summarize(all_latencies, sum(recorder.errors.values()), elapsed)
+                print(f"✔️ {name}: {len(all_latencies)} requests in {elapsed:.1f} s")
+            if "reset" in args.scenarios:
+                expected_emails = args.concurrency * args.reset_attempts
+                await asyncio.sleep(1)
+                print(f"📮 SMTP stub received {smtp.messages} of {expected_emails} verification email(s)")
+                if smtp.delivery_times:
+                    results["smtp: delivery"] = reporting.summarize(
+                        [seconds * 1000 for seconds in smtp.delivery_times], max(0, expected_emails - smtp.messages))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            await smtp.stop()
+            if args.keep:
+                print(f"📁 Copy and server log kept in {work_dir}")
+            else:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=15, help="Seconds for the guest and storm scenarios")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users per scenario")
+    parser.add_argument("--users", type=int, default=1000, help="Accounts to generate")
+    parser.add_argument("--announcements", type=int, default=0,
+                        help="Generated announcements per section (0 keeps the sample data.json)")
+    parser.add_argument("--archive-years", type=int, default=0, help="Years of generated archives (0 keeps the sample)")
+    parser.add_argument("--feedback", type=int, default=0, help="Generated feedback entries (0 keeps the sample)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--login-attempts", type=int, default=5, help="Logins per virtual user (limit: 5/minute)")
+    parser.add_argument("--reset-attempts", type=int, default=3, help="Reset emails per virtual user (limit: 3/minute)")
+    parser.add_argument("--smtp-delay-ms", type=float, default=0, help="Delay every SMTP reply by this much")
+    parser.add_argument("--single-address", action="store_true", help="Connect every virtual user from 127.0.0.1")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary copy and server log")
+    reporting.add_baseline_arguments(parser, default_tolerance=0.3)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    settings = {name: getattr(args, name) for name in ("scenarios", "duration", "concurrency", "users", "announcements",
+                                                       "archive_years", "feedback", "workers", "login_attempts",
+                                                       "reset_attempts", "smtp_delay_ms")}
+    reporting.finish(args, results, settings)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Micro-benchmarks of the hot paths, with baselines to catch regressions.
+
+    python benchmarks/micro.py [--users 1000 10000 100000] [--scale 10] [--repeat 200]
+    python benchmarks/micro.py --save-baseline benchmarks/micro_baseline.json
+    python benchmarks/micro.py --baseline benchmarks/micro_baseline.json   # exit 1 if slower
+
+Covers board loads and saves (main.load_data / update_board), the encrypted users
+table at each --users size, one archiver run and comment moderation. Everything runs
+in a temporary directory; the repository's data files are never touched. Each
+operation is timed separately, so the table shows p50/p95/p99 per call.
+"""
+
+import argparse
+import importlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reporting
+from board_format import scaled_board
+from encrypted_tables import make_users_table
+from board_data import load_board, save_board, update_board
+from encrypted_db import EncryptedDatabase
+from moderation import ModerationEngine
+from records import ANNOUNCEMENTS, find_announcement
+from shared_state import invalidate
+
+DATA_FILE = os.path.join("static", "data", "data.json")
+
+def measure(func: Callable, repeat: int, setup: Callable = None) -> List[float]:
+    """Milliseconds per call; setup (untimed) runs before every call"""
+    latencies = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def bench_board(results: Dict, scale: int, repeat: int, rng: random.Random):
+    board = scaled_board(scale)
+    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
+    save_board(DATA_FILE, board, codec=None)
+    ids = [announcement["announcement_id"] for announcements in board.values() for announcement in announcements]
+    size = f"x{scale}"
+
+    results[f"board load cached {size}"] = reporting.summarize(
+        measure(lambda: load_board(DATA_FILE, ANNOUNCEMENTS), repeat))
+    results[f"board load cold {size}"] = reporting.summarize(
+        measure(lambda: load_board(DATA_FILE, ANNOUNCEMENTS), repeat, setup=lambda: invalidate(DATA_FILE)))
+
+    parsed = load_board(DATA_FILE, ANNOUNCEMENTS)
+    results[f"board save {size}"] = reporting.summarize(
+        measure(lambda: save_board(DATA_FILE, parsed, codec=ANNOUNCEMENTS), repeat))
+
+    def like():
+        with update_board(DATA_FILE, codec=ANNOUNCEMENTS) as announcement_data:
+            find_announcement(announcement_data, rng.choice(ids)).likes.toggle(f"user{rng.randrange(100)}@bench.local")
+    results[f"board like update {size}"] = reporting.summarize(measure(like, repeat))
+
+def bench_users(results: Dict, user_counts: List[int], repeat: int, rng: random.Random):
+    for user_count in user_counts:
+        database = EncryptedDatabase(db_directory=os.path.join("encrypted_data", str(user_count)),
+                                     encryption_key_file=os.path.join("keys", "db_key.key"))
+        database.initialize()
+        database._write_table("users", make_users_table(user_count))
+        emails = [f"student{user_id}@school.edu.ph" for user_id in range(1, user_count + 1)]
+        # Rewriting the whole table is the expensive part, so fewer rounds for big tables
+        write_repeat = max(3, min(repeat, repeat * 1000 // user_count))
+        size = f"{user_count // 1000}k" if user_count >= 1000 else str(user_count)
+
+        database.get_user_by_email(emails[0])
+        results[f"users get cached {size}"] = reporting.summarize(
+            measure(lambda: database.get_user_by_email(rng.choice(emails)), repeat))
+        results[f"users get cold {size}"] = reporting.summarize(
+            measure(lambda: database.get_user_by_email(rng.choice(emails)), write_repeat, setup=database.clear_cache))
+        results[f"users create {size}"] = reporting.summarize(
+            measure(lambda: database.create_user("Bench User", 20, f"new{rng.random()}@bench.local", "hash"),
+                    write_repeat))
+        results[f"users update password {size}"] = reporting.summarize(
+            measure(lambda: database.update_user_password(rng.choice(emails), "hash"), write_repeat))
+
+def bench_archiver(results: Dict, scale: int, repeat: int):
+    board = scaled_board(scale)
+
+    archive_dir = os.path.join("static", "data", "archives")
+
+    def reset():
+        shutil.rmtree(archive_dir, ignore_errors=True)
+        os.makedirs(archive_dir)
+        save_board(DATA_FILE, board, codec=None)
+
+    reset()
+    # Importing the archiver runs one check straight away (the warm-up round)
+    archiver = importlib.import_module("auto-delete_expired")
+    rounds = max(3, repeat // 20)
+    results[f"archiver run x{scale}"] = reporting.summarize(
+        measure(archiver.check_and_archive_expired_announcements, rounds, setup=reset))
+    # The archiver reports failures instead of raising, so check the last round did its job
+    if not os.path.exists(os.path.join(archive_dir, "manifest.json")):
+        raise SystemExit("❌ The archiver run failed; see the messages above")
+
+COMMENT_WORDS = ("the", "enrollment", "schedule", "is", "posted", "on", "board", "thanks", "class",
+                 "assignment", "grass", "assessment", "passing", "hello", "campus", "library", "sh1t")
+
+def make_comment(length: int, rng: random.Random) -> str:
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(rng.choice(COMMENT_WORDS))
+    return " ".join(words)[:length]
+
+def bench_moderation(results: Dict, repeat: int, rng: random.Random):
+    engine = ModerationEngine()
+    engine.compile()
+    for length in (80, 1000):
+        comments = [make_comment(length, rng) for _ in range(50)]
+        results[f"moderation check {length} chars"] = reporting.summarize(
+            measure(lambda: engine.contains_profanity(rng.choice(comments)), repeat))
+    comments = [make_comment(80, rng) for _ in range(50)]
+    results["moderation censor 80 chars"] = reporting.summarize(
+        measure(lambda: engine.censor(rng.choice(comments)), repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--scale", type=int, default=10, help="Copies of the sample board to load and archive")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--only", nargs="+", choices=["board", "users", "archiver", "moderation"])
+    reporting.add_baseline_arguments(parser, default_tolerance=0.25)
+    args = parser.parse_args()
+    for option in ("save_baseline", "baseline"):
+        if getattr(args, option):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+
+    groups = args.only or ["board", "users", "archiver", "moderation"]
+    rng = random.Random(42)
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix="board-bench-")
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        if "board" in groups:
+            bench_board(results, args.scale, args.repeat, rng)
+        if "users" in groups:
+            bench_users(results, args.users, args.repeat, rng)
+        if "archiver" in groups:
+            bench_archiver(results, args.scale, args.repeat)
+        if "moderation" in groups:
+            bench_moderation(results, args.repeat, rng)
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    settings = {"users": args.users, "scale": args.scale, "repeat": args.repeat, "only": groups}
+    reporting.finish(args, results, settings)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Comment check time of the compiled matcher (moderation.py) against better_profanity.
+
+    python benchmarks/moderation.py [--lengths 80 1000 10000] [--repeat 20]
+
+Also reports how often the two disagree on a set of sample comments.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from better_profanity import profanity
+from moderation import ModerationEngine
+
+CLEAN_WORDS = ("the", "enrollment", "schedule", "is", "posted", "on", "board", "thanks", "class",
+               "assignment", "grass", "shell", "assessment", "passing", "hello", "campus", "library")
+DIRTY_WORDS = ("fuck", "sh1t", "a$$", "f*ck", "b1tch", "damn")
+
+def make_comment(length: int, rng: random.Random, dirty: bool) -> str:
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(rng.choice(CLEAN_WORDS))
+    if dirty:
+        words[rng.randrange(len(words))] = rng.choice(DIRTY_WORDS)
+    return " ".join(words)[:max(length, 1)]
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[80, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    started = time.perf_counter()
+    engine = ModerationEngine()
+    engine.compile()
+    print(f"compile: {(time.perf_counter() - started) * 1000:.0f} ms")
+    profanity.load_censor_words()
+
+    print(f"{'chars':>7}  {'better_profanity ms':>20} {'compiled ms':>12} {'speedup':>8}")
+    for length in args.lengths:
+        comment = make_comment(length, rng, dirty=False)
+        library_ms = timed(lambda: profanity.contains_profanity(comment), args.repeat)
+        engine_ms = timed(lambda: engine.contains_profanity(comment), args.repeat)
+        print(f"{length:>7}  {library_ms:>20.3f} {engine_ms:>12.3f} {library_ms / engine_ms:>7.0f}x")
+
+    samples = [make_comment(rng.choice((20, 80, 200)), rng, dirty=rng.random() < 0.3) for _ in range(500)]
+    disagreements = [text for text in samples
+                     if profanity.contains_profanity(text) != engine.contains_profanity(text)]
+    print(f"disagreements on {len(samples)} sample comments: {len(disagreements)}")
+    for text in disagreements[:5]:
+        print(f"  {text!r}: better_profanity={profanity.contains_profanity(text)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Percentiles, result tables and baseline comparison shared by micro.py and load_test.py.
+
+Results are {name: {"count", "errors", "throughput", "p50", "p95", "p99"}} with times
+in milliseconds. --save-baseline writes them to a JSON file; --baseline compares a
+run with it and the script exits with status 1 when anything got slower than the
+tolerance allows, so a CI job or a pre-deploy check can catch regressions.
+"""
+
+import json
+import math
+import os
+import platform
+import sys
+from typing import Dict, List, Optional
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies_ms: List[float], errors: int = 0, elapsed: Optional[float] = None) -> Dict:
+    """count, errors, throughput (per second of elapsed, or of summed latency) and p50/p95/p99"""
+    values = sorted(latencies_ms)
+    busy_seconds = elapsed if elapsed else sum(values) / 1000
+    return {
+        "count": len(values),
+        "errors": errors,
+        "throughput": round(len(values) / busy_seconds, 1) if busy_seconds else 0.0,
+        "p50": round(percentile(values, 0.50), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "p99": round(percentile(values, 0.99), 3)
+    }
+
+def print_table(results: Dict[str, Dict], baseline: Optional[Dict] = None):
+    width = max([len(name) for name in results] + [10])
+    print(f"{'benchmark':<{width}}  {'count':>7} {'errors':>6} {'per sec':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in results.items():
+        line = (f"{name:<{width}}  {row['count']:>7} {row['errors']:>6} {row['throughput']:>9.1f} "
+                f"{row['p50']:>9.3f} {row['p95']:>9.3f} {row['p99']:>9.3f}")
+        previous = (baseline or {}).get(name)
+        if previous and previous.get("p95"):
+            line += f"   (p95 {row['p95'] / previous['p95']:.0%} of baseline)"
+        print(line)
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+def save_baseline(path: str, results: Dict[str, Dict], settings: Dict):
+    with open(path, "w") as file:
+        json.dump({"environment": environment(), "settings": settings, "results": results}, file, indent=2)
+    print(f"📏 Baseline saved to {path}")
+
+def load_baseline(path: str) -> Dict:
+    with open(path, "r") as file:
+        return json.load(file)
+
+def find_regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Benchmarks whose p95 grew, throughput fell or error count rose beyond tolerance"""
+    regressions = []
+    for name, row in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous["p95"] and row["p95"] > previous["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95']:.3f} -> {row['p95']:.3f} ms")
+        if previous["throughput"] and row["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput']:.1f} -> {row['throughput']:.1f}/s")
+        if row["errors"] > previous["errors"] and row["errors"] > row["count"] * tolerance / 10:
+            regressions.append(f"{name}: errors {previous['errors']} -> {row['errors']}")
+    return regressions
+
+def add_baseline_arguments(parser, default_tolerance: float):
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write the results to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare with FILE and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=default_tolerance,
+                        help=f"Allowed slowdown before a result counts as a regression (default {default_tolerance})")
+
+def finish(args, results: Dict[str, Dict], settings: Dict):
+    """Print the table, then save and/or compare baselines as the arguments ask"""
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    if baseline and baseline.get("settings") != settings:
+        print(f"⚠️ Baseline was recorded with different settings: {baseline.get('settings')}")
+    print_table(results, baseline["results"] if baseline else None)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, settings)
+    if baseline:
+        regressions = find_regressions(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
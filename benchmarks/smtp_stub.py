@@ -0,0 +1,113 @@
+"""
+A minimal SMTP server that accepts every message and keeps nothing but a count.
+
+The load test starts one and points the app at it (SMTP_HOST, SMTP_PORT,
+SMTP_STARTTLS=false) so verification emails are really sent over a socket without
+reaching Gmail. It can also run alone for manual testing:
+
+    python benchmarks/smtp_stub.py [--port 8025] [--delay-ms 0]
+
+--delay-ms holds every reply back to imitate a slow provider.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+
+class SMTPStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay_ms: float = 0):
+        self.host = host
+        self.port = port
+        self.delay_ms = delay_ms
+        self.messages = 0
+        self.recipients: List[str] = []
+        self.delivery_times: List[float] = []  # Seconds from MAIL FROM to the end of DATA
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> int:
+        """Start listening; returns the port (a free one when port=0)"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str):
+        if self.delay_ms:
+            await asyncio.sleep(self.delay_ms / 1000)
+        writer.write(f"{line}\r\n".encode())
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        recipients = []
+        started = None
+        try:
+            await self._reply(writer, "220 smtp-stub ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    writer.write(b"250-smtp-stub\r\n250-AUTH PLAIN LOGIN\r\n")
+                    await self._reply(writer, "250 8BITMIME")
+                elif verb == "HELO":
+                    await self._reply(writer, "250 smtp-stub")
+                elif verb == "AUTH":
+                    await self._reply(writer, "235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    started = time.perf_counter()
+                    recipients = []
+                    await self._reply(writer, "250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.split(":", 1)[-1].strip(" <>"))
+                    await self._reply(writer, "250 OK")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        pass
+                    self.messages += 1
+                    self.recipients.extend(recipients)
+                    if started is not None:
+                        self.delivery_times.append(time.perf_counter() - started)
+                    await self._reply(writer, "250 OK: queued")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    break
+                elif verb in ("RSET", "NOOP"):
+                    await self._reply(writer, "250 OK")
+                else:
+                    await self._reply(writer, "502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(port: int, delay_ms: float):
+    stub = SMTPStub(port=port, delay_ms=delay_ms)
+    print(f"📮 SMTP stub listening on {stub.host}:{await stub.start()}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(f"📮 {stub.messages} message(s) received")
+    finally:
+        await stub.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--delay-ms", type=float, default=0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, args.delay_ms))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
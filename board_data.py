@@ -0,0 +1,201 @@
+"""
+Board files (data.json, feedback.json) with an optional compact binary copy.
+
+With BOARD_FORMAT=msgpack (and msgpack installed) the server reads each board file
+from a <name>.msgpack copy instead of parsing the JSON:
+- sorting dates are stored as day numbers, so they come back already parsed
+  (see sorting_day) and as one shared string per distinct date;
+- field and section names come back interned (msgpack does this for map keys), so
+  every record shares the same key strings.
+
+The JSON file is still rewritten on every change, as the view the browser scripts
+fetch and people edit by hand. If it changes behind the server's back, the next
+load imports it into the compact copy.
+
+Every function takes an optional codec (see records.py) that turns the plain data
+into records after loading and back before saving; the cache then holds the records.
+A process should always use the same codec for a given file.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Callable, Dict
+from metrics import board_file_seconds
+from profiling import span
+from serialization import msgpack
+from shared_state import (atomic_write_bytes, file_lock, file_signature, invalidate,
+                          load_cached, load_json, read_json, save_json)
+
+logger = logging.getLogger(__name__)
+
+COMPACT_VERSION = 1
+SORTING_DATE_FORMAT = "%m/%d/%Y"
+EXT_SORTING_DATE = 1
+
+def _compact_enabled() -> bool:
+    requested = os.environ.get("BOARD_FORMAT", "json").lower() == "msgpack"
+    if requested and msgpack is None:
+        logger.warning("⚠️ BOARD_FORMAT=msgpack but msgpack is not installed, using data.json directly")
+    return requested and msgpack is not None
+
+COMPACT = _compact_enabled()
+
+# Dates already parsed in this process: their string form -> date
+_parsed_days: Dict[str, date] = {}
+_day_strings: Dict[int, str] = {}
+
+def sorting_day(value: str) -> date:
+    """The date of a "%m/%d/%Y" sorting_date, parsed at most once per distinct value"""
+    day = _parsed_days.get(value)
+    if day is None:
+        day = datetime.strptime(value, SORTING_DATE_FORMAT).date()
+        if len(_parsed_days) > 10000:
+            _parsed_days.clear()
+        _parsed_days[value] = day
+    return day
+
+def compact_path(json_path: str) -> str:
+    return f"{os.path.splitext(json_path)[0]}.msgpack"
+
+# Encoding
+def _encode_value(value: Any, key: str = None) -> Any:
+    if isinstance(value, dict):
+        return {name: _encode_value(item, name) for name, item in value.items()}
+    if isinstance(value, list):
+        return [_encode_value(item) for item in value]
+    if key == "sorting_date" and isinstance(value, str):
+        try:
+            ordinal = sorting_day(value).toordinal()
+        except ValueError:
+            return value
+        return msgpack.ExtType(EXT_SORTING_DATE, ordinal.to_bytes(4, "big"))
+    return value
+
+def _ext_hook(code: int, payload: bytes):
+    if code != EXT_SORTING_DATE:
+        return msgpack.ExtType(code, payload)
+    ordinal = int.from_bytes(payload, "big")
+    text = _day_strings.get(ordinal)
+    if text is None:
+        day = date.fromordinal(ordinal)
+        text = sys.intern(day.strftime(SORTING_DATE_FORMAT))
+        _day_strings[ordinal] = text
+        _parsed_days[text] = day
+    return text
+
+def encode(data: Any, json_signature=None) -> bytes:
+    return msgpack.packb([COMPACT_VERSION, list(json_signature or ()), _encode_value(data)], use_bin_type=True)
+
+def decode(payload: bytes):
+    """Return (json_signature, data)"""
+    version, json_signature, data = msgpack.unpackb(
+        payload, raw=False, ext_hook=_ext_hook, strict_map_key=False
+    )
+    if version != COMPACT_VERSION:
+        raise ValueError(f"Unsupported board file version {version}")
+    return tuple(json_signature), data
+
+def _read_compact(path: str):
+    with board_file_seconds.time(file=os.path.basename(path), operation="load"):
+        with open(path, "rb") as file:
+            return decode(file.read())
+
+def _write_compact(json_path: str, data: Any):
+    path = compact_path(json_path)
+    with board_file_seconds.time(file=os.path.basename(path), operation="save"):
+        # Remember which JSON view this copy matches so hand edits can be detected
+        atomic_write_bytes(path, encode(data, file_signature(json_path)))
+    invalidate(path)
+
+def _parse(data: Any, codec) -> Any:
+    return codec.parse(data) if codec else data
+
+def _parsed_reader(codec):
+    if not codec:
+        return _read_compact
+    def read(path: str):
+        json_signature, data = _read_compact(path)
+        return json_signature, codec.parse(data)
+    return read
+
+# Reading and writing
+def _import_json_locked(json_path: str):
+    """(Re)build the compact copy from the JSON view; the caller holds the file lock"""
+    data = read_json(json_path)
+    _write_compact(json_path, data)
+    return data
+
+def _compact_is_current(json_path: str, codec=None):
+    """The cached compact copy, or None when it is missing or older than the JSON view"""
+    path = compact_path(json_path)
+    if not os.path.exists(path):
+        return None
+    json_signature, data = load_cached(path, _parsed_reader(codec))
+    if json_signature != file_signature(json_path):
+        return None
+    return data
+
+def load_board(json_path: str, codec=None) -> Any:
+    """The board file's data, parsed only when it changed (shared: treat it as read-only)"""
+    if not COMPACT:
+        if not codec:
+            return load_json(json_path)
+        return load_cached(json_path, lambda path: codec.parse(read_json(path)))
+
+    data = _compact_is_current(json_path, codec)
+    if data is None:
+        with file_lock(json_path):
+            data = _compact_is_current(json_path, codec)
+            if data is None:
+                _import_json_locked(json_path)
+                data = load_cached(compact_path(json_path), _parsed_reader(codec))[1]
+    return data
+
+def save_board(json_path: str, data: Any, indent: int = 2, codec=None):
+    """Write the JSON view and, in compact mode, the compact copy (callers should hold the lock)"""
+    with span("file write"):
+        if codec:
+            data = codec.dump(data)
+        save_json(json_path, data, indent=indent)
+        if COMPACT:
+            _write_compact(json_path, data)
+
+def read_board(json_path: str, codec=None) -> Any:
+    """A fresh, mutable copy of the board file's data (callers should hold the lock)"""
+    if not COMPACT:
+        return _parse(read_json(json_path), codec)
+    path = compact_path(json_path)
+    if os.path.exists(path):
+        json_signature, data = _read_compact(path)
+        if json_signature == file_signature(json_path):
+            return _parse(data, codec)
+    return _parse(_import_json_locked(json_path), codec)
+
+@contextmanager
+def update_board(json_path: str, indent: int = 2, codec=None):
+    """
+    Read-modify-write a board file under an exclusive cross-process lock.
+
+    The data is written back when the block exits normally; raising inside the block
+    leaves the files untouched.
+    """
+    with file_lock(json_path):
+        data = read_board(json_path, codec)
+        yield data
+        save_board(json_path, data, indent=indent, codec=codec)
+
+async def change_board(json_path: str, change: Callable[[Any], Any], indent: int = 2, codec=None) -> Any:
+    """
+    Run change(data) inside update_board in a worker thread and return its result.
+
+    Waiting for the lock (the archiver or the comment queue may hold it for a while)
+    then never blocks the event loop; raising inside change leaves the files untouched.
+    """
+    def run():
+        with update_board(json_path, indent=indent, codec=codec) as data:
+            return change(data)
+    return await asyncio.to_thread(run)
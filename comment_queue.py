@@ -0,0 +1,162 @@
+"""
+Asynchronous comment moderation (COMMENT_MODERATION_MODE=async).
+
+Instead of checking and saving each comment while its request waits, add_comment
+queues it as pending and answers straight away. A background task collects the
+comments that arrive together, checks them against the moderation word list and
+publishes the accepted ones to data.json in a single write, so a burst of comments
+costs one file rewrite instead of one per comment.
+
+Pending comments live in the worker's memory until they're published: the queue is
+flushed by the lifecycle drain hook when the board closes and on shutdown. When the
+queue is full, add_comment falls back to the synchronous path.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import List, Tuple
+from board_data import update_board
+from moderation import moderator
+from records import ANNOUNCEMENTS, Comment, find_announcement
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between retries of a batch whose write failed
+MAX_RETRY_DELAY = 30.0
+
+class CommentQueue:
+    def __init__(self, data_file: str, engine, enabled: bool = False, flush_size: int = 50,
+                 max_delay: float = 0.5, max_pending: int = 10000):
+        self.data_file = data_file
+        self.engine = engine
+        self.enabled = enabled
+        self.flush_size = flush_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+
+        self._pending: List[Tuple[int, Comment]] = []
+        self._lock = threading.Lock()
+        # Only one batch is checked and written at a time
+        self._flush_lock = threading.Lock()
+        self._wake = None
+        self._task = None
+
+        self.published = 0
+        self.rejected = 0
+        self.batches = 0
+        # Failed writes in a row; the worker backs off and retries while it's above 0
+        self.failed_writes = 0
+
+    def submit(self, announcement_id: int, comment: Comment) -> bool:
+        """Queue a comment; False when the queue is full (handle it synchronously instead)"""
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                return False
+            self._pending.append((announcement_id, comment))
+        if self._wake is not None:
+            self._wake.set()
+        return True
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Check and publish everything pending in one write; returns how many were published"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            accepted = []
+            for announcement_id, comment in batch:
+                if self.engine.contains_profanity(comment.comment):
+                    self.rejected += 1
+                    logger.info("🚫 Rejected comment from %s on announcement %s", comment.email, announcement_id)
+                else:
+                    accepted.append((announcement_id, comment))
+
+            published = 0
+            if accepted:
+                try:
+                    with update_board(self.data_file, codec=ANNOUNCEMENTS) as announcement_data:
+                        for announcement_id, comment in accepted:
+                            announcement = find_announcement(announcement_data, announcement_id)
+                            if announcement is None:
+                                logger.warning("⚠️ Dropped comment on missing announcement %s", announcement_id)
+                                continue
+                            announcement.add_comment(comment)
+                            published += 1
+                except Exception as e:
+                    # Put the batch back so the next flush retries it
+                    with self._lock:
+                        self._pending[:0] = accepted
+                    self.failed_writes += 1
+                    logger.error("Error publishing comments: %s", e)
+                    return 0
+
+            self.failed_writes = 0
+            self.published += published
+            self.batches += 1
+            logger.info("💬 Published %d of %d comment(s) in %.0f ms", published, len(batch),
+                        (time.perf_counter() - started) * 1000)
+            return published
+
+    async def run(self):
+        while True:
+            await self._wake.wait()
+            # Give a burst a moment to gather into one batch unless it's already big
+            if len(self._pending) < self.flush_size:
+                await asyncio.sleep(self.max_delay)
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error("Error in comment queue: %s", e)
+            if self.failed_writes and self._pending:
+                # Retry the batch that was put back even if no new comment arrives
+                await asyncio.sleep(min(self.max_delay * 2 ** self.failed_writes, MAX_RETRY_DELAY))
+                self._wake.set()
+
+    def start(self):
+        """Start the background worker (call from inside the running event loop)"""
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        self._wake = asyncio.Event()
+        if self._pending:
+            self._wake.set()
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        """Stop the worker and publish whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict:
+        return {
+            "mode": "async" if self.enabled else "sync",
+            "pending": self.pending_count(),
+            "published": self.published,
+            "rejected": self.rejected,
+            "batches": self.batches
+        }
+
+# Global instance for easy access
+comment_queue = CommentQueue(
+    os.path.join("static", "data", "data.json"),
+    moderator,
+    enabled=os.environ.get("COMMENT_MODERATION_MODE", "sync").lower() == "async",
+    flush_size=int(os.environ.get("COMMENT_FLUSH_SIZE", "50")),
+    max_delay=float(os.environ.get("COMMENT_FLUSH_DELAY_SECONDS", "0.5")),
+    max_pending=int(os.environ.get("COMMENT_MAX_PENDING", "10000"))
+)
@@ -1,23 +1,48 @@
-import json
+import logging
 import os
 from cryptography.fernet import Fernet
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-import hashlib
+from typing import Dict, List, Optional, Tuple
+import threading
+import passwords
+import serialization
+from metrics import cache_lookup, encrypted_table_seconds
+from shared_state import atomic_write_bytes, file_lock, file_signature
+
+logger = logging.getLogger(__name__)
 
 class EncryptedDatabase:
-    def __init__(self, db_directory: str = "encrypted_data", encryption_key_file: str = "super_secret_stuff/db_key.key"):
+    def __init__(self, db_directory: str = "encrypted_data", encryption_key_file: str = "super_secret_stuff/db_key.key",
+                 payload_format: str = None):
         self.db_directory = db_directory
         self.encryption_key_file = encryption_key_file
+        self.payload_format = payload_format or serialization.PAYLOAD_FORMAT
         
         # Create directories if they don't exist
         os.makedirs(db_directory, exist_ok=True)
         os.makedirs(os.path.dirname(encryption_key_file), exist_ok=True)
         
-        # Initialize encryption
-        self.cipher = self._get_or_create_cipher()
+        # The key is loaded and the tables are created on first use, not at import
+        self._cipher = None
+        self._initialized = False
+        self._setup_lock = threading.RLock()
         
-        # Initialize database files
+        # Decrypted tables cached per process, keyed by the file's on-disk signature so a
+        # write from any worker process invalidates them
+        self._table_cache = {}
+    
+    @property
+    def cipher(self) -> Fernet:
+        if self._cipher is None:
+            with self._setup_lock:
+                if self._cipher is None:
+                    self._cipher = self._get_or_create_cipher()
+        return self._cipher
+    
+    def initialize(self):
+        """Create the key and any missing tables now instead of on first use"""
+        if self._initialized:
+            return
         self._initialize_database()
     
     def _get_or_create_cipher(self) -> Fernet:
@@ -38,16 +63,22 @@ class EncryptedDatabase:
     
     def _encrypt_data(self, data: Dict) -> bytes:
         """Encrypt data to bytes"""
-        json_data = json.dumps(data, indent=2)
-        return self.cipher.encrypt(json_data.encode())
+        # Compact JSON or msgpack: less to encrypt, base64-encode and parse than indented JSON
+        with encrypted_table_seconds.time(operation="encrypt"):
+            return self.cipher.encrypt(serialization.dumps(data, self.payload_format))
     
     def _decrypt_data(self, encrypted_data: bytes) -> Dict:
         """Decrypt bytes to data"""
-        decrypted_data = self.cipher.decrypt(encrypted_data)
-        return json.loads(decrypted_data.decode())
+        with encrypted_table_seconds.time(operation="decrypt"):
+            decrypted_data = self.cipher.decrypt(encrypted_data)
+            return serialization.loads(decrypted_data)
     
     def _read_table(self, table_name: str) -> Dict:
         """Read and decrypt a table file"""
+        self.initialize()
+        return self._load_table(table_name)
+    
+    def _load_table(self, table_name: str) -> Dict:
         file_path = self._get_db_file_path(table_name)
         if not os.path.exists(file_path):
             return {"records": [], "auto_increment": 1}
@@ -56,18 +87,54 @@ class EncryptedDatabase:
             encrypted_data = file.read()
             return self._decrypt_data(encrypted_data)
     
+    def _read_table_cached(self, table_name: str) -> Tuple[Dict, Dict]:
+        """
+        Read a table through the per-process cache.
+        
+        Returns the table and its records keyed by email; both are shared, so treat
+        them as read-only and use _read_table for anything that gets modified.
+        """
+        signature = file_signature(self._get_db_file_path(table_name))
+        cached = self._table_cache.get(table_name)
+        if cached and signature and cached[0] == signature:
+            cache_lookup("encrypted_tables", True)
+            return cached[1], cached[2]
+        
+        cache_lookup("encrypted_tables", False)
+        table_data = self._read_table(table_name)
+        by_email = {record.get("email"): record for record in table_data.get("records", [])}
+        if signature:
+            self._table_cache[table_name] = (signature, table_data, by_email)
+        return table_data, by_email
+    
     def _write_table(self, table_name: str, data: Dict):
         """Encrypt and write a table file"""
+        self.initialize()
+        self._store_table(table_name, data)
+    
+    def _store_table(self, table_name: str, data: Dict):
         file_path = self._get_db_file_path(table_name)
         encrypted_data = self._encrypt_data(data)
         
-        with open(file_path, 'wb') as file:
-            file.write(encrypted_data)
+        # Replace the file atomically so other processes never read half a table
+        atomic_write_bytes(file_path, encrypted_data)
+        self._table_cache.pop(table_name, None)
+    
+    def _table_lock(self, table_name: str):
+        """Exclusive lock for read-modify-write of a table, shared by all worker processes"""
+        return file_lock(self._get_db_file_path(table_name))
     
     def _initialize_database(self):
         """Initialize database tables if they don't exist"""
-        # Initialize users table
-        users_data = self._read_table("users")
+        # The same lock order as the writers (the table's file lock first), and the flag
+        # is only set once the table exists
+        with self._table_lock("users"):
+            if not self._initialized:
+                self._initialize_users_table()
+                self._initialized = True
+    
+    def _initialize_users_table(self):
+        users_data = self._load_table("users")
         if not users_data.get("records"):
             users_data = {
                 "records": [],
@@ -81,90 +148,100 @@ class EncryptedDatabase:
                     "created_at": "datetime"
                 }
             }
-            self._write_table("users", users_data)
+            self._store_table("users", users_data)
     
     # User management methods
     def create_user(self, full_name: str, age: int, email: str, password: str) -> bool:
         """Create a new user"""
         try:
-            users_data = self._read_table("users")
-            
-            # Check if email already exists
-            for user in users_data["records"]:
-                if user["email"] == email:
-                    return False
-            
-            # Create new user
-            user_id = users_data["auto_increment"]
-            new_user = {
-                "id": user_id,
-                "full_name": full_name,
-                "age": age,
-                "email": email,
-                "password": password,  # Should already be hashed
-                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            
-            users_data["records"].append(new_user)
-            users_data["auto_increment"] += 1
-            
-            self._write_table("users", users_data)
+            with self._table_lock("users"):
+                users_data = self._read_table("users")
+                
+                # Check if email already exists
+                for user in users_data["records"]:
+                    if user["email"] == email:
+                        return False
+                
+                # Create new user
+                user_id = users_data["auto_increment"]
+                new_user = {
+                    "id": user_id,
+                    "full_name": full_name,
+                    "age": age,
+                    "email": email,
+                    "password": password,  # Should already be hashed
+                    "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                
+                users_data["records"].append(new_user)
+                users_data["auto_increment"] += 1
+                
+                self._write_table("users", users_data)
             return True
         except Exception as e:
-            print(f"Error creating user: {e}")
+            logger.error("Error creating user: %s", e)
             return False
     
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user by email"""
         try:
-            users_data = self._read_table("users")
-            for user in users_data["records"]:
-                if user["email"] == email:
-                    return user
-            return None
+            _, users_by_email = self._read_table_cached("users")
+            user = users_by_email.get(email)
+            return dict(user) if user else None
         except Exception as e:
-            print(f"Error getting user: {e}")
+            logger.error("Error getting user: %s", e)
             return None
     
     def update_user_password(self, email: str, new_password: str) -> bool:
         """Update user password"""
         try:
-            users_data = self._read_table("users")
-            for user in users_data["records"]:
-                if user["email"] == email:
-                    user["password"] = new_password  # Should already be hashed
-                    user["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    self._write_table("users", users_data)
-                    return True
+            with self._table_lock("users"):
+                users_data = self._read_table("users")
+                for user in users_data["records"]:
+                    if user["email"] == email:
+                        user["password"] = new_password  # Should already be hashed
+                        user["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        self._write_table("users", users_data)
+                        return True
             return False
         except Exception as e:
-            print(f"Error updating password: {e}")
+            logger.error("Error updating password: %s", e)
             return False
     
     def get_all_users(self) -> List[Dict]:
         """Get all users"""
         try:
-            users_data = self._read_table("users")
-            return users_data["records"]
+            users_data, _ = self._read_table_cached("users")
+            return [dict(user) for user in users_data["records"]]
         except Exception as e:
-            print(f"Error getting all users: {e}")
+            logger.error("Error getting all users: %s", e)
             return []
     
     def delete_user(self, email: str) -> bool:
         """Delete user by email"""
         try:
-            users_data = self._read_table("users")
-            users_data["records"] = [user for user in users_data["records"] if user["email"] != email]
-            self._write_table("users", users_data)
+            with self._table_lock("users"):
+                users_data = self._read_table("users")
+                users_data["records"] = [user for user in users_data["records"] if user["email"] != email]
+                self._write_table("users", users_data)
             return True
         except Exception as e:
-            print(f"Error deleting user: {e}")
+            logger.error("Error deleting user: %s", e)
             return False
     
     # Utility methods
+    def warm_cache(self, table_name: str = "users"):
+        """Decrypt a table into the per-process cache ahead of the first request"""
+        self._read_table_cached(table_name)
+    
+    def clear_cache(self):
+        """Drop decrypted tables from memory (they are re-read on next use)"""
+        self._table_cache.clear()
+    
     def backup_database(self, backup_path: str):
         """Create a backup of the entire database"""
         try:
+            self.initialize()
             os.makedirs(backup_path, exist_ok=True)
             
             # Copy all encrypted files
@@ -181,13 +258,14 @@ class EncryptedDatabase:
                 with open(self.encryption_key_file, 'rb') as src, open(key_backup, 'wb') as dst:
                     dst.write(src.read())
             
-            print(f"Database backed up to {backup_path}")
+            logger.info("Database backed up to %s", backup_path)
         except Exception as e:
-            print(f"Error backing up database: {e}")
+            logger.error("Error backing up database: %s", e)
     
     def get_database_stats(self) -> Dict:
         """Get statistics about the database"""
         try:
+            self.initialize()
             stats = {}
             for filename in os.listdir(self.db_directory):
                 if filename.endswith('.enc'):
@@ -199,10 +277,10 @@ class EncryptedDatabase:
                     }
             return stats
         except Exception as e:
-            print(f"Error getting database stats: {e}")
+            logger.error("Error getting database stats: %s", e)
             return {}
 
 # Helper functions to maintain compatibility with existing code
 def hash_password(password: str) -> str:
-    """Hash password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash password with scrypt (see passwords.py)"""
+    return passwords.hash_password(password)
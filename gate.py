@@ -0,0 +1,146 @@
+"""
+The front door of the app: one pure ASGI middleware in front of everything else.
+
+For every HTTP request, in order, it:
+
+1. starts the request's metrics timer and (when switched on) its profile;
+2. rejects hosts outside ALLOWED_HOSTS with 400, as TrustedHostMiddleware did;
+3. serves /static/... straight from StaticFiles, skipping the session, CORS and
+   routing layers (static files are also served while the board is closed);
+4. answers with the maintenance page outside the runtime window, except for
+   /health, /metrics, /favicon.ico and submissions still allowed by the drain grace;
+5. counts the request as in flight for the lifecycle drain while the app handles it.
+
+Every request gets a request id (log records carry it, and so does the response's
+X-Request-ID header) and an access log record with its status and duration.
+
+Unlike @app.middleware("http") (BaseHTTPMiddleware) it doesn't wrap the response in
+a stream and an extra task, so the response goes straight back to the server.
+"""
+
+import time
+from typing import Iterable
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import PlainTextResponse
+from log_config import log_request, new_request_id, request_id_var
+from metrics import http_latency, http_requests
+from profiling import profiler
+
+STATIC_PREFIX = "/static"
+# Answered even while the board is closed
+ALWAYS_OPEN_PATHS = frozenset(("/health", "/metrics", "/favicon.ico"))
+# Route label of the planned 503 answered while the board is closed
+MAINTENANCE_ROUTE = "maintenance"
+
+class GateMiddleware:
+    def __init__(self, app, scheduler, lifecycle, maintenance_response, allowed_hosts: Iterable[str] = ("*",),
+                 static_app=None):
+        self.app = app
+        self.scheduler = scheduler
+        self.lifecycle = lifecycle
+        self.maintenance_response = maintenance_response
+        self.static_app = static_app
+
+        hosts = [host.strip() for host in allowed_hosts if host.strip()]
+        self.allow_any_host = "*" in hosts
+        self.exact_hosts = frozenset(host for host in hosts if not host.startswith("*"))
+        # "*.railway.app" matches any host ending in ".railway.app"
+        self.host_suffixes = tuple(host[1:] for host in hosts if host.startswith("*") and host != "*")
+
+    @staticmethod
+    def request_id(scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                return new_request_id(value.decode("latin-1"))
+        return new_request_id()
+
+    def host_allowed(self, scope) -> bool:
+        if self.allow_any_host:
+            return True
+        host = Headers(scope=scope).get("host", "").split(":")[0]
+        return host in self.exact_hosts or (bool(self.host_suffixes) and host.endswith(self.host_suffixes))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            if scope["type"] == "websocket" and not self.host_allowed(scope):
+                await send({"type": "websocket.close", "code": 1008})
+                return
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        # None unless profiling is switched on (PROFILING_ENABLED or /debug/profiling)
+        profile = profiler.begin(method, path)
+        request_id = self.request_id(scope)
+        context_token = request_id_var.set(request_id)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = dict(message, headers=[*message.get("headers", ()),
+                                                 (b"x-request-id", request_id.encode("latin-1"))])
+            await send(message)
+
+        maintenance = False
+        try:
+            maintenance = await self.handle(scope, receive, send_with_status, path)
+        finally:
+            duration = time.perf_counter() - started
+            route = MAINTENANCE_ROUTE if maintenance else self.route_label(scope)
+            http_requests.inc(method=method, route=route, status=status)
+            http_latency.observe(duration, method=method, route=route)
+            log_request(method, path, route, status, duration, maintenance=maintenance)
+            if profile is not None:
+                # The response is already sent; a kept profile is written in a thread
+                await profiler.finish(profile, route, status)
+            request_id_var.reset(context_token)
+
+    async def handle(self, scope, receive, send, path: str) -> bool:
+        """Answer the request; True when it got the maintenance page"""
+        if not self.host_allowed(scope):
+            await PlainTextResponse("Invalid host header", status_code=400)(scope, receive, send)
+            return False
+
+        if self.static_app is not None and path.startswith(STATIC_PREFIX + "/"):
+            # What the /static mount would pass on: the path below the mount point
+            static_scope = dict(scope, path=path[len(STATIC_PREFIX):],
+                                root_path=scope.get("root_path", "") + STATIC_PREFIX)
+            try:
+                await self.static_app(static_scope, receive, send)
+            except HTTPException:
+                # Missing file or wrong method: raised before anything was sent, so the
+                # app (through its /static mount) answers with its own error page
+                await self.app(scope, receive, send)
+            return False
+
+        if path in ALWAYS_OPEN_PATHS or path.startswith(STATIC_PREFIX):
+            await self.app(scope, receive, send)
+            return False
+
+        # Cached until the next open/close transition. Right after closing,
+        # submissions from flows already under way may still finish.
+        if not self.scheduler.is_runtime_allowed() and not self.lifecycle.accepts_after_close(scope["method"]):
+            await self.maintenance_response()(scope, receive, send)
+            return True
+
+        self.lifecycle.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.lifecycle.request_finished()
+        return False
+
+    @staticmethod
+    def route_label(scope) -> str:
+        """The route template ("/announcement/{announcement_id}"), so ids don't each get a series"""
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        if scope["path"].startswith(STATIC_PREFIX):
+            return STATIC_PREFIX
+        return "unmatched"
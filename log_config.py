@@ -0,0 +1,215 @@
+"""
+Server logging: structured records written from a background thread.
+
+configure_logging() (called once by main.py in every worker) puts a QueueHandler on
+the root logger, so code that logs only appends the record to a queue; a
+QueueListener thread formats it and writes it to stdout. Uvicorn's loggers go
+through the same queue, and the gate writes one access record per request (method,
+route, status, duration_ms) instead of uvicorn's access log.
+
+Records logged while a request is handled carry its request id: the X-Request-ID
+header when the client sent a usable one, otherwise a new one, which is also
+returned in the response's X-Request-ID header.
+
+Settings:
+
+- LOG_LEVEL: DEBUG, INFO (default; DEBUG when DEBUG=true), WARNING or ERROR;
+- LOG_FORMAT: "json" (default), one object per line, or "text" for a terminal;
+- LOG_SAMPLE_RATES: the share of high-volume events that is written, e.g.
+  "like=0.1,request=0.25" (default "like=0.1"). Warnings and errors are never dropped,
+  and sampled records carry their sample_rate so counts can be scaled back up;
+- LOG_SLOW_REQUEST_MS: slower requests are logged as warnings (default 1000).
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+DEBUG = os.environ.get("DEBUG", "False").lower() == "true"
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "DEBUG" if DEBUG else "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+LOG_SLOW_REQUEST_MS = float(os.environ.get("LOG_SLOW_REQUEST_MS", "1000"))
+
+# The id of the request being handled in this context (set by gate.py)
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+# Everything a LogRecord has by itself (plus uvicorn's color_message, a terminal copy of the
+# message); any other attribute came in through extra=
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "sample",
+                                                              "color_message"}
+
+access_logger = logging.getLogger("access")
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    rates = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+SAMPLE_RATES = parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", "like=0.1"))
+
+def new_request_id(header: Optional[str] = None) -> str:
+    """The client's X-Request-ID when it's a plain token, otherwise a new random id"""
+    if header and _REQUEST_ID.fullmatch(header):
+        return header
+    return secrets.token_hex(8)
+
+class RequestContextFilter(logging.Filter):
+    """Adds the current request id, in the thread that logs"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keeps a share of the records logged with extra={"sample": "<event>"}"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "sample", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(event, 1.0)
+        if rate >= 1.0:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, worker pid, message, request id and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRS:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+class StructuredQueueHandler(QueueHandler):
+    """A QueueHandler that keeps extra fields and the traceback apart from the message"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The arguments and the traceback can't wait for the listener thread: they may
+        # change or be gone by then. This is the root logger's only handler, so the
+        # record is changed in place instead of copied.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener: Optional[QueueListener] = None
+
+def configure_logging():
+    """Route all logging through the queue (safe to call more than once)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JSONFormatter())
+
+    records = queue.SimpleQueue()
+    handler = StructuredQueueHandler(records)
+    handler.addFilter(SamplingFilter(SAMPLE_RATES))
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    # Uvicorn's loggers write through the root handler too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers.clear()
+        logging.getLogger(name).propagate = True
+    # Client libraries are chatty below WARNING
+    for name in ("asyncio", "multipart", "httpx", "httpcore", "watchfiles"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    # Write out what's still queued when the process exits
+    atexit.register(stop_logging)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_log_directly_after_fork)
+
+def _log_directly_after_fork():
+    """A forked process (a hashing or moderation pool process) has the queue but not the listener thread"""
+    global _listener
+    if _listener is None:
+        return
+    output = _listener.handlers[0]
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, StructuredQueueHandler):
+            root.removeHandler(handler)
+            for log_filter in handler.filters:
+                output.addFilter(log_filter)
+    root.addHandler(output)
+    _listener = None
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log_request(method: str, path: str, route: str, status: int, duration: float, maintenance: bool = False):
+    """
+    The access record of a finished request; errors and slow requests are never sampled out.
+    The maintenance page's 503 is planned (the board is closed), so it isn't an error.
+    """
+    duration_ms = round(duration * 1000, 2)
+    if status >= 500 and not maintenance:
+        level = logging.ERROR
+    elif duration_ms >= LOG_SLOW_REQUEST_MS:
+        level = logging.WARNING
+    else:
+        level = logging.INFO
+    if access_logger.isEnabledFor(level):
+        access_logger.log(level, "%s %s %s", method, path, status, extra={
+            "sample": "request", "method": method, "path": path, "route": route, "status": status,
+            "duration_ms": duration_ms,
+        })
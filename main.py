@@ -1,61 +1,91 @@
+import time
+
+# Startup profile: import and setup phases are timed and reported once the app is serving
+_startup_started = time.perf_counter()
+
 from fastapi import FastAPI, Request, Depends, HTTPException, Form, Cookie
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from starlette.middleware.sessions import SessionMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from datetime import datetime
-from itsdangerous import URLSafeTimedSerializer
+from contextlib import asynccontextmanager
 
-import hashlib
 import uvicorn
 import logging
 import os
-import json
 import smtplib
 import random
 import asyncio
+import hmac
+from log_config import configure_logging
+
+# Before the modules below, so what they log while loading is queued too (see log_config.py)
+configure_logging()
+
 from encrypted_db import EncryptedDatabase
 from secure_config import secure_config
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from runtime_scheduler import check_runtime_allowed, scheduler
-
-# Rate limiting setup
-limiter = Limiter(key_func=get_remote_address)
+from runtime_scheduler import maintenance_response, scheduler
+from runtime_lifecycle import lifecycle
+from archive_store import archive_store
+from verification_store import verification_store
+from shared_state import invalidate, get_worker_count
+from board_data import change_board, load_board
+from records import ANNOUNCEMENTS, FEEDBACK, Comment, Feedback, find_announcement
+from rate_limiter import rate_limiter
+from passwords import password_hasher
+from moderation import moderator
+from comment_queue import comment_queue
+from sessions import RequestAuth, session_manager
+from metrics import metrics, track_smtp
+from profiling import profiler, span
+from gate import GateMiddleware
+from responses import FastJSONResponse
+
+_startup_marks = [("imports", time.perf_counter())]
+
+logger = logging.getLogger(__name__)
 
 # Production configuration
 DEBUG = os.environ.get("DEBUG", "False").lower() == "true"
+# /metrics and /debug/profiling need "Authorization: Bearer <token>"; without a token only local requests are allowed
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "development")
 ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "localhost,127.0.0.1,*.railway.app").split(",")
+# Outgoing mail; the load test points these at a local stub server
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "true").lower() == "true"
 
-# Load secure configuration (now encrypted!)
-email_config = secure_config.get_email_config()
-secret_keys = secure_config.get_secret_keys()
-
-# Email configuration (now from encrypted source)
-EMAIL_ADDRESS = email_config["email_sender"]
-EMAIL_PASSWORD = email_config["password"]
+# Multi-worker mode: WEB_CONCURRENCY=<n> or WEB_CONCURRENCY=auto (one worker per core)
+WORKERS = 1 if DEBUG else get_worker_count()
 
-# This is a dictionary that will store the verification codes for each email.
-VERIFICATION_CODES = {}
+# The encrypted configuration is decrypted on first use (the first email or session
+# token), not at import, so cold starts after each scheduled wake-up stay fast.
 
 # This has little to no use now because we're now using bootstrap for the frontend.
 # But it's still here because I don't know whether some files are still using it.
-version = f"{int(datetime.now().timestamp())}" + f"{random.randint(1, 1000)}"
+# It is derived from the static files rather than random so every worker agrees on it.
+def _asset_version():
+    latest_change = 0
+    for directory in ("static/js", "static/css"):
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                latest_change = max(latest_change, int(os.path.getmtime(os.path.join(directory, filename))))
+    return str(latest_change)
+
+version = os.environ.get("ASSET_VERSION") or _asset_version()
 
 # Sends verification codes to email address depending whether for resetting password or signing up.
 async def send_verification_email(to_email, code):
     try:
         msg = MIMEMultipart()
-        msg['From'] = EMAIL_ADDRESS
+        msg['From'] = secure_config.get_email_config()["email_sender"]
         msg['To'] = to_email
         msg['Subject'] = "Your Verification Code"
         body = f"Your verification code is {code}."
@@ -64,23 +94,35 @@ async def send_verification_email(to_email, code):
         # Run the SMTP operations in a separate thread
         await asyncio.to_thread(send_email_sync, msg)
 
-        print("Verification email sent successfully.")
+        logger.info("Verification email sent successfully.")
     except Exception as e:
-        print(f"Error sending email: {e}")
+        logger.error("Error sending email: %s", e)
+
+def open_smtp(email_config) -> smtplib.SMTP:
+    """Connect and log in to the outgoing mail server"""
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+    try:
+        if SMTP_STARTTLS:
+            server.starttls()
+        server.login(email_config["email_sender"], email_config["password"])
+    except Exception:
+        server.close()
+        raise
+    return server
 
 # Another part of email sending.
 def send_email_sync(msg):
-    with smtplib.SMTP('smtp.gmail.com', 587) as server:
-        server.starttls()
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+    email_config = secure_config.get_email_config()
+    with track_smtp(), open_smtp(email_config) as server:
         server.send_message(msg)
 
 # I'm not sure whether I'm still using this one.
 def verification_confirmed(to_email):
     try:
         # Create the email
+        email_config = secure_config.get_email_config()
         msg = MIMEMultipart()
-        msg['From'] = EMAIL_ADDRESS
+        msg['From'] = email_config["email_sender"]
         msg['To'] = to_email
         msg['Subject'] = "Email Verified"
         body = f"""
@@ -89,23 +131,42 @@ def verification_confirmed(to_email):
         msg.attach(MIMEText(body, 'plain'))
 
         # Connect to Gmail and send email
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+        with track_smtp(), open_smtp(email_config) as server:
             server.send_message(msg)
-        print("Verification email sent successfully.")
+        logger.info("Verification email sent successfully.")
     except Exception as e:
-        print(f"Error sending email: {e}")
-
-SECRET_KEY = secret_keys["user_key"]
-serializer = URLSafeTimedSerializer(SECRET_KEY)
-
-app = FastAPI()
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-# Middleware for managing sessions
-# CORS and Trusted Host middleware for security
+        logger.error("Error sending email: %s", e)
+
+def startup_profile_report() -> str:
+    previous = _startup_started
+    lines = ["⏱️ Startup profile:"]
+    for label, mark in _startup_marks:
+        lines.append(f"   {label}: {(mark - previous) * 1000:.0f} ms")
+        previous = mark
+    lines.append(f"   total until serving: {(time.perf_counter() - _startup_started) * 1000:.0f} ms")
+    return "\n".join(lines)
+
+# Warm-up before opening and drain after closing follow the runtime schedule
+@asynccontextmanager
+async def lifespan(app):
+    logger.info(startup_profile_report())
+    lifecycle.start()
+    comment_queue.start()
+    # Config rewritten by config_manager.py or another worker is picked up without a restart
+    secure_config.start_watcher(float(os.environ.get("CONFIG_RELOAD_SECONDS", "5")))
+    # Fill the caches while the server starts accepting connections instead of before
+    if scheduler.is_runtime_allowed():
+        asyncio.get_running_loop().create_task(lifecycle.warm_up())
+    yield
+    await lifecycle.stop()
+    await comment_queue.stop()
+    password_hasher.shutdown()
+    moderator.shutdown()
+
+# Routes that return plain dicts are encoded with orjson too (see responses.py)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# CORS for security
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"] if DEBUG else ALLOWED_HOSTS,  # Restrict in production
@@ -114,39 +175,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Logins use the session_token cookie (see get_auth below), so there is no session middleware.
+# Static files are served by the gate below without going through the layers above
+static_files = StaticFiles(directory="static")
+
+# Host check, static files, runtime schedule, in-flight tracking and per-route metrics
+# in one pure ASGI middleware (added last, so it's the outermost and maintenance
+# pages are counted too); see gate.py
 app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=["*"] if DEBUG else ALLOWED_HOSTS
+    GateMiddleware,
+    scheduler=scheduler,
+    lifecycle=lifecycle,
+    maintenance_response=maintenance_response,
+    allowed_hosts=["*"] if DEBUG else ALLOWED_HOSTS,
+    static_app=static_files
 )
 
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
-
-# Runtime scheduler middleware - check if app should be running
-@app.middleware("http")
-async def runtime_check_middleware(request, call_next):
-    # Allow health checks and static files during downtime
-    if request.url.path in ["/health", "/favicon.ico"] or request.url.path.startswith("/static"):
-        return await call_next(request)
-    
-    # Check if runtime is allowed
-    try:
-        check_runtime_allowed()
-    except HTTPException as e:
-        from fastapi.responses import HTMLResponse
-        return HTMLResponse(content=e.detail, status_code=e.status_code)
-    
-    return await call_next(request)
-
-# Database and other setup...
+# Database and other setup... (the key and tables are loaded on first use)
 encrypted_db = EncryptedDatabase()
 
-logging.basicConfig(level=logging.DEBUG)
-
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Mount static files (for url_for and as a fallback; the gate normally answers first)
+app.mount("/static", static_files, name="static")
 
 # Initialize templates
-templates = Jinja2Templates(directory="templates")
+class ProfiledTemplates(Jinja2Templates):
+    """Jinja2Templates whose rendering shows up as a span in request profiles"""
+
+    def TemplateResponse(self, *args, **kwargs):
+        with span("template render"):
+            return super().TemplateResponse(*args, **kwargs)
+
+templates = ProfiledTemplates(directory="templates")
 
 class User(BaseModel):
     fullName: str
@@ -154,31 +213,64 @@ class User(BaseModel):
     email: str
     password: str
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
 # Load data.json
 DATA_FILE = os.path.join("static", "data", "data.json")
+FEEDBACK_FILE = os.path.join("static", "data", "feedback.json")
 
+# Reads are served from a per-worker cache that is invalidated whenever any worker
+# rewrites the file; writes go through change_board, which locks across processes
+# from a worker thread.
+# With BOARD_FORMAT=msgpack both come from a compact copy (see board_data.py).
+# Announcements are held as records (see records.py) with their dates already parsed.
 def load_data(file_path):
-    with open(file_path, "r") as file:
-        return json.load(file)
-
-# Save data to JSON
-def save_data(file_path, data):
-    with open(file_path, "w") as file:
-        json.dump(data, file, indent=2)
-
-announcement_data = load_data(DATA_FILE)
-
-def get_current_user(session_token: str = Cookie(None)):
-    if not session_token:
-        raise HTTPException(status_code=303, detail="Redirect", headers={"Location": "/homepage"})
-    try:
-        email = serializer.loads(session_token)
-        return email
-    except Exception:
+    with span("data load"):
+        return load_board(file_path, ANNOUNCEMENTS)
+
+# Filled shortly before the runtime window opens so the first visitors find warm caches
+@lifecycle.on_warmup
+def warm_announcements():
+    load_data(DATA_FILE)
+    archive_store.load_manifest()
+
+@lifecycle.on_warmup
+def warm_users():
+    encrypted_db.warm_cache("users")
+
+@lifecycle.on_warmup
+def warm_password_hasher():
+    password_hasher.start()
+
+@lifecycle.on_warmup
+def warm_moderation():
+    moderator.compile()
+
+@lifecycle.on_warmup
+def warm_templates():
+    for template_name in templates.env.list_templates():
+        templates.env.get_template(template_name)
+
+# Comments still waiting for moderation are published before the caches go
+@lifecycle.on_drain
+def flush_comments():
+    comment_queue.flush()
+
+# Nothing needs to stay in memory while the board is closed
+@lifecycle.on_drain
+def release_caches():
+    invalidate()
+    encrypted_db.clear_cache()
+
+# Both are async so FastAPI calls them inline rather than in its thread pool;
+# verifying a token is a quick HMAC check (usually a cache hit)
+async def get_auth(session_token: str = Cookie(None)) -> RequestAuth:
+    """The request's session; the token is only verified when something asks for the user"""
+    return session_manager.for_request(session_token)
+
+async def get_current_user(auth: RequestAuth = Depends(get_auth)):
+    email = auth.email
+    if not email:
         raise HTTPException(status_code=303, detail="Redirect", headers={"Location": "/homepage"})
+    return email
 
 
 @app.get("/health")
@@ -188,9 +280,51 @@ async def health_check():
     return {
         "status": "healthy",
         "runtime_allowed": schedule_info["is_running"],
-        "schedule": schedule_info
+        "schedule": schedule_info,
+        "rate_limits": rate_limiter.stats(),
+        "sessions": session_manager.cache_info(),
+        "comments": comment_queue.stats()
     }
 
+# /metrics and /debug/profiling: bearer METRICS_TOKEN, or local/DEBUG requests without one
+def _internal_allowed(request: Request) -> bool:
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        return hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode())
+    return DEBUG or (request.client is not None and request.client.host in ("127.0.0.1", "::1"))
+
+# Read when /metrics is scraped
+metrics.gauge("runtime_open", "1 while the board is inside its runtime window", lambda: int(scheduler.is_runtime_allowed()))
+metrics.gauge("runtime_seconds_until_transition", "Seconds until the board next opens or closes",
+              lambda: (transition - datetime.now(scheduler.timezone)).total_seconds()
+              if (transition := scheduler.next_transition()) else None)
+metrics.gauge("requests_in_flight", "Requests being handled by this worker", lambda: lifecycle.in_flight)
+metrics.gauge("comment_queue_pending", "Comments waiting for asynchronous moderation", comment_queue.pending_count)
+
+@app.get("/metrics")
+async def get_metrics(request: Request):
+    """Prometheus metrics for this worker"""
+    if not _internal_allowed(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profiling")
+async def get_profiling(request: Request):
+    if not _internal_allowed(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return dict(profiler.settings(), saved=profiler.saved, output_dir=profiler.output_dir)
+
+@app.post("/debug/profiling")
+async def set_profiling(request: Request):
+    """Change profiling settings in every worker, e.g. {"enabled": true, "slow_ms": 500}"""
+    if not _internal_allowed(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        profiler.write_control(**await request.json())
+    except (ValueError, TypeError) as e:
+        return FastJSONResponse({"message": str(e)}, status_code=400)
+    return profiler.settings()
+
 @app.get("/schedule")
 async def get_schedule():
     """Get current schedule information"""
@@ -198,37 +332,28 @@ async def get_schedule():
 
 # Main routes start here
 @app.get("/announcement/{announcement_id}", response_class=HTMLResponse)
-async def display_announcement(announcement_id: int, request: Request, session_token: str = Cookie(None)):
+async def display_announcement(announcement_id: int, request: Request, auth: RequestAuth = Depends(get_auth)):
     # Reload the announcement data
     announcement_data = load_data(DATA_FILE)
-    user = None
-
-    if session_token:
-        try:
-            user = serializer.loads(session_token)
-        except Exception:
-            pass
-
-    for section in announcement_data.values():
-        for announcement in section:
-            if announcement["announcement_id"] == announcement_id:
-                comments = announcement.get("comments", [])
-                likes = announcement["likes"]["amount"]
-                return templates.TemplateResponse(
-                    "announcement.html",
-                    {
-                        "version": version,
-                        "request": request,
-                        "title": announcement["title"],
-                        "date": announcement["date"],
-                        "description": announcement.get("description", "No description available."),
-                        "user": user,
-                        "comments": comments,
-                        "likes": likes,
-                        "announcement_id": announcement_id,
-                        "image_attachment": announcement.get("image_attachment")
-                    }
-                )
+    user = auth.email
+
+    announcement = find_announcement(announcement_data, announcement_id)
+    if announcement:
+        return templates.TemplateResponse(
+            "announcement.html",
+            {
+                "version": version,
+                "request": request,
+                "title": announcement.title or "",
+                "date": announcement.date or "",
+                "description": announcement.description or "No description available.",
+                "user": user,
+                "comments": announcement.comments or [],
+                "likes": announcement.likes.amount,
+                "announcement_id": announcement_id,
+                "image_attachment": announcement.image_attachment
+            }
+        )
     raise HTTPException(status_code=404, detail="Announcement not found")
 
 @app.get("/feedback", response_class=HTMLResponse)
@@ -247,46 +372,41 @@ async def submit_feedback(request: Request, user: str = Depends(get_current_user
     attachment = form.get('attachment')
 
     if not title or not description:
-        return JSONResponse({"message": "Title and description are required."}, status_code=400)
+        return FastJSONResponse({"message": "Title and description are required."}, status_code=400)
 
-    feedback_data = load_data("static/data/feedback.json")
-    feedback_id = max([fb["feedback_id"] for fb in feedback_data["feedbacks"]], default=0) + 1
+    attachment_bytes = await attachment.read() if attachment else None
 
-    feedback = {
-        "email": user,
-        "feedback_title": title,
-        "feedback_description": description,
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "feedback_id": feedback_id
-    }
+    def add_feedback(feedback_data):
+        feedback_id = max([fb.feedback_id or 0 for fb in feedback_data["feedbacks"]], default=0) + 1
 
-    if attachment:
-        directory = "static/images/Feedback/"
-        file_extension = os.path.splitext(attachment.filename)[1]
-        new_filename = f"{feedback_id}{file_extension}"
-        attachment_path = os.path.join(directory, new_filename)
-        with open(attachment_path, "wb") as f:
-            f.write(await attachment.read())
-        feedback["image_attachment"] = f"/{attachment_path}"
-
-    feedback_data["feedbacks"].append(feedback)
+        feedback = Feedback(
+            feedback_id=feedback_id,
+            email=user,
+            feedback_title=title,
+            feedback_description=description,
+            date=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
 
-    # Update the current value
-    feedback_data["update"][0]["before"] = feedback_data["update"][0]["current"]
-    feedback_data["update"][0]["current"] += 1
+        if attachment:
+            directory = "static/images/Feedback/"
+            file_extension = os.path.splitext(attachment.filename)[1]
+            new_filename = f"{feedback_id}{file_extension}"
+            attachment_path = os.path.join(directory, new_filename)
+            with open(attachment_path, "wb") as f:
+                f.write(attachment_bytes)
+            feedback.image_attachment = f"/{attachment_path}"
 
-    save_data("static/data/feedback.json", feedback_data)
+        feedback_data["feedbacks"].append(feedback)
 
-    return JSONResponse({"message": "Feedback submitted successfully."}, status_code=200)
+        # Update the current value
+        feedback_data["update"][0]["before"] = feedback_data["update"][0]["current"]
+        feedback_data["update"][0]["current"] += 1
 
-from better_profanity import profanity
+    await change_board(FEEDBACK_FILE, add_feedback, codec=FEEDBACK)
+    return FastJSONResponse({"message": "Feedback submitted successfully."}, status_code=200)
 
 @app.post("/announcement/{announcement_id}/comment")
 async def add_comment(announcement_id: int, comment: str = Form(...), user: str = Depends(get_current_user)):
-    # Check for profanity in the comment
-    if profanity.contains_profanity(comment):
-        raise HTTPException(status_code=400, detail="The comment contains obscene language.")
-
     user_data = encrypted_db.get_user_by_email(user)
     if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
@@ -294,56 +414,55 @@ async def add_comment(announcement_id: int, comment: str = Form(...), user: str
     username = user_data["full_name"]
     date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    new_comment = {
-        "username": username,
-        "comment": comment,
-        "date": date,
-        "email": user
-    }
+    new_comment = Comment(username=username, comment=comment, date=date, email=user)
 
-    announcement_data = load_data(DATA_FILE)
-    for section in announcement_data.values():
-        for announcement in section:
-            if announcement["announcement_id"] == announcement_id:
-                if "comments" not in announcement:
-                    announcement["comments"] = []
-                announcement["comments"].append(new_comment)
-                save_data(DATA_FILE, announcement_data)
-                return JSONResponse({"username": username, "comment": comment, "date": date})
+    # In async mode the moderation queue checks and publishes it with the next batch
+    if (comment_queue.enabled and find_announcement(load_data(DATA_FILE), announcement_id)
+            and comment_queue.submit(announcement_id, new_comment)):
+        return FastJSONResponse({"username": username, "comment": comment, "date": date, "status": "pending"},
+                            status_code=202)
 
-    raise HTTPException(status_code=404, detail="Announcement not found")
+    # Check for profanity in the comment (long comments are checked in a worker pool)
+    if await moderator.check(comment):
+        raise HTTPException(status_code=400, detail="The comment contains obscene language.")
+
+    def publish(announcement_data):
+        announcement = find_announcement(announcement_data, announcement_id)
+        if announcement:
+            announcement.add_comment(new_comment)
+            return FastJSONResponse({"username": username, "comment": comment, "date": date})
+
+        raise HTTPException(status_code=404, detail="Announcement not found")
+
+    return await change_board(DATA_FILE, publish, codec=ANNOUNCEMENTS)
 
 
 @app.delete("/announcement/{announcement_id}/comment/{comment_index}")
 async def delete_comment(announcement_id: int, comment_index: int, user: str = Depends(get_current_user)):
-    announcement_data = load_data(DATA_FILE)
-    for section in announcement_data.values():
-        for announcement in section:
-            if announcement["announcement_id"] == announcement_id:
-                if "comments" in announcement and len(announcement["comments"]) > comment_index:
-                    comment = announcement["comments"][comment_index]
-                    if comment["email"] != user:
-                        raise HTTPException(status_code=403, detail="You can only delete your own comments")
-                    del announcement["comments"][comment_index]
-                    save_data(DATA_FILE, announcement_data)
-                    return JSONResponse({"message": "Comment deleted successfully"})
-    raise HTTPException(status_code=404, detail="Announcement or comment not found")
+    def remove(announcement_data):
+        announcement = find_announcement(announcement_data, announcement_id)
+        if announcement and announcement.comments and len(announcement.comments) > comment_index:
+            comment = announcement.comments[comment_index]
+            if comment.email != user:
+                raise HTTPException(status_code=403, detail="You can only delete your own comments")
+            del announcement.comments[comment_index]
+            return FastJSONResponse({"message": "Comment deleted successfully"})
+        raise HTTPException(status_code=404, detail="Announcement or comment not found")
+
+    return await change_board(DATA_FILE, remove, codec=ANNOUNCEMENTS)
 
 @app.post("/announcement/{announcement_id}/like")
 async def like_announcement(announcement_id: int, user: str = Depends(get_current_user)):
-    announcement_data = load_data(DATA_FILE)
-    for section in announcement_data.values():
-        for announcement in section:
-            if announcement["announcement_id"] == announcement_id:
-                if user in announcement["likes"]["accounts"]:
-                    announcement["likes"]["accounts"].remove(user)
-                    announcement["likes"]["amount"] -= 1
-                else:
-                    announcement["likes"]["accounts"].append(user)
-                    announcement["likes"]["amount"] += 1
-                save_data(DATA_FILE, announcement_data)
-                return JSONResponse({"likes": announcement["likes"]["amount"]})
-    raise HTTPException(status_code=404, detail="Announcement not found")
+    def toggle(announcement_data):
+        announcement = find_announcement(announcement_data, announcement_id)
+        if announcement:
+            likes = announcement.likes.toggle(user)
+            # One of the busiest events, so only a share is logged (LOG_SAMPLE_RATES)
+            logger.info("Like toggled", extra={"sample": "like", "announcement_id": announcement_id, "likes": likes})
+            return FastJSONResponse({"likes": likes})
+        raise HTTPException(status_code=404, detail="Announcement not found")
+
+    return await change_board(DATA_FILE, toggle, codec=ANNOUNCEMENTS)
 
 @app.get("/signup_verification", response_class=HTMLResponse)
 async def signup_verification_page(request: Request):
@@ -355,55 +474,58 @@ async def verify_code(data: dict):
     code = data.get('code')
 
     if not email or not code:
-        return JSONResponse({"message": "Email and code are required."}, status_code=400)
-
-    if email in VERIFICATION_CODES and VERIFICATION_CODES[email]["code"] == code:
-        user_data = VERIFICATION_CODES[email]["user_data"]
+        return FastJSONResponse({"message": "Email and code are required."}, status_code=400)
 
-        # Write user data to the encrypted database
-        hashed_password = hash_password(user_data["password"])
+    user_data = await asyncio.to_thread(verification_store.verify, "signup", email, code)
+    if user_data:
+        # Write user data to the encrypted database (the password was hashed at signup)
         success = encrypted_db.create_user(
             full_name=user_data["fullName"],
             age=user_data["age"],
             email=user_data["email"],
-            password=hashed_password
+            password=user_data["password_hash"]
         )
         
         if success:
-            del VERIFICATION_CODES[email]
+            await asyncio.to_thread(verification_store.discard, "signup", email)
             return RedirectResponse(url="/", status_code=303)  # Redirect to login
         else:
-            return JSONResponse({"message": "Failed to create user account"}, status_code=500)
+            return FastJSONResponse({"message": "Failed to create user account"}, status_code=500)
     else:
-        return JSONResponse({"message": "Invalid verification code"}, status_code=400)
+        return FastJSONResponse({"message": "Invalid verification code"}, status_code=400)
 
 @app.post("/resend-code")
 async def resend_code(data: dict):
     email = data.get('email')
     if not email:
-        return JSONResponse({"message": "Email is required."}, status_code=400)
+        return FastJSONResponse({"message": "Email is required."}, status_code=400)
 
-    if email in VERIFICATION_CODES:
-        verification_code = VERIFICATION_CODES[email]["code"]
+    pending = await asyncio.to_thread(verification_store.get, "signup", email)
+    if pending:
+        verification_code = pending["code"]
         asyncio.create_task(send_verification_email(email, verification_code))  # type: ignore
-        return JSONResponse({"message": "Verification code resent."}, status_code=200)
+        return FastJSONResponse({"message": "Verification code resent."}, status_code=200)
     else:
-        return JSONResponse({"message": "Email not found."}, status_code=404)
+        return FastJSONResponse({"message": "Email not found."}, status_code=404)
 
 @app.post("/signup")
-@limiter.limit("3/minute")  # Limit signup attempts
+@rate_limiter.limit("3/minute")  # Limit signup attempts
 async def read_signup(request: Request, user: User):
     # Check if email already exists
     existing_user = encrypted_db.get_user_by_email(user.email)
     if existing_user:
-        return JSONResponse({"message": "Email already exists"}, status_code=400)
+        return FastJSONResponse({"message": "Email already exists"}, status_code=400)
 
     # Generate and store verification code
     verification_code = f"{random.randint(100000, 999999)}"
-    VERIFICATION_CODES[user.email] = {
-        "code": verification_code,
-        "user_data": user.model_dump()  # Store user data temporarily
+    # Store the pending signup temporarily; never keep the plaintext password around
+    payload = {
+        "fullName": user.fullName,
+        "age": user.age,
+        "email": user.email,
+        "password_hash": await password_hasher.hash(user.password)
     }
+    await asyncio.to_thread(verification_store.put, "signup", user.email, verification_code, payload)
 
     # Send email asynchronously
     asyncio.create_task(send_verification_email(user.email, verification_code))
@@ -412,41 +534,47 @@ async def read_signup(request: Request, user: User):
     return RedirectResponse(url=f"/signup_verification?email={user.email}", status_code=303)
 
 @app.post("/login")
-@limiter.limit("5/minute")  # Limit login attempts
+@rate_limiter.limit("5/minute")  # Limit login attempts
 async def read_login(request: Request):
     credentials = await request.json()
     email = credentials['email']
-    password = hash_password(credentials['password'])
+    password = credentials['password']
 
-    # Retrieve user data from the encrypted database
+    # Retrieve user data from the encrypted database; an unknown email is still checked
+    # (against a dummy hash) so the response time doesn't reveal which accounts exist
     user = encrypted_db.get_user_by_email(email)
+    matches, needs_rehash = await password_hasher.verify(password, user["password"] if user else "")
 
-    if user and user["password"] == password:
+    if matches:
+        # Upgrade legacy SHA-256 (or outdated scrypt) hashes while we have the password
+        if needs_rehash:
+            encrypted_db.update_user_password(email, await password_hasher.hash(password))
         # Create a session token
-        session_token = serializer.dumps(email)  # Tokenized email for session
+        session_token = session_manager.issue(email)  # Tokenized email for session
         response = RedirectResponse(url="/homepage", status_code=303)
-        response.set_cookie(key="session_token", value=session_token, httponly=True, secure=not DEBUG)
+        response.set_cookie(key="session_token", value=session_token, httponly=True, secure=not DEBUG,
+                            max_age=session_manager.max_age)
         return response
 
-    return JSONResponse({"message": "Login failed"}, status_code=401)
+    return FastJSONResponse({"message": "Login failed"}, status_code=401)
 
 @app.get("/login_form", response_class=HTMLResponse)
-async def read_login_form(request: Request, session_token: str = Cookie(None)):
-    if session_token:
+async def read_login_form(request: Request, auth: RequestAuth = Depends(get_auth)):
+    if auth.has_session:
         # Redirect logged-in users to homepage
         return RedirectResponse(url="/homepage", status_code=303)
     return templates.TemplateResponse("login.html", {"request": request, "version": version})
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root(request: Request, session_token: str = Cookie(None)):
-    if session_token:
+async def read_root(request: Request, auth: RequestAuth = Depends(get_auth)):
+    if auth.has_session:
         # Redirect logged-in users to homepage
         return RedirectResponse(url="/homepage", status_code=303)
     return templates.TemplateResponse("guest_view.html", {"request": request, "version": version})
 
 @app.get("/signup_form", response_class=HTMLResponse)
-async def read_signup_form(request: Request, session_token: str = Cookie(None)):
-    if session_token:
+async def read_signup_form(request: Request, auth: RequestAuth = Depends(get_auth)):
+    if auth.has_session:
         # Redirect logged-in users to homepage
         return RedirectResponse(url="/homepage", status_code=303)
     return templates.TemplateResponse("signup.html", {"request": request, "version": version})
@@ -487,41 +615,45 @@ async def logout():
     return response
 
 @app.get("/forgot_password", response_class=HTMLResponse)
-async def forgot_password_page(request: Request, session_token: str = Cookie(None)):
-    if session_token:
+async def forgot_password_page(request: Request, auth: RequestAuth = Depends(get_auth)):
+    if auth.has_session:
         # Redirect logged-in users to homepage
         return RedirectResponse(url="/homepage", status_code=303)
     return templates.TemplateResponse("forgot_password.html", {"request": request, "version": version})
 
 @app.post("/forgot_password/send_verification_code")
-@limiter.limit("3/minute")  # Limit password reset attempts
+@rate_limiter.limit("3/minute")  # Limit password reset attempts
 async def forgot_password_send_verification_code(request: Request, email: str = Form(...)):
     user = encrypted_db.get_user_by_email(email)
     if not user:
-        return JSONResponse({"message": "Email not found"}, status_code=404)
+        return FastJSONResponse({"message": "Email not found"}, status_code=404)
 
     verification_code = f"{random.randint(100000, 999999)}"
-    VERIFICATION_CODES[email] = verification_code
+    await asyncio.to_thread(verification_store.put, "reset", email, verification_code)
     await send_verification_email(email, verification_code)
-    return JSONResponse({"message": "Verification code sent"}, status_code=200)
+    return FastJSONResponse({"message": "Verification code sent"}, status_code=200)
 
 @app.post("/forgot_password/verify_code")
 async def forgot_password_verify_code(email: str = Form(...), code: str = Form(...)):
-    if email in VERIFICATION_CODES and VERIFICATION_CODES[email] == code:
-        return JSONResponse({"message": "Code verified"}, status_code=200)
-    return JSONResponse({"message": "Invalid verification code"}, status_code=400)
+    # Remember that this reset was verified so the new password can be set
+    if await asyncio.to_thread(verification_store.confirm, "reset", email, code, {"verified": True}):
+        return FastJSONResponse({"message": "Code verified"}, status_code=200)
+    return FastJSONResponse({"message": "Invalid verification code"}, status_code=400)
 
 @app.post("/forgot_password/reset_password")
 async def forgot_password_reset_password(email: str = Form(...), new_password: str = Form(...)):
-    hashed_password = hash_password(new_password)
+    pending = await asyncio.to_thread(verification_store.get, "reset", email)
+    if not pending or not pending["payload"].get("verified"):
+        return FastJSONResponse({"message": "Please verify your email first."}, status_code=400)
+
+    hashed_password = await password_hasher.hash(new_password)
     success = encrypted_db.update_user_password(email, hashed_password)
     if success:
         # Clean up verification code
-        if email in VERIFICATION_CODES:
-            del VERIFICATION_CODES[email]
+        await asyncio.to_thread(verification_store.discard, "reset", email)
         return RedirectResponse(url="/", status_code=303)
     else:
-        return JSONResponse({"message": "Failed to update password"}, status_code=500)
+        return FastJSONResponse({"message": "Failed to update password"}, status_code=500)
 
 @app.get("/archives", response_class=HTMLResponse)
 async def read_archives(request: Request, user: str = Depends(get_current_user)):
@@ -529,25 +661,23 @@ async def read_archives(request: Request, user: str = Depends(get_current_user))
 
 @app.get("/archives/{archive_id}", response_class=HTMLResponse)
 async def read_archives_section(archive_id: int, request: Request, user: str = Depends(get_current_user)):
-    archived_data = load_data("static/data/archived_data.json")
-
-    for section in archived_data.values():
-        for announcement in section:
-            if announcement["archive_id"] == archive_id:
-                comments = announcement.get("comments", [])
-                return templates.TemplateResponse(
-                    "archived_announcement.html",
-                    {
-                        "request": request,
-                        "title": announcement["title"],
-                        "date": announcement["date"],
-                        "description": announcement.get("description", "No description available."),
-                        "likes": announcement["likes"]["amount"],
-                        "announcement_id": announcement["announcement_id"],
-                        "image_attachment": announcement.get("image_attachment"),
-                        "comments": comments
-                    }
-                )
+    # Only the shard holding this archive is read
+    announcement = archive_store.get(archive_id)
+    if announcement:
+        comments = announcement.get("comments", [])
+        return templates.TemplateResponse(
+            "archived_announcement.html",
+            {
+                "request": request,
+                "title": announcement["title"],
+                "date": announcement["date"],
+                "description": announcement.get("description", "No description available."),
+                "likes": announcement["likes"]["amount"],
+                "announcement_id": announcement["announcement_id"],
+                "image_attachment": announcement.get("image_attachment"),
+                "comments": comments
+            }
+        )
     raise HTTPException(status_code=404, detail="Announcement not found")
 
 @app.exception_handler(StarletteHTTPException)
@@ -556,18 +686,28 @@ async def custom_http_exception_handler(request: Request, exc: StarletteHTTPExce
         return templates.TemplateResponse("four-o-four.html", {"request": request}, status_code=404)
     elif exc.status_code == 303:
         return templates.TemplateResponse("unauthorized.html", {"request": request}, status_code=303)
-    return JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+    return FastJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=getattr(exc, "headers", None))
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    return JSONResponse({"detail": exc.errors()}, status_code=400)
+    return FastJSONResponse({"detail": exc.errors()}, status_code=400)
+
+_startup_marks.append(("app and routes", time.perf_counter()))
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
+    # Create keys, config and database files here, before any worker starts, so every
+    # worker process loads the same ones instead of racing to create its own.
+    secure_config.load()
+    encrypted_db.initialize()
+    archive_store.initialize()
     uvicorn.run(
         "main:app", 
         host="0.0.0.0", 
         port=port, 
         reload=DEBUG,
-        log_level="info" if not DEBUG else "debug"
-    )
\ No newline at end of file
+        workers=WORKERS,
+        # Uvicorn logs through log_config's queue, and the gate writes the access log
+        log_config=None,
+        access_log=False
+    )
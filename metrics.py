@@ -0,0 +1,220 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+Counters and histograms are updated where the work happens (requests, board file
+loads and saves, table encryption, SMTP, caches); gauges are read from their source
+when the endpoint is scraped. Each worker process keeps its own numbers (process_id
+says which one answered), so with WEB_CONCURRENCY > 1 every scrape sees one worker.
+
+This module imports nothing from the app so any module can record into it.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers cache hits (~0.1 ms) up to slow SMTP handshakes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def snapshot(self) -> List[Tuple[LabelKey, float]]:
+        """(label key, value) pairs, copied under the lock"""
+        with self._lock:
+            return list(self._values.items())
+
+    def samples(self) -> List[str]:
+        items = self.snapshot()
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._values.items()]
+        lines = []
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(float(bound)))])} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+class Gauge:
+    """A value read when metrics are rendered: func returns a number or {labels dict: number}"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, func: Callable):
+        self.name = name
+        self.help = help
+        self.func = func
+
+    def samples(self) -> List[str]:
+        value = self.func()
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_format_labels(_label_key(dict(labels)))} {_format_value(number)}"
+                    for labels, number in value.items()]
+        return [f"{self.name} {_format_value(value)}"]
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, func: Callable) -> Gauge:
+        """Register (or replace) a gauge read from func at scrape time"""
+        gauge = Gauge(name, help, func)
+        with self._lock:
+            self._metrics[name] = gauge
+        return gauge
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                logger.error("Error collecting metric %s: %s", metric.name, e)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+# Global instance for easy access
+metrics = MetricsRegistry()
+
+# Shared instruments
+http_requests = metrics.counter("http_requests_total", "HTTP requests by method, route and status")
+http_latency = metrics.histogram("http_request_duration_seconds", "HTTP request latency by method and route")
+board_file_seconds = metrics.histogram("board_file_seconds", "Board JSON/msgpack file load and save time")
+encrypted_table_seconds = metrics.histogram("encrypted_table_seconds", "EncryptedDatabase encrypt/decrypt time")
+smtp_send_seconds = metrics.histogram("smtp_send_seconds", "Time to deliver one email over SMTP")
+smtp_failures = metrics.counter("smtp_failures_total", "Emails that failed to send")
+cache_lookups = metrics.counter("cache_lookups_total", "Cache lookups by cache and result (hit/miss)")
+ratelimit_hits = metrics.counter("ratelimit_hits_total", "Rate-limited route hits by route and result (allowed/blocked)")
+
+def _hit_ratios() -> Dict:
+    totals: Dict[str, List[float]] = {}
+    for key, count in cache_lookups.snapshot():
+        labels = dict(key)
+        hits_and_total = totals.setdefault(labels.get("cache", ""), [0, 0])
+        hits_and_total[1] += count
+        if labels.get("result") == "hit":
+            hits_and_total[0] += count
+    return {(("cache", cache),): hits / total for cache, (hits, total) in totals.items() if total}
+
+metrics.gauge("cache_hit_ratio", "Share of cache lookups served from the cache since start", _hit_ratios)
+metrics.gauge("process_id", "Pid of the worker that answered this scrape", os.getpid)
+
+_in_flight_smtp = [0]
+_smtp_lock = threading.Lock()
+metrics.gauge("smtp_in_flight", "Emails being sent right now (SMTP queue depth)", lambda: _in_flight_smtp[0])
+
+@contextmanager
+def track_smtp():
+    """Time an email send and count it as queued while it runs"""
+    with _smtp_lock:
+        _in_flight_smtp[0] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        smtp_failures.inc()
+        raise
+    finally:
+        smtp_send_seconds.observe(time.perf_counter() - started)
+        with _smtp_lock:
+            _in_flight_smtp[0] -= 1
+
+def cache_lookup(cache: str, hit: bool):
+    cache_lookups.inc(cache=cache, result="hit" if hit else "miss")
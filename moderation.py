@@ -0,0 +1,248 @@
+"""
+Comment moderation with a precompiled word matcher.
+
+The word list (better_profanity's default list plus moderation_words.txt) is compiled
+once into an Aho–Corasick automaton, so checking a comment is a single pass over its
+characters however many words are listed. Leetspeak is handled by normalising the
+text and the words the same way ("@" and "4" read as "a", "$" as "s", "0" as "o",
+...) and by also compiling each word with a "*" in place of each vowel ("f*ck").
+Matches only count on word boundaries, so "class" doesn't trip on "ass".
+
+Short comments are checked inline; long ones go to a worker pool so they never hold
+up the event loop.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from better_profanity.utils import get_complete_path_of_file
+    DEFAULT_WORDLIST = get_complete_path_of_file("profanity_wordlist.txt")
+except ImportError:  # Optional: only the custom list is used
+    DEFAULT_WORDLIST = None
+
+logger = logging.getLogger(__name__)
+
+CUSTOM_WORDLIST = os.environ.get("MODERATION_WORDLIST", "moderation_words.txt")
+
+# Characters read as the same letter ("i", "l" and "1" all look alike)
+LEET_CLASSES = {
+    "a": "a@4",
+    "e": "e3",
+    "i": "il1",
+    "o": "o0",
+    "s": "s$5",
+    "t": "t7",
+    "u": "uv",
+}
+NORMALIZE = str.maketrans({char: letter for letter, chars in LEET_CLASSES.items() for char in chars})
+VOWELS = "aeiou"
+WILDCARD = "*"
+# Characters that continue a word (after normalising); anything else is a boundary
+WORD_SYMBOLS = frozenset("*'\"")
+
+def normalize(text: str) -> str:
+    """Lowercase and fold leetspeak, keeping one output character per input character"""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few characters lowercase to two (e.g. "İ"); keep positions aligned
+        lowered = "".join(char.lower()[0] for char in text)
+    return lowered.translate(NORMALIZE)
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char in WORD_SYMBOLS
+
+def read_wordlist(path: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Return (words, allowed) from a list file.
+
+    One word or phrase per line; "#" starts a comment and a leading "!" marks a word
+    to remove from the default list instead of adding it.
+    """
+    words, allowed = set(), set()
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.split("#", 1)[0].strip().lower()
+            if line.startswith("!"):
+                allowed.add(line[1:].strip())
+            elif line:
+                words.add(line)
+    return words, allowed
+
+def _variants(word: str) -> Iterable[str]:
+    """The normalised word and each spelling with one vowel replaced by "*" """
+    word = " ".join(normalize(word).split())
+    yield word
+    for index, char in enumerate(word):
+        if char in VOWELS:
+            yield word[:index] + WILDCARD + word[index + 1:]
+
+class WordMatcher:
+    """An Aho–Corasick automaton over the normalised word variants"""
+
+    def __init__(self, words: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Lengths of the variants ending at each state (including via fail links)
+        self._output: List[Tuple[int, ...]] = [()]
+        self.pattern_count = 0
+        for word in words:
+            for variant in _variants(word):
+                self._add(variant)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        if len(pattern) not in self._output[state]:
+            self._output[state] += (len(pattern),)
+            self.pattern_count += 1
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    @property
+    def state_count(self) -> int:
+        return len(self._goto)
+
+    def find(self, text: str, first_only: bool = False) -> List[Tuple[int, int]]:
+        """(start, end) spans of listed words in text, on word boundaries"""
+        normalized = normalize(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        length = len(normalized)
+        spans = []
+        state = 0
+        for index, char in enumerate(normalized):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            end = index + 1
+            if end < length and _is_word_char(normalized[end]):
+                continue
+            for pattern_length in output[state]:
+                start = end - pattern_length
+                if start == 0 or not _is_word_char(normalized[start - 1]):
+                    spans.append((start, end))
+                    if first_only:
+                        return spans
+        return spans
+
+class ModerationEngine:
+    """Checks comments against the compiled word list, offloading long ones to a pool"""
+
+    def __init__(self, wordlists: Iterable[Optional[str]] = (DEFAULT_WORDLIST, CUSTOM_WORDLIST),
+                 offload_chars: int = 4000, workers: int = 2, use_processes: bool = True):
+        self.wordlists = [path for path in wordlists if path]
+        self.offload_chars = offload_chars
+        self.workers = workers
+        self.use_processes = use_processes
+        self._matcher = None
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def matcher(self) -> WordMatcher:
+        if self._matcher is None:
+            with self._lock:
+                if self._matcher is None:
+                    self._matcher = self._compile()
+        return self._matcher
+
+    def _compile(self) -> WordMatcher:
+        words, allowed = set(), set()
+        for path in self.wordlists:
+            if not os.path.exists(path):
+                continue
+            listed, unlisted = read_wordlist(path)
+            words |= listed
+            allowed |= unlisted
+        matcher = WordMatcher(words - allowed)
+        logger.info("🧹 Compiled %d moderated words (%d spellings, %d states)",
+                    len(words - allowed), matcher.pattern_count, matcher.state_count)
+        return matcher
+
+    def compile(self):
+        """Build the automaton now instead of on the first comment"""
+        return self.matcher
+
+    def contains_profanity(self, text: str) -> bool:
+        return bool(self.matcher.find(text, first_only=True))
+
+    def censor(self, text: str, censor_char: str = "*") -> str:
+        chars = list(text)
+        for start, end in self.matcher.find(text):
+            chars[start:end] = censor_char * (end - start)
+        return "".join(chars)
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                # Forked workers inherit the automaton when it was compiled first
+                self.compile()
+            with self._lock:
+                if self._executor is None:
+                    if self.use_processes:
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                            thread_name_prefix="moderation")
+        return self._executor
+
+    async def check(self, text: str) -> bool:
+        """True if the text contains a moderated word"""
+        if len(text) < self.offload_chars:
+            return self.contains_profanity(text)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), _contains_profanity, text)
+        except BrokenProcessPool:
+            logger.warning("⚠️ Moderation pool broke, restarting it")
+            self._executor = None
+            return await asyncio.to_thread(self.contains_profanity, text)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+def _contains_profanity(text: str) -> bool:
+    # Runs in the pool, against that process's copy of the global engine
+    return moderator.contains_profanity(text)
+
+def create_moderation_engine() -> ModerationEngine:
+    """Build the engine from environment settings"""
+    return ModerationEngine(
+        offload_chars=int(os.environ.get("MODERATION_OFFLOAD_CHARS", "4000")),
+        workers=int(os.environ.get("MODERATION_WORKERS", "2")),
+        use_processes=os.environ.get("MODERATION_EXECUTOR", "process").lower() == "process"
+    )
+
+# Global instance for easy access
+moderator = create_moderation_engine()
@@ -0,0 +1,248 @@
+"""
+Password hashing with scrypt, run off the event loop.
+
+New hashes look like "scrypt$<n>$<r>$<p>$<salt>$<hash>" (base64 salt and hash). The
+old unsalted SHA-256 hex digests are still accepted and reported as needing a rehash,
+so they are upgraded the next time their owner logs in.
+
+Run `python passwords.py --benchmark` to measure hashes per second on this machine.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+from metrics import cache_lookup
+from shared_state import get_worker_count
+
+logger = logging.getLogger(__name__)
+
+SCRYPT_N = int(os.environ.get("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.environ.get("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.environ.get("PASSWORD_SCRYPT_P", "1"))
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # OpenSSL needs a little more than 128 * n * r bytes of memory
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES)
+
+def is_legacy_hash(stored: str) -> bool:
+    """The original format: an unsalted SHA-256 hex digest"""
+    return len(stored) == 64 and all(char in "0123456789abcdef" for char in stored)
+
+def hash_password(password: str, n: int = None, r: int = None, p: int = None) -> str:
+    """Hash a password with a fresh salt (CPU heavy: prefer PasswordHasher.hash in the app)"""
+    n, r, p = n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P
+    salt = os.urandom(SALT_BYTES)
+    derived = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(derived)}"
+
+def needs_rehash(stored: str) -> bool:
+    """True for legacy hashes and for scrypt hashes made with other parameters"""
+    if is_legacy_hash(stored):
+        return True
+    try:
+        _, n, r, p, _, _ = stored.split("$")
+        return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    except ValueError:
+        return True
+
+def verify_password(password: str, stored: str) -> bool:
+    """Check a password against a stored hash in either format"""
+    if not stored:
+        return False
+    if is_legacy_hash(stored):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored)
+    try:
+        scheme, n, r, p, salt, expected = stored.split("$")
+        if scheme != "scrypt":
+            return False
+        # Malformed parameters or base64 (binascii.Error is a ValueError) don't match
+        derived = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(derived, _b64decode(expected))
+    except ValueError:
+        return False
+
+class VerifyCache:
+    """
+    Remembers recent successful verifications so repeated logins skip the KDF.
+
+    Keys are an HMAC of (stored hash, password) under a random per-process key, so the
+    cache never holds passwords, and changing the password (new stored hash) misses.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()  # digest -> expires_at
+        self._lock = threading.Lock()
+
+    def _digest(self, password: str, stored: str) -> bytes:
+        return hmac.new(self._key, f"{stored}\0{password}".encode(), hashlib.sha256).digest()
+
+    def hit(self, password: str, stored: str) -> bool:
+        if not self.max_entries:
+            return False
+        digest = self._digest(password, stored)
+        with self._lock:
+            expires_at = self._entries.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._entries[digest]
+                return False
+            self._entries.move_to_end(digest)
+            return True
+
+    def add(self, password: str, stored: str):
+        if not self.max_entries:
+            return
+        digest = self._digest(password, stored)
+        with self._lock:
+            self._entries[digest] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class PasswordHasher:
+    """Runs hashing and verification in a process pool so logins never block the event loop"""
+
+    def __init__(self, workers: int = None, verify_cache: VerifyCache = None, use_processes: bool = True):
+        self.workers = workers or max(1, (os.cpu_count() or 1) // get_worker_count())
+        self.verify_cache = verify_cache or VerifyCache()
+        self.use_processes = use_processes
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Checked instead when the account doesn't exist, so both cases take as long
+        self._dummy_hash = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.use_processes:
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                            thread_name_prefix="password-hasher")
+        return self._executor
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # A pool process died; start a fresh pool next time and finish this call in a thread
+            logger.warning("⚠️ Password hashing pool broke, restarting it")
+            self._executor = None
+            return await asyncio.to_thread(func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, stored: str) -> Tuple[bool, bool]:
+        """Return (matches, needs_rehash); no stored hash (unknown account) never matches"""
+        if not stored:
+            if self._dummy_hash is None:
+                self._dummy_hash = await self._run(hash_password, _b64encode(os.urandom(SALT_BYTES)))
+            await self._run(verify_password, password, self._dummy_hash)
+            return False, False
+        hit = self.verify_cache.hit(password, stored)
+        cache_lookup("password_verify", hit)
+        if hit:
+            return True, needs_rehash(stored)
+        matches = await self._run(verify_password, password, stored)
+        if matches:
+            self.verify_cache.add(password, stored)
+        return matches, matches and needs_rehash(stored)
+
+    def start(self):
+        """Spin the pool processes up ahead of the first login"""
+        executor = self._get_executor()
+        for future in [executor.submit(int) for _ in range(self.workers)]:
+            future.result()
+        if self._dummy_hash is None:
+            self._dummy_hash = executor.submit(hash_password, _b64encode(os.urandom(SALT_BYTES))).result()
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+def create_password_hasher() -> PasswordHasher:
+    """Build the hasher from environment settings"""
+    workers = int(os.environ.get("PASSWORD_HASH_WORKERS", "0")) or None
+    use_processes = os.environ.get("PASSWORD_HASH_EXECUTOR", "process").lower() == "process"
+    verify_cache = VerifyCache(
+        max_entries=int(os.environ.get("PASSWORD_VERIFY_CACHE_SIZE", "1024")),
+        ttl_seconds=float(os.environ.get("PASSWORD_VERIFY_CACHE_SECONDS", "300"))
+    )
+    return PasswordHasher(workers, verify_cache, use_processes)
+
+# Global instance for easy access
+password_hasher = create_password_hasher()
+
+def benchmark(seconds: float = 3.0, workers: Optional[int] = None):
+    """Print single-core and pooled hash throughput with the current parameters"""
+    from concurrent.futures import as_completed
+
+    print(f"scrypt n={SCRYPT_N} r={SCRYPT_R} p={SCRYPT_P} "
+          f"(~{128 * SCRYPT_N * SCRYPT_R / 1024 / 1024:.0f} MiB per hash)")
+
+    started = time.perf_counter()
+    count = 0
+    while time.perf_counter() - started < seconds:
+        hash_password("benchmark-password")
+        count += 1
+    single = count / (time.perf_counter() - started)
+    print(f"1 core: {single:.1f} hashes/s ({1000 / single:.0f} ms per login)")
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(int, range(workers)))  # Start the processes before timing
+        started = time.perf_counter()
+        count = 0
+        while time.perf_counter() - started < seconds:
+            futures = [executor.submit(hash_password, "benchmark-password") for _ in range(workers * 4)]
+            for future in as_completed(futures):
+                future.result()
+                count += 1
+        pooled = count / (time.perf_counter() - started)
+    print(f"{workers} processes: {pooled:.1f} hashes/s ({pooled / workers:.1f} per core)")
+    print(f"Peak capacity: ~{pooled * 60:.0f} logins/minute with {workers} hashing processes")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Password hashing utilities")
+    parser.add_argument("--benchmark", action="store_true", help="measure hashing throughput")
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration of each benchmark phase")
+    parser.add_argument("--workers", type=int, default=None, help="pool size for the pooled benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.seconds, args.workers)
+    else:
+        parser.print_help()
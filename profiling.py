@@ -0,0 +1,241 @@
+"""
+Opt-in request profiling: find out why a page was slow.
+
+While profiling is on, a background thread samples the stacks of every thread every
+few milliseconds into a short ring buffer. When a request finishes, it's kept if it
+was picked at random (PROFILING_SAMPLE_RATE) or took longer than PROFILING_SLOW_MS,
+and two files are written to PROFILING_DIR:
+
+- <name>.folded: the samples taken while it ran, in the folded-stack format that
+  flamegraph.pl, speedscope and inferno read;
+- <name>.json: the request, its duration and its spans (session decode, data load,
+  template render, file write) with their timings.
+
+All requests share the event loop thread, so a profile also contains whatever ran
+concurrently; the spans are exact for the request itself.
+
+Settings come from the environment and can be changed without a restart by writing
+the control file (PROFILING_CONTROL_FILE), which every worker checks once a second:
+POST /debug/profiling does that.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# The spans of the request being handled in this context (None when it isn't profiled)
+_current_spans: contextvars.ContextVar[Optional[List]] = contextvars.ContextVar("profiling_spans", default=None)
+
+@contextmanager
+def span(name: str):
+    """Time a phase of the current request; free when the request isn't profiled"""
+    spans = _current_spans.get()
+    if spans is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append((name, started, time.perf_counter() - started))
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class RequestProfile:
+    __slots__ = ("method", "path", "started", "started_perf", "started_wall", "spans", "token")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.monotonic()
+        self.started_perf = time.perf_counter()
+        self.started_wall = time.time()
+        self.spans: List = []
+        self.token = _current_spans.set(self.spans)
+
+class Profiler:
+    SETTINGS = ("enabled", "sample_rate", "slow_ms", "interval_ms")
+
+    def __init__(self, output_dir: str = "profiles", control_file: str = None, enabled: bool = False,
+                 sample_rate: float = 0.01, slow_ms: float = 1000, interval_ms: float = 5,
+                 buffer_seconds: float = 60):
+        self.output_dir = output_dir
+        self.control_file = control_file
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        if interval_ms <= 0:
+            raise ValueError("PROFILING_INTERVAL_MS must be greater than 0")
+        self.interval_ms = interval_ms
+        self.buffer_seconds = buffer_seconds
+
+        self._samples = deque()  # (monotonic time, thread name, folded stack)
+        self._sampler = None
+        self._lock = threading.Lock()
+        self._control_checked = 0.0
+        self._control_signature = None
+        self.saved = 0
+
+    # Settings
+    def settings(self) -> Dict:
+        return {name: getattr(self, name) for name in self.SETTINGS}
+
+    def configure(self, **settings):
+        values = {}
+        for name, value in settings.items():
+            if name not in self.SETTINGS:
+                raise ValueError(f"Unknown profiling setting: {name}")
+            if isinstance(getattr(self, name), bool):
+                value = value if isinstance(value, bool) else str(value).lower() == "true"
+            values[name] = type(getattr(self, name))(value)
+        if values.get("interval_ms", self.interval_ms) <= 0:
+            # 0 would turn the sampler into a busy loop
+            raise ValueError("interval_ms must be greater than 0")
+        for name, value in values.items():
+            setattr(self, name, value)
+        if self.enabled:
+            self._start_sampler()
+
+    def write_control(self, **settings):
+        """Change the settings in every worker (each picks the file up within a second)"""
+        self.configure(**settings)
+        if self.control_file:
+            os.makedirs(os.path.dirname(self.control_file) or ".", exist_ok=True)
+            temp_path = f"{self.control_file}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(self.settings(), file)
+            os.replace(temp_path, self.control_file)
+
+    def _check_control(self):
+        now = time.monotonic()
+        if not self.control_file or now - self._control_checked < 1:
+            return
+        self._control_checked = now
+        try:
+            stat = os.stat(self.control_file)
+        except FileNotFoundError:
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._control_signature:
+            return
+        self._control_signature = signature
+        try:
+            with open(self.control_file, "r") as file:
+                self.configure(**json.load(file))
+            logger.info("🔬 Profiling settings: %s", self.settings())
+        except Exception as e:
+            logger.error("Error reading profiling control file: %s", e)
+
+    # Sampling
+    def _start_sampler(self):
+        with self._lock:
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._sampler.start()
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while self.enabled:
+            now = time.monotonic()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._samples.append((now, names.get(thread_id, str(thread_id)), _fold(frame)))
+            while self._samples and self._samples[0][0] < now - self.buffer_seconds:
+                self._samples.popleft()
+            time.sleep(self.interval_ms / 1000)
+        self._samples.clear()
+
+    # Requests
+    def begin(self, method: str, path: str) -> Optional[RequestProfile]:
+        """Start tracking a request, or None when profiling is off"""
+        self._check_control()
+        if not self.enabled:
+            return None
+        return RequestProfile(method, path)
+
+    async def finish(self, profile: Optional[RequestProfile], route: str, status: int) -> Optional[str]:
+        """Stop tracking; write the profile if the request was sampled or slow (returns its path)"""
+        if profile is None:
+            return None
+        try:
+            _current_spans.reset(profile.token)
+        except ValueError:
+            pass  # Finished from another context; the variable dies with it anyway
+        ended = time.monotonic()
+        duration_ms = (ended - profile.started) * 1000
+        if duration_ms < self.slow_ms and random.random() >= self.sample_rate:
+            return None
+        # Scanning the sample buffer and writing the files would hold up the event loop
+        return await asyncio.to_thread(self._save, profile, route, status, ended, duration_ms)
+
+    def _save(self, profile: RequestProfile, route: str, status: int, ended: float, duration_ms: float) -> Optional[str]:
+        stacks = Counter(
+            f"{thread_name};{stack}" for sampled_at, thread_name, stack in list(self._samples)
+            if profile.started <= sampled_at <= ended
+        )
+        name = "{}-{}-{}-{:.0f}ms".format(
+            datetime.fromtimestamp(profile.started_wall).strftime("%Y%m%d-%H%M%S-%f"),
+            profile.method, re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root", duration_ms
+        )
+        base_path = os.path.join(self.output_dir, name)
+        summary = {
+            "method": profile.method,
+            "path": profile.path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration_ms, 3),
+            "samples": sum(stacks.values()),
+            "interval_ms": self.interval_ms,
+            "spans": [
+                {"name": span_name, "offset_ms": round((started - profile.started_perf) * 1000, 3),
+                 "duration_ms": round(duration * 1000, 3)}
+                for span_name, started, duration in profile.spans
+            ]
+        }
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(f"{base_path}.folded", "w") as file:
+                file.writelines(f"{stack} {count}\n" for stack, count in stacks.items())
+            with open(f"{base_path}.json", "w") as file:
+                json.dump(summary, file, indent=2)
+        except OSError as e:
+            logger.error("Error writing profile %s: %s", base_path, e)
+            return None
+        self.saved += 1
+        return base_path
+
+def create_profiler() -> Profiler:
+    """Build the profiler from environment settings"""
+    profiler = Profiler(
+        output_dir=os.environ.get("PROFILING_DIR", "profiles"),
+        control_file=os.environ.get("PROFILING_CONTROL_FILE", os.path.join("runtime_data", "profiling.json")),
+        sample_rate=float(os.environ.get("PROFILING_SAMPLE_RATE", "0.01")),
+        slow_ms=float(os.environ.get("PROFILING_SLOW_MS", "1000")),
+        interval_ms=float(os.environ.get("PROFILING_INTERVAL_MS", "5"))
+    )
+    if os.environ.get("PROFILING_ENABLED", "false").lower() == "true":
+        profiler.configure(enabled=True)
+    return profiler
+
+# Global instance for easy access
+profiler = create_profiler()
@@ -0,0 +1,233 @@
+import asyncio
+import functools
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Tuple
+from fastapi import HTTPException, Request
+from metrics import Counter, metrics, ratelimit_hits
+from shared_state import is_multi_worker
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+def parse_rule(rule: str) -> Tuple[int, int]:
+    """Turn "5/minute" or "10/2 hours" into (limit, window seconds)"""
+    amount, period = rule.split("/", 1)
+    parts = period.strip().split()
+    multiplier = int(parts[0]) if len(parts) == 2 else 1
+    unit = parts[-1].rstrip("s")
+    return int(amount), multiplier * PERIODS[unit]
+
+def sliding_window(state, limit: int, window: int, now: float):
+    """
+    Sliding window counter: the previous fixed window is weighted by how much of it
+    still overlaps the sliding window. Each key only needs (window_start, count,
+    previous_count), so memory per key is constant.
+
+    Returns (allowed, new_state, retry_after_seconds).
+    """
+    window_start = math.floor(now / window) * window
+    stored_start, count, previous_count = state or (window_start, 0, 0)
+    if stored_start != window_start:
+        previous_count = count if stored_start == window_start - window else 0
+        count = 0
+
+    overlap = (window - (now - window_start)) / window
+    estimated = previous_count * overlap + count
+    if estimated + 1 > limit:
+        retry_after = max(1, math.ceil(window_start + window - now))
+        return False, (window_start, count, previous_count), retry_after
+    return True, (window_start, count + 1, previous_count), 0
+
+class MemoryRateLimitBackend:
+    """Per-process counters in LRU order; idle keys and the least recently seen beyond max_keys are evicted"""
+
+    # A hit takes microseconds, so it runs on the event loop
+    blocking = False
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()  # key -> (window, state, last_seen)
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def hit(self, key: str, limit: int, window: int, now: float):
+        with self._lock:
+            entry = self._counters.pop(key, None)
+            allowed, state, retry_after = sliding_window(entry[1] if entry else None, limit, window, now)
+            self._counters[key] = (window, state, now)
+            self._evict(now)
+        return allowed, retry_after
+
+    def _evict(self, now: float):
+        # The front of the OrderedDict is the least recently seen key
+        while self._counters:
+            key, (window, _, last_seen) = next(iter(self._counters.items()))
+            if len(self._counters) <= self.max_keys and last_seen + 2 * window > now:
+                break
+            del self._counters[key]
+            self.evicted += 1
+
+    def tracked_keys(self) -> int:
+        return len(self._counters)
+
+    def __len__(self):
+        return len(self._counters)
+
+class SQLiteRateLimitBackend:
+    """Counters in a SQLite file shared by every worker process on the host"""
+
+    # A hit waits for the database write lock, so it runs in a thread
+    blocking = True
+
+    def __init__(self, db_path: str, max_keys: int = 100000, cleanup_interval: float = 60.0):
+        self.db_path = db_path
+        self.max_keys = max_keys
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+        self.evicted = 0
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, window INTEGER NOT NULL, window_start REAL NOT NULL, "
+                "count INTEGER NOT NULL, previous_count INTEGER NOT NULL, last_seen REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_seen ON rate_limits (last_seen)")
+            self._tracked_keys = connection.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection; transactions are managed explicitly in hit()"""
+        connection = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def hit(self, key: str, limit: int, window: int, now: float):
+        with self._connect() as connection:
+            # BEGIN IMMEDIATE takes the write lock up front so concurrent workers serialise here
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT window_start, count, previous_count FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                allowed, state, retry_after = sliding_window(tuple(row) if row else None, limit, window, now)
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, window, window_start, count, previous_count, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, window, state[0], state[1], state[2], now)
+                )
+                if now - self._last_cleanup > self.cleanup_interval:
+                    self._last_cleanup = now
+                    self._evict(connection, now)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return allowed, retry_after
+
+    def _evict(self, connection, now: float):
+        removed = connection.execute(
+            "DELETE FROM rate_limits WHERE last_seen + 2 * window <= ?", (now,)
+        ).rowcount
+        removed += connection.execute(
+            "DELETE FROM rate_limits WHERE key IN ("
+            "SELECT key FROM rate_limits ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+            (self.max_keys,)
+        ).rowcount
+        self.evicted += removed
+        self._tracked_keys = connection.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    def tracked_keys(self) -> int:
+        """The key count from the last cleanup, so reading it never touches the database"""
+        return self._tracked_keys
+
+    def __len__(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+def client_address(request: Request) -> str:
+    """Rate limit key: the client's IP address"""
+    return request.client.host if request.client else "unknown"
+
+class RateLimiter:
+    """Sliding-window rate limiting for individual routes, with a pluggable backend"""
+
+    def __init__(self, backend, key_func: Callable[[Request], str] = client_address, hits: Counter = ratelimit_hits):
+        self.backend = backend
+        self.key_func = key_func
+        self.hits = hits
+
+    def limit(self, rule: str):
+        """Decorator for routes that take a `request: Request` parameter, e.g. @rate_limiter.limit("5/minute")"""
+        limit, window = parse_rule(rule)
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = kwargs.get("request") or next(arg for arg in args if isinstance(arg, Request))
+                await self.check(func.__name__, request, limit, window, rule)
+                return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    async def check(self, scope: str, request: Request, limit: int, window: int, rule: str):
+        """Count a hit and raise 429 when the limit is exceeded"""
+        key = f"{scope}:{self.key_func(request)}"
+        if self.backend.blocking:
+            allowed, retry_after = await asyncio.to_thread(self.backend.hit, key, limit, window, time.time())
+        else:
+            allowed, retry_after = self.backend.hit(key, limit, window, time.time())
+        self.hits.inc(route=scope, result="allowed" if allowed else "blocked")
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded: {rule}",
+                headers={"Retry-After": str(retry_after)}
+            )
+
+    def tracked_keys(self) -> int:
+        return self.backend.tracked_keys()
+
+    def stats(self) -> Dict:
+        """Counters for this process plus the backend's key count and evictions"""
+        routes = {}
+        for key, count in self.hits.snapshot():
+            labels = dict(key)
+            counts = routes.setdefault(labels["route"], {"allowed": 0, "blocked": 0})
+            counts[labels["result"]] = int(count)
+        tracked_keys = self.tracked_keys()
+        return {
+            "backend": type(self.backend).__name__,
+            "tracked_keys": tracked_keys,
+            "evicted_keys": self.backend.evicted,
+            "routes": routes
+        }
+
+def create_rate_limiter() -> RateLimiter:
+    """Build the limiter from environment settings"""
+    # Limits only hold across workers when they share the SQLite file
+    default_backend = "sqlite" if is_multi_worker() else "memory"
+    backend_name = os.environ.get("RATELIMIT_BACKEND", default_backend).lower()
+    max_keys = int(os.environ.get("RATELIMIT_MAX_KEYS", "10000"))
+
+    if backend_name == "sqlite":
+        db_path = os.environ.get("RATELIMIT_DB_PATH", os.path.join("runtime_data", "rate_limits.db"))
+        backend = SQLiteRateLimitBackend(db_path, max_keys)
+    else:
+        backend = MemoryRateLimitBackend(max_keys)
+
+    return RateLimiter(backend)
+
+# Global instance for easy access
+rate_limiter = create_rate_limiter()
+
+metrics.gauge("ratelimit_tracked_keys", "Clients the rate limiter is tracking", rate_limiter.tracked_keys)
+metrics.gauge("ratelimit_evicted_keys", "Rate limit keys evicted since start", lambda: rate_limiter.backend.evicted)
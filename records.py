@@ -0,0 +1,238 @@
+"""
+Typed records for the board files (data.json, feedback.json).
+
+Announcements, comments, like sets and feedback are held as slotted dataclasses
+rather than dicts: a record has no per-instance __dict__ and no copy of its key
+strings, and an announcement's sorting_date is parsed once, when it's loaded.
+
+Each record converts to and from the exact dict stored in the JSON files. Keys a
+record doesn't know about are kept in `extra`, so hand-added fields survive a
+round trip, and an announcement writes its keys back in the order the file had them.
+Every field is read with .get, so a legacy or hand-edited entry missing some of them
+still loads (an announcement without a sorting_date is left alone by the archiver)
+and writes back without them; one partial record can't break a whole page.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from board_data import sorting_day
+
+def _extra(data: Dict, known: frozenset) -> Optional[Dict]:
+    extra = {key: value for key, value in data.items() if key not in known}
+    return extra or None
+
+# One shared tuple per distinct key order (a board only has a handful)
+_key_orders: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+def _key_order(data: Dict) -> Tuple[str, ...]:
+    keys = tuple(data)
+    return _key_orders.setdefault(keys, keys)
+
+def _announcement_day(sorting_date: Optional[str]) -> date:
+    """The parsed sorting_date; date.max (never expires) when it's missing or malformed"""
+    if not isinstance(sorting_date, str):
+        return date.max
+    try:
+        return sorting_day(sorting_date)
+    except ValueError:
+        return date.max
+
+@dataclass(slots=True)
+class Comment:
+    username: Optional[str]
+    comment: Optional[str]
+    date: Optional[str]
+    email: Optional[str]
+    extra: Optional[Dict] = None
+
+    FIELDS = frozenset(("username", "comment", "date", "email"))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Comment":
+        # Nearly every comment has exactly the four known keys, so skip the extra scan then
+        extra = None if len(data) == 4 and cls.FIELDS.issuperset(data) else _extra(data, cls.FIELDS)
+        return cls(data.get("username"), data.get("comment"), data.get("date"), data.get("email"), extra)
+
+    def to_dict(self) -> Dict:
+        data = {"username": self.username, "comment": self.comment, "date": self.date, "email": self.email}
+        if None in data.values():
+            data = {key: value for key, value in data.items() if value is not None}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+@dataclass(slots=True)
+class LikeSet:
+    amount: int
+    accounts: List[str]
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LikeSet":
+        return cls(data.get("amount", 0), list(data.get("accounts", ())))
+
+    def to_dict(self) -> Dict:
+        return {"amount": self.amount, "accounts": list(self.accounts)}
+
+    def toggle(self, email: str) -> int:
+        """Like or un-like for this account; returns the new total"""
+        if email in self.accounts:
+            self.accounts.remove(email)
+            self.amount -= 1
+        else:
+            self.accounts.append(email)
+            self.amount += 1
+        return self.amount
+
+@dataclass(slots=True)
+class Announcement:
+    announcement_id: Optional[int]
+    title: Optional[str]
+    date: Optional[str]
+    sorting_date: Optional[str]
+    sorting_day: date
+    likes: LikeSet
+    link: Optional[str] = None
+    guest_mode: Optional[bool] = None
+    image_attachment: Optional[str] = None
+    description: Optional[str] = None
+    # None when the announcement has never had a comment (no "comments" key in the file)
+    comments: Optional[List[Comment]] = None
+    extra: Optional[Dict] = None
+    # The keys in the order the file had them (None for new announcements)
+    key_order: Optional[Tuple[str, ...]] = None
+
+    FIELDS = frozenset(("link", "date", "title", "guest_mode", "announcement_id", "sorting_date",
+                        "likes", "description", "image_attachment", "comments"))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Announcement":
+        comments = data.get("comments")
+        return cls(
+            announcement_id=data.get("announcement_id"),
+            title=data.get("title"),
+            date=data.get("date"),
+            sorting_date=data.get("sorting_date"),
+            sorting_day=_announcement_day(data.get("sorting_date")),
+            likes=LikeSet.from_dict(data.get("likes") or {}),
+            link=data.get("link"),
+            guest_mode=data.get("guest_mode"),
+            image_attachment=data.get("image_attachment"),
+            description=data.get("description"),
+            comments=None if comments is None else [Comment.from_dict(item) for item in comments],
+            extra=_extra(data, cls.FIELDS),
+            key_order=_key_order(data)
+        )
+
+    def to_dict(self) -> Dict:
+        # Fields that were absent from the file stay absent
+        data = {}
+        if self.link is not None:
+            data["link"] = self.link
+        if self.date is not None:
+            data["date"] = self.date
+        if self.title is not None:
+            data["title"] = self.title
+        if self.guest_mode is not None:
+            data["guest_mode"] = self.guest_mode
+        if self.announcement_id is not None:
+            data["announcement_id"] = self.announcement_id
+        if self.sorting_date is not None:
+            data["sorting_date"] = self.sorting_date
+        data["likes"] = self.likes.to_dict()
+        if self.description is not None:
+            data["description"] = self.description
+        if self.image_attachment is not None:
+            data["image_attachment"] = self.image_attachment
+        if self.comments is not None:
+            data["comments"] = [comment.to_dict() for comment in self.comments]
+        if self.extra:
+            data.update(self.extra)
+        if self.key_order is None or tuple(data) == self.key_order:
+            return data
+        # Back in the file's order; keys added since (a first comment) go last
+        ordered = {key: data[key] for key in self.key_order if key in data}
+        ordered.update(data)
+        return ordered
+
+    def add_comment(self, comment: Comment):
+        if self.comments is None:
+            self.comments = []
+        self.comments.append(comment)
+
+@dataclass(slots=True)
+class Feedback:
+    feedback_id: Optional[int]
+    email: Optional[str]
+    feedback_title: Optional[str]
+    feedback_description: Optional[str]
+    date: Optional[str]
+    image_attachment: Optional[str] = None
+    # None until an admin marks it (older entries have no "read" key)
+    read: Optional[bool] = None
+    extra: Optional[Dict] = None
+
+    FIELDS = frozenset(("email", "feedback_title", "feedback_description", "date",
+                        "feedback_id", "image_attachment", "read"))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Feedback":
+        return cls(
+            feedback_id=data.get("feedback_id"),
+            email=data.get("email"),
+            feedback_title=data.get("feedback_title"),
+            feedback_description=data.get("feedback_description"),
+            date=data.get("date"),
+            image_attachment=data.get("image_attachment"),
+            read=data.get("read"),
+            extra=_extra(data, cls.FIELDS)
+        )
+
+    def to_dict(self) -> Dict:
+        data = {
+            "email": self.email,
+            "feedback_title": self.feedback_title,
+            "feedback_description": self.feedback_description,
+            "date": self.date,
+            "feedback_id": self.feedback_id
+        }
+        if None in data.values():
+            data = {key: value for key, value in data.items() if value is not None}
+        if self.image_attachment is not None:
+            data["image_attachment"] = self.image_attachment
+        if self.read is not None:
+            data["read"] = self.read
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+# Whole files
+Board = Dict[str, List[Announcement]]
+
+def board_from_data(data: Dict) -> Board:
+    return {category: [Announcement.from_dict(item) for item in items] for category, items in data.items()}
+
+def board_to_data(board: Board) -> Dict:
+    return {category: [announcement.to_dict() for announcement in items] for category, items in board.items()}
+
+def find_announcement(board: Board, announcement_id: int) -> Optional[Announcement]:
+    for announcements in board.values():
+        for announcement in announcements:
+            if announcement.announcement_id == announcement_id:
+                return announcement
+    return None
+
+def feedback_from_data(data: Dict) -> Dict[str, Any]:
+    """feedback.json with its "feedbacks" list as Feedback records (other sections unchanged)"""
+    return dict(data, feedbacks=[Feedback.from_dict(item) for item in data.get("feedbacks", [])])
+
+def feedback_to_data(feedback_data: Dict[str, Any]) -> Dict:
+    return dict(feedback_data, feedbacks=[item.to_dict() for item in feedback_data["feedbacks"]])
+
+class RecordCodec(NamedTuple):
+    """How board_data converts a file's plain data to records and back"""
+    parse: Callable[[Any], Any]
+    dump: Callable[[Any], Any]
+
+ANNOUNCEMENTS = RecordCodec(board_from_data, board_to_data)
+FEEDBACK = RecordCodec(feedback_from_data, feedback_to_data)
@@ -0,0 +1,56 @@
+"""
+JSON responses encoded with orjson when it's installed.
+
+FastJSONResponse is the app's default response class and what the routes return
+explicitly. It writes the same JSON as Starlette's JSONResponse (compact, UTF-8,
+non-string keys turned into strings) but orjson encodes large lists several times
+faster, and board records (records.py) are written through their to_dict(), so a
+route can return the cached announcements as they are instead of copying them into
+dicts first. Without orjson the stdlib json module is used.
+"""
+
+import json
+import os
+from datetime import date
+from typing import Any
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib json module is used instead
+    orjson = None
+
+def _default(value: Any) -> Any:
+    """Types neither encoder writes by itself"""
+    to_dict = getattr(value, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _use_orjson() -> bool:
+    requested = os.environ.get("JSON_ENCODER", "orjson").lower()
+    if requested == "orjson" and orjson is None:
+        return False
+    return requested == "orjson"
+
+# Chosen once per process
+USE_ORJSON = _use_orjson()
+
+if orjson is not None:
+    # Dataclasses go through _default too, so records are written in their file format
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, as JSONResponse writes it"""
+    if USE_ORJSON:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+                      default=_default).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Callable, List, Tuple
+from runtime_scheduler import MAX_CACHE_SECONDS, scheduler as runtime_scheduler
+
+logger = logging.getLogger(__name__)
+
+class RuntimeLifecycle:
+    """
+    Warm-up and drain around the scheduled runtime windows.
+
+    A background task follows the scheduler: a few minutes before the board opens it
+    runs the warm-up hooks (parse data files, decrypt tables, compile templates) so the
+    first visitors don't pay for cold caches. When the board closes, form submissions
+    that belong to flows already in progress are still accepted for a short grace
+    period; then in-flight requests are waited for and the drain hooks run (flush
+    buffered writes, release caches).
+    """
+
+    def __init__(self, scheduler, warmup_minutes: float = 5, drain_grace_seconds: float = 60,
+                 drain_timeout_seconds: float = 30):
+        self.scheduler = scheduler
+        self.warmup_seconds = warmup_minutes * 60
+        self.drain_grace_seconds = drain_grace_seconds
+        self.drain_timeout_seconds = drain_timeout_seconds
+
+        self.warmup_hooks: List[Tuple[str, Callable]] = []
+        self.drain_hooks: List[Tuple[str, Callable]] = []
+        self.in_flight = 0
+
+        self._closes_at = None     # Monotonic time the current open window ends
+        self._warmed = False
+        self._was_open = False
+        self._task = None
+
+    # Hook registration (usable as decorators)
+    def on_warmup(self, func: Callable) -> Callable:
+        self.warmup_hooks.append((func.__name__, func))
+        return func
+
+    def on_drain(self, func: Callable) -> Callable:
+        self.drain_hooks.append((func.__name__, func))
+        return func
+
+    # Request tracking, used by the runtime middleware
+    def accepts_after_close(self, method: str) -> bool:
+        """Whether a request may still run although the window has just closed"""
+        if method == "GET" or self._closes_at is None:
+            return False
+        elapsed = time.monotonic() - self._closes_at
+        return 0 <= elapsed < self.drain_grace_seconds
+
+    def request_started(self):
+        self.in_flight += 1
+
+    def request_finished(self):
+        self.in_flight -= 1
+
+    # Hooks
+    async def _run_hooks(self, hooks: List[Tuple[str, Callable]], label: str):
+        for name, hook in hooks:
+            started = time.perf_counter()
+            try:
+                # Hooks do file and crypto work, so keep them off the event loop
+                await asyncio.to_thread(hook)
+                logger.info("%s %s (%.0f ms)", label, name, (time.perf_counter() - started) * 1000)
+            except Exception as e:
+                logger.error("Error in %s hook: %s", name, e)
+
+    async def warm_up(self):
+        logger.info("🔥 Warming up caches...")
+        await self._run_hooks(self.warmup_hooks, "🔥")
+        self._warmed = True
+
+    async def drain(self):
+        """Wait out the grace period and in-flight requests, then run the drain hooks"""
+        logger.info("🌙 Runtime window closed, draining...")
+        if self._closes_at is not None:
+            remaining_grace = self._closes_at + self.drain_grace_seconds - time.monotonic()
+            if remaining_grace > 0:
+                await asyncio.sleep(remaining_grace)
+
+        deadline = time.monotonic() + self.drain_timeout_seconds
+        while self.in_flight > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.in_flight > 0:
+            logger.warning("⚠️ Drain timed out with %d request(s) still running", self.in_flight)
+
+        await self._run_hooks(self.drain_hooks, "🌙")
+        self._warmed = False
+
+    # Background task
+    async def _step(self) -> float:
+        """Do whatever is due now and return how long to sleep before looking again"""
+        allowed = self.scheduler.is_runtime_allowed()
+        transition = self.scheduler.next_transition()
+        seconds_left = None
+        if transition is not None:
+            seconds_left = max((transition - datetime.now(self.scheduler.timezone)).total_seconds(), 0)
+
+        if allowed:
+            self._was_open = True
+            if seconds_left is None:
+                self._closes_at = None
+                return MAX_CACHE_SECONDS
+            self._closes_at = time.monotonic() + seconds_left
+            return max(min(seconds_left, MAX_CACHE_SECONDS), 0.5)
+
+        if self._was_open:
+            self._was_open = False
+            await self.drain()
+            return 0
+
+        if seconds_left is None:
+            return MAX_CACHE_SECONDS
+        if seconds_left <= self.warmup_seconds:
+            if not self._warmed:
+                await self.warm_up()
+            return max(min(seconds_left, MAX_CACHE_SECONDS), 0.5)
+        return min(seconds_left - self.warmup_seconds, MAX_CACHE_SECONDS)
+
+    async def run(self):
+        while True:
+            try:
+                delay = await self._step()
+            except Exception as e:
+                logger.error("Error in runtime lifecycle: %s", e)
+                delay = 60
+            await asyncio.sleep(delay)
+
+    def start(self):
+        """Start following the schedule (call from inside the running event loop)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        """Stop the background task and flush whatever the drain hooks hold"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._run_hooks(self.drain_hooks, "🌙")
+
+# Global instance for easy access
+lifecycle = RuntimeLifecycle(
+    runtime_scheduler,
+    warmup_minutes=float(os.environ.get("RUNTIME_WARMUP_MINUTES", "5")),
+    drain_grace_seconds=float(os.environ.get("RUNTIME_DRAIN_GRACE_SECONDS", "60")),
+    drain_timeout_seconds=float(os.environ.get("RUNTIME_DRAIN_TIMEOUT_SECONDS", "30"))
+)
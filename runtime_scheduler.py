@@ -1,8 +1,13 @@
 import os
-from datetime import datetime, time, timedelta
+import threading
+from datetime import datetime, time
+from time import monotonic
 import pytz
-from fastapi import HTTPException
 from fastapi.responses import HTMLResponse
+from schedule_calendar import calendar_from_environment
+
+# Even without a transition coming up, re-check the wall clock at least this often
+MAX_CACHE_SECONDS = 3600
 
 class RuntimeScheduler:
     def __init__(self, timezone="UTC"):
@@ -28,156 +33,185 @@ class RuntimeScheduler:
         
         # Portfolio mode: daily operation (set to false for daily, true for weekdays only)
         self.weekdays_only = os.environ.get("RUNTIME_WEEKDAYS_ONLY", "false").lower() == "true"
+        
+        # Full calendar (RUNTIME_SCHEDULE / RUNTIME_EXCEPTIONS); falls back to the hours above
+        self.calendar = calendar_from_environment(self.timezone, self.start_time, self.end_time, self.weekdays_only)
+        self.custom_schedule = bool(os.environ.get("RUNTIME_SCHEDULE") or os.environ.get("RUNTIME_SCHEDULE_FILE"))
+        
+        # Cached decision: valid until the monotonic deadline (the next open/close instant)
+        self._lock = threading.Lock()
+        self._allowed = False
+        self._next_transition = None
+        self._deadline = 0.0
+        self._transition_at = 0.0
+        self._maintenance_page = None
     
     def is_runtime_allowed(self) -> bool:
         """Check if current time is within allowed runtime hours"""
-        now = datetime.now(self.timezone)
-        current_time = now.time()
-        
-        # Check weekdays only mode (perfect for portfolio!)
-        if self.weekdays_only:
-            # Monday = 0, Sunday = 6
-            if now.weekday() >= 5:  # Saturday (5) or Sunday (6)
-                return False
-        
-        if self.start_time <= self.end_time:
-            # Normal case: 8 AM to 10 PM
-            return self.start_time <= current_time <= self.end_time
-        else:
-            # Overnight case: 10 PM to 8 AM
-            return current_time >= self.start_time or current_time <= self.end_time
+        # Hot path: a single monotonic clock comparison until the next transition
+        if monotonic() < self._deadline:
+            return self._allowed
+        return self._refresh()
+    
+    def _refresh(self) -> bool:
+        """Recompute the decision and the instant at which it next changes"""
+        with self._lock:
+            now = datetime.now(self.timezone)
+            allowed = self.is_runtime_allowed_at(now)
+            next_transition = self._find_next_transition(now)
+            
+            seconds_left = None
+            if next_transition is not None:
+                seconds_left = max((next_transition - now).total_seconds(), 0)
+            
+            if next_transition != self._next_transition or allowed != self._allowed:
+                self._maintenance_page = None
+            self._allowed = allowed
+            self._next_transition = next_transition
+            now_monotonic = monotonic()
+            self._transition_at = now_monotonic + seconds_left if seconds_left is not None else 0.0
+            self._deadline = now_monotonic + min(seconds_left if seconds_left is not None else MAX_CACHE_SECONDS,
+                                                 MAX_CACHE_SECONDS)
+            return allowed
+    
+    def _find_next_transition(self, now: datetime):
+        """First instant after `now` at which is_runtime_allowed_at flips"""
+        return self.calendar.next_transition(now)
+    
+    def next_transition(self):
+        """The (timezone-aware) instant at which the current open/closed state changes, or None"""
+        self.is_runtime_allowed()
+        return self._next_transition
+    
+    def seconds_until_transition(self) -> int:
+        """Whole seconds until the current open/closed state changes (0 if unknown)"""
+        self.is_runtime_allowed()
+        if self._next_transition is None:
+            return 0
+        return max(0, int(self._transition_at - monotonic()) + 1)
+    
+    def maintenance_page(self) -> bytes:
+        """The maintenance page for the current closed period, rendered once and reused"""
+        self.is_runtime_allowed()
+        page = self._maintenance_page
+        if page is None:
+            page = render_maintenance_page(self.get_schedule_info()).encode()
+            self._maintenance_page = page
+        return page
+    
+    def is_runtime_allowed_at(self, now: datetime) -> bool:
+        """Check whether a given (timezone-aware) moment is within allowed runtime hours"""
+        return self.calendar.is_open(now)
     
     def get_next_runtime(self) -> str:
         """Get next allowed runtime as string"""
-        now = datetime.now(self.timezone)
-        
         if self.is_runtime_allowed():
             return "Currently running"
         
-        # Calculate next start time
-        if now.time() < self.start_time:
-            # Same day
-            next_start = now.replace(
-                hour=self.start_time.hour, 
-                minute=self.start_time.minute, 
-                second=0, 
-                microsecond=0
-            )
-        else:
-            # Next day
-            next_start = now.replace(
-                hour=self.start_time.hour, 
-                minute=self.start_time.minute, 
-                second=0, 
-                microsecond=0
-            ) + timedelta(days=1)
-        
-        # If weekdays only, adjust to next weekday
-        if self.weekdays_only:
-            while next_start.weekday() >= 5:  # Skip weekends
-                next_start += timedelta(days=1)
+        if self._next_transition is not None:
+            return self._next_transition.strftime("%Y-%m-%d %H:%M %Z")
         
-        return next_start.strftime("%Y-%m-%d %H:%M %Z")
+        return "Not scheduled"
     
     def get_schedule_info(self) -> dict:
         """Get schedule information"""
-        schedule_type = "Weekdays Only" if self.weekdays_only else "Daily"
-        daily_hours = self._calculate_daily_hours()
-        monthly_hours = daily_hours * (22 if self.weekdays_only else 30)  # 22 weekdays per month
+        if self.custom_schedule:
+            schedule_type = "Custom"
+        else:
+            schedule_type = "Weekdays Only" if self.weekdays_only else "Daily"
+        
+        # Measured from the compiled calendar, so holidays and exam weeks are counted
+        now = datetime.now(self.timezone)
+        monthly_hours = self.calendar.open_seconds(now, 30) / 3600
+        daily_hours = self.calendar.open_seconds(now, 7) / 3600 / 7
         
         return {
             "start_time": self.start_time.strftime("%H:%M"),
             "end_time": self.end_time.strftime("%H:%M"),
+            "hours": self.calendar.describe(),
             "timezone": str(self.timezone),
             "schedule_type": schedule_type,
             "is_running": self.is_runtime_allowed(),
             "next_runtime": self.get_next_runtime(),
-            "daily_hours": daily_hours,
+            "daily_hours": round(daily_hours, 2),
             "monthly_hours": monthly_hours
         }
-    
-    def _calculate_daily_hours(self) -> float:
-        """Calculate daily runtime hours"""
-        if self.start_time <= self.end_time:
-            start_minutes = self.start_time.hour * 60 + self.start_time.minute
-            end_minutes = self.end_time.hour * 60 + self.end_time.minute
-            return (end_minutes - start_minutes) / 60
-        else:
-            # Overnight schedule
-            return 24 - self._calculate_daily_hours()
 
 # Global scheduler instance - Default to Philippine timezone
 scheduler = RuntimeScheduler(timezone=os.environ.get("TIMEZONE", "Asia/Manila"))
 
-def check_runtime_allowed():
-    """Middleware to check if runtime is allowed"""
-    if not scheduler.is_runtime_allowed():
-        schedule_info = scheduler.get_schedule_info()
-        maintenance_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Scheduled Maintenance</title>
-            <style>
-                body {{ 
-                    font-family: Arial, sans-serif; 
-                    text-align: center; 
-                    padding: 50px;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    margin: 0;
-                }}
-                .container {{ 
-                    max-width: 600px; 
-                    margin: 0 auto; 
-                    background: rgba(255,255,255,0.1);
-                    padding: 40px;
-                    border-radius: 20px;
-                    backdrop-filter: blur(10px);
-                }}
-                .clock {{ font-size: 3em; margin: 20px 0; }}
-                .schedule {{ font-size: 1.2em; margin: 20px 0; }}
-                .next-time {{ 
-                    background: rgba(255,255,255,0.2); 
-                    padding: 15px; 
-                    border-radius: 10px; 
-                    margin: 20px 0;
-                }}
-                .badge {{ 
-                    background: rgba(255,255,255,0.3); 
-                    padding: 5px 10px; 
-                    border-radius: 15px; 
-                    font-size: 0.9em;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>🌙 Digital Bulletin Board</h1>
-                <div class="clock">💤</div>
-                <h2>Scheduled Maintenance</h2>
-                <p>The bulletin board is currently offline for scheduled maintenance.</p>
-                
-                <div class="schedule">
-                    <span class="badge">{schedule_info['schedule_type']}</span><br><br>
-                    <strong>Operating Hours:</strong><br>
-                    {schedule_info['start_time']} - {schedule_info['end_time']} {schedule_info['timezone']}
-                </div>
-                
-                <div class="next-time">
-                    <strong>Next Available:</strong><br>
-                    {schedule_info['next_runtime']}
-                </div>
-                
-                <p>This helps conserve server resources and ensures optimal performance during peak hours.</p>
-                <p><em>Monthly usage: {schedule_info['monthly_hours']:.0f} hours (within free tier limits)</em></p>
-                <p>Thank you for your understanding! 🙏</p>
+def render_maintenance_page(schedule_info: dict) -> str:
+    """Build the HTML shown while the board is outside its operating hours"""
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Scheduled Maintenance</title>
+        <style>
+            body {{ 
+                font-family: Arial, sans-serif; 
+                text-align: center; 
+                padding: 50px;
+                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                color: white;
+                margin: 0;
+            }}
+            .container {{ 
+                max-width: 600px; 
+                margin: 0 auto; 
+                background: rgba(255,255,255,0.1);
+                padding: 40px;
+                border-radius: 20px;
+                backdrop-filter: blur(10px);
+            }}
+            .clock {{ font-size: 3em; margin: 20px 0; }}
+            .schedule {{ font-size: 1.2em; margin: 20px 0; }}
+            .next-time {{ 
+                background: rgba(255,255,255,0.2); 
+                padding: 15px; 
+                border-radius: 10px; 
+                margin: 20px 0;
+            }}
+            .badge {{ 
+                background: rgba(255,255,255,0.3); 
+                padding: 5px 10px; 
+                border-radius: 15px; 
+                font-size: 0.9em;
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <h1>🌙 Digital Bulletin Board</h1>
+            <div class="clock">💤</div>
+            <h2>Scheduled Maintenance</h2>
+            <p>The bulletin board is currently offline for scheduled maintenance.</p>
+            
+            <div class="schedule">
+                <span class="badge">{schedule_info['schedule_type']}</span><br><br>
+                <strong>Operating Hours:</strong><br>
+                {schedule_info['hours']} {schedule_info['timezone']}
             </div>
-        </body>
-        </html>
-        """
-        raise HTTPException(
-            status_code=503, 
-            detail=maintenance_html,
-            headers={"Content-Type": "text/html"}
-        )
+            
+            <div class="next-time">
+                <strong>Next Available:</strong><br>
+                {schedule_info['next_runtime']}
+            </div>
+            
+            <p>This helps conserve server resources and ensures optimal performance during peak hours.</p>
+            <p><em>Monthly usage: {schedule_info['monthly_hours']:.0f} hours (within free tier limits)</em></p>
+            <p>Thank you for your understanding! 🙏</p>
+        </div>
+    </body>
+    </html>
+    """
+
+def maintenance_response() -> HTMLResponse:
+    """Pre-rendered 503 page telling clients (and caches) when to come back"""
+    retry_after = scheduler.seconds_until_transition()
+    headers = {}
+    if retry_after:
+        headers["Retry-After"] = str(retry_after)
+        # Safe to cache: the page can't change before the board reopens
+        headers["Cache-Control"] = f"public, max-age={min(retry_after, 300)}"
+    return HTMLResponse(content=scheduler.maintenance_page(), status_code=503, headers=headers)
@@ -0,0 +1,289 @@
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Queries look a day back and a day ahead of the compiled horizon, so shorter ones never advance
+MIN_HORIZON_DAYS = 7
+
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+DAY_GROUPS = {
+    "daily": list(range(7)),
+    "weekdays": list(range(5)),
+    "weekends": [5, 6],
+}
+
+# Windows are (start_minute, end_minute) within a day; end may be 1440 (24:00)
+Window = Tuple[int, int]
+
+def parse_minutes(value: str) -> int:
+    """'07:30' -> 450, '24:00' -> 1440"""
+    hours, minutes = value.strip().split(":")
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= 1440:
+        raise ValueError(f"Invalid time of day: {value}")
+    return total
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def parse_windows(value) -> List[Window]:
+    """'07:00-12:00,13:00-19:00' (or a list of such strings); 'closed' means no windows"""
+    if isinstance(value, str):
+        value = [] if value.strip().lower() in ("", "closed") else value.split(",")
+    windows = []
+    for window in value:
+        start, end = window.split("-")
+        windows.append((parse_minutes(start), parse_minutes(end)))
+    return windows
+
+def parse_days(value: str) -> List[int]:
+    """'mon-fri', 'sat', 'daily', 'weekdays' or 'weekends' -> weekday numbers (Monday = 0)"""
+    value = value.strip().lower()
+    if value in DAY_GROUPS:
+        return DAY_GROUPS[value]
+    if "-" in value:
+        first, last = (DAY_NAMES.index(day[:3]) for day in value.split("-"))
+        return [day % 7 for day in range(first, last + 1 if last >= first else last + 8)]
+    return [DAY_NAMES.index(value[:3])]
+
+def parse_dates(value: str) -> List[date]:
+    """'2025-12-25' or an inclusive range '2026-03-09..2026-03-13'"""
+    if ".." in value:
+        first, last = (date.fromisoformat(part.strip()) for part in value.split(".."))
+    else:
+        first = last = date.fromisoformat(value.strip())
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+class ScheduleCalendar:
+    """
+    Opening hours as weekly rules plus dated exceptions.
+
+    Each weekday has any number of windows with minute granularity; a window whose end
+    is not after its start runs past midnight into the next day. Exceptions replace the
+    weekly rule for specific dates (an empty list closes the board for that day).
+
+    For queries the calendar is compiled into sorted, merged, non-overlapping
+    [open, close) intervals over a horizon of days, so "is it open?" and "when does that
+    change?" are a binary search instead of a day-by-day walk.
+    """
+
+    def __init__(self, timezone, weekly: Dict[int, List[Window]], exceptions: Dict[date, List[Window]] = None,
+                 horizon_days: int = 60):
+        self.timezone = timezone
+        self.weekly = {day: list(weekly.get(day, [])) for day in range(7)}
+        self.exceptions = dict(exceptions or {})
+        self.horizon_days = max(horizon_days, MIN_HORIZON_DAYS)
+
+        # (starts, ends, compiled_from, compiled_to), swapped as one tuple so readers never
+        # see a half-updated compilation
+        self._compiled = None
+
+    # Construction
+    @classmethod
+    def from_rules(cls, timezone, schedule: str, exceptions: str = "", **kwargs) -> "ScheduleCalendar":
+        """
+        Build from compact rule strings, e.g.
+            schedule   = "mon-fri 07:00-12:00,13:00-19:00; sat 08:00-12:00"
+            exceptions = "2025-12-25 closed; 2026-03-09..2026-03-13 06:00-22:00"
+        """
+        weekly = {}
+        for rule in filter(None, (part.strip() for part in schedule.split(";"))):
+            days, _, windows = rule.partition(" ")
+            for day in parse_days(days):
+                weekly[day] = parse_windows(windows)
+
+        dated = {}
+        for rule in filter(None, (part.strip() for part in (exceptions or "").split(";"))):
+            dates, _, windows = rule.partition(" ")
+            for day in parse_dates(dates):
+                dated[day] = parse_windows(windows)
+
+        return cls(timezone, weekly, dated, **kwargs)
+
+    @classmethod
+    def from_file(cls, timezone, file_path: str, **kwargs) -> "ScheduleCalendar":
+        """
+        Build from a JSON file:
+            {"weekly": {"mon-fri": ["07:00-19:00"], "sat": ["08:00-12:00"]},
+             "exceptions": {"2025-12-25": [], "2026-03-09..2026-03-13": ["06:00-22:00"]}}
+        """
+        with open(file_path, "r") as file:
+            config = json.load(file)
+
+        weekly = {}
+        for days, windows in config.get("weekly", {}).items():
+            for day in parse_days(days):
+                weekly[day] = parse_windows(windows)
+
+        dated = {}
+        for dates, windows in config.get("exceptions", {}).items():
+            for day in parse_dates(dates):
+                dated[day] = parse_windows(windows)
+
+        return cls(timezone, weekly, dated, **kwargs)
+
+    @classmethod
+    def from_hours(cls, timezone, start: time, end: time, weekdays_only: bool = False, **kwargs) -> "ScheduleCalendar":
+        """
+        The original single daily window (RUNTIME_START_HOUR / RUNTIME_END_HOUR).
+        Equal hours mean closed, as they always have (the old check was only true at that
+        exact instant); use RUNTIME_SCHEDULE="daily 00:00-24:00" to stay open all day.
+        """
+        start_minute = start.hour * 60 + start.minute
+        end_minute = end.hour * 60 + end.minute
+        if start_minute < end_minute:
+            windows = [(start_minute, end_minute)]
+        elif start_minute == end_minute:
+            windows = []
+        else:
+            # Overnight: both ends belong to the same calendar day, as before
+            windows = [(0, end_minute), (start_minute, 1440)]
+
+        days = DAY_GROUPS["weekdays"] if weekdays_only else DAY_GROUPS["daily"]
+        return cls(timezone, {day: windows for day in days}, **kwargs)
+
+    # Rules for a single day
+    def windows_for(self, day: date) -> List[Window]:
+        if day in self.exceptions:
+            return self.exceptions[day]
+        return self.weekly[day.weekday()]
+
+    def _local_timestamp(self, day: date, minute: int) -> float:
+        naive = datetime.combine(day, time(0)) + timedelta(minutes=minute)
+        return self.timezone.localize(naive).timestamp()
+
+    # Compilation
+    def compile(self, around: datetime) -> Tuple[List[float], List[float], float, float]:
+        """Turn the rules into merged absolute intervals covering the horizon around `around`"""
+        first_day = around.astimezone(self.timezone).date() - timedelta(days=1)
+        last_day = first_day + timedelta(days=self.horizon_days)
+
+        intervals = []
+        day = first_day
+        while day <= last_day:
+            for start, end in self.windows_for(day):
+                opens = self._local_timestamp(day, start)
+                if end > start:
+                    closes = self._local_timestamp(day, end)
+                else:
+                    closes = self._local_timestamp(day + timedelta(days=1), end)
+                intervals.append((opens, closes))
+            day += timedelta(days=1)
+
+        intervals.sort()
+        merged = []
+        for opens, closes in intervals:
+            if merged and opens <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], closes)
+            else:
+                merged.append([opens, closes])
+
+        self._compiled = (
+            [interval[0] for interval in merged],
+            [interval[1] for interval in merged],
+            self._local_timestamp(first_day, 0),
+            self._local_timestamp(last_day, 0),
+        )
+        return self._compiled
+
+    def _intervals(self, timestamp: float):
+        # Keep a day of margin at each end so windows spilling over midnight are complete
+        compiled = self._compiled
+        if compiled is None or not compiled[2] + 86400 <= timestamp < compiled[3] - 86400:
+            compiled = self.compile(datetime.fromtimestamp(timestamp, self.timezone))
+        return compiled
+
+    # Queries
+    def is_open(self, moment: datetime) -> bool:
+        timestamp = moment.timestamp()
+        starts, ends, _, _ = self._intervals(timestamp)
+        index = bisect_right(starts, timestamp) - 1
+        return index >= 0 and timestamp < ends[index]
+
+    def next_transition(self, moment: datetime, max_days: int = 366) -> Optional[datetime]:
+        """The next instant after `moment` at which the board opens or closes (None if never)"""
+        timestamp = moment.timestamp()
+        limit = timestamp + max_days * 86400
+        is_open = self.is_open(moment)
+
+        while timestamp < limit:
+            starts, ends, _, compiled_to = self._intervals(timestamp)
+            if is_open:
+                transition = ends[bisect_right(starts, timestamp) - 1]
+            else:
+                index = bisect_left(starts, timestamp)
+                transition = starts[index] if index < len(starts) else None
+
+            # A transition at the edge of the compiled horizon may just be where compilation stopped
+            horizon_edge = compiled_to - 86400
+            if transition is not None and transition < horizon_edge:
+                return datetime.fromtimestamp(transition, self.timezone)
+            if horizon_edge <= timestamp:
+                break  # Can't happen with MIN_HORIZON_DAYS, but never spin
+            timestamp = horizon_edge
+        return None
+
+    def open_seconds(self, moment: datetime, days: int) -> float:
+        """Total open time between `moment` and `days` days later"""
+        total = 0.0
+        current = moment
+        end = moment + timedelta(days=days)
+        is_open = self.is_open(current)
+        while current < end:
+            transition = self.next_transition(current)
+            segment_end = min(transition, end) if transition else end
+            if is_open:
+                total += (segment_end - current).total_seconds()
+            current = segment_end
+            is_open = not is_open
+        return total
+
+    def describe(self) -> str:
+        """Human readable weekly rules, e.g. 'Mon-Fri 07:00-19:00 · Sat 08:00-12:00'"""
+        groups = []
+        for day in range(7):
+            windows = self.weekly[day]
+            if groups and groups[-1][2] == windows and groups[-1][1] == day - 1:
+                groups[-1][1] = day
+            else:
+                groups.append([day, day, windows])
+
+        parts = []
+        for first, last, windows in groups:
+            if not windows:
+                continue
+            days = DAY_NAMES[first].title()
+            if (first, last) == (0, 6):
+                days = "Daily"
+            elif last != first:
+                days += f"-{DAY_NAMES[last].title()}"
+            hours = ", ".join(f"{format_minutes(start)}-{format_minutes(end)}" for start, end in windows)
+            parts.append(f"{days} {hours}")
+        return " · ".join(parts) if parts else "Closed"
+
+def calendar_from_environment(timezone, start: time, end: time, weekdays_only: bool) -> ScheduleCalendar:
+    """
+    RUNTIME_SCHEDULE_FILE (JSON) or RUNTIME_SCHEDULE (+ RUNTIME_EXCEPTIONS) when set,
+    otherwise the classic single window from RUNTIME_START_HOUR / RUNTIME_END_HOUR.
+    """
+    horizon_days = int(os.environ.get("RUNTIME_HORIZON_DAYS", "60"))
+    if horizon_days < MIN_HORIZON_DAYS:
+        logger.warning("⚠️ RUNTIME_HORIZON_DAYS=%d is too short, using %d", horizon_days, MIN_HORIZON_DAYS)
+    schedule_file = os.environ.get("RUNTIME_SCHEDULE_FILE")
+    schedule = os.environ.get("RUNTIME_SCHEDULE")
+    exceptions = os.environ.get("RUNTIME_EXCEPTIONS", "")
+
+    if schedule_file:
+        calendar = ScheduleCalendar.from_file(timezone, schedule_file, horizon_days=horizon_days)
+    elif schedule:
+        calendar = ScheduleCalendar.from_rules(timezone, schedule, exceptions, horizon_days=horizon_days)
+    else:
+        calendar = ScheduleCalendar.from_hours(timezone, start, end, weekdays_only, horizon_days=horizon_days)
+        if exceptions:
+            calendar.exceptions.update(ScheduleCalendar.from_rules(timezone, "", exceptions).exceptions)
+    return calendar
@@ -1,7 +1,15 @@
 import json
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
 from cryptography.fernet import Fernet
-from typing import Dict, Any
+from typing import Any, Callable, Dict, List
+import serialization
+from shared_state import atomic_write_bytes, file_signature
+
+logger = logging.getLogger(__name__)
 
 class SecureConfig:
     def __init__(self, config_dir: str = "super_secret_stuff"):
@@ -12,11 +20,39 @@ class SecureConfig:
         # Create directory if it doesn't exist
         os.makedirs(config_dir, exist_ok=True)
         
-        # Initialize encryption
-        self.cipher = self._get_or_create_cipher()
+        # The key is read and the config decrypted on first access, not at import
+        self._cipher = None
+        self._data = None
+        self._load_lock = threading.RLock()
+        
+        # Readers always see a complete config: changes are made on a copy inside a
+        # transaction and swapped in with one assignment after the file is written
+        self._pending = None
+        self._signature = None
+        self._watcher = None
         
-        # Load or create config
-        self._config_data = self._load_or_create_config()
+        # Called with the new keys whenever they change (e.g. to drop cached sessions)
+        self._secret_key_listeners: List[Callable[[Dict], None]] = []
+    
+    @property
+    def cipher(self) -> Fernet:
+        if self._cipher is None:
+            with self._load_lock:
+                if self._cipher is None:
+                    self._cipher = self._get_or_create_cipher()
+        return self._cipher
+    
+    @property
+    def _config_data(self) -> Dict:
+        if self._data is None:
+            with self._load_lock:
+                if self._data is None:
+                    self._data = self._load_or_create_config()
+        return self._data
+    
+    def load(self):
+        """Load (or create) the key and config now instead of on first access"""
+        return self._config_data
     
     def _get_or_create_cipher(self) -> Fernet:
         """Get existing config encryption key or create a new one"""
@@ -27,36 +63,38 @@ class SecureConfig:
             key = Fernet.generate_key()
             with open(self.key_file, 'wb') as key_file:
                 key_file.write(key)
-            print(f"🔐 Created new config encryption key: {self.key_file}")
+            logger.info("🔐 Created new config encryption key: %s", self.key_file)
         
         return Fernet(key)
     
     def _encrypt_data(self, data: Dict) -> bytes:
         """Encrypt configuration data"""
-        json_data = json.dumps(data, indent=2)
-        return self.cipher.encrypt(json_data.encode())
+        return self.cipher.encrypt(serialization.dumps(data))
     
     def _decrypt_data(self, encrypted_data: bytes) -> Dict:
         """Decrypt configuration data"""
         decrypted_data = self.cipher.decrypt(encrypted_data)
-        return json.loads(decrypted_data.decode())
+        return serialization.loads(decrypted_data)
     
     def _load_or_create_config(self) -> Dict:
         """Load encrypted config or migrate from plain text"""
         # Check if encrypted config exists
         if os.path.exists(self.config_file):
             try:
+                signature = file_signature(self.config_file)
                 with open(self.config_file, 'rb') as file:
                     encrypted_data = file.read()
-                    return self._decrypt_data(encrypted_data)
+                data = self._decrypt_data(encrypted_data)
+                self._signature = signature
+                return data
             except Exception as e:
-                print(f"❌ Error loading encrypted config: {e}")
+                logger.error("❌ Error loading encrypted config: %s", e)
                 return {}
         
         # Check if plain text config exists (for migration)
         plain_config_file = os.path.join(self.config_dir, "supersecret.json")
         if os.path.exists(plain_config_file):
-            print("🔄 Migrating plain text config to encrypted format...")
+            logger.info("🔄 Migrating plain text config to encrypted format...")
             try:
                 with open(plain_config_file, 'r') as file:
                     data = json.load(file)
@@ -67,16 +105,16 @@ class SecureConfig:
                 # Backup and remove plain text file
                 backup_file = os.path.join(self.config_dir, "supersecret.json.backup")
                 os.rename(plain_config_file, backup_file)
-                print(f"✅ Config migrated! Plain text backed up to: {backup_file}")
-                print("🔥 IMPORTANT: Delete the backup file after confirming everything works!")
+                logger.info("✅ Config migrated! Plain text backed up to: %s", backup_file)
+                logger.warning("🔥 IMPORTANT: Delete the backup file after confirming everything works!")
                 
                 return data
             except Exception as e:
-                print(f"❌ Error migrating config: {e}")
+                logger.error("❌ Error migrating config: %s", e)
                 return {}
         
         # Create default config if none exists
-        print("📝 Creating default encrypted config...")
+        logger.info("📝 Creating default encrypted config...")
         default_config = {
             "verification": [
                 {
@@ -102,75 +140,169 @@ class SecureConfig:
     def _save_config(self, data: Dict):
         """Save configuration data in encrypted format"""
         encrypted_data = self._encrypt_data(data)
-        with open(self.config_file, 'wb') as file:
-            file.write(encrypted_data)
+        atomic_write_bytes(self.config_file, encrypted_data)
+        # Our own write shouldn't look like an outside change to the watcher
+        self._signature = file_signature(self.config_file)
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group several set() calls into a single encrypt + write.
+        
+        Readers keep seeing the previous config until the block finishes, then see all
+        of its changes at once; nothing is written if the block raises.
+        """
+        with self._load_lock:
+            if self._pending is not None:
+                # Nested: the outermost transaction writes
+                yield
+                return
+            
+            current = self._config_data
+            self._pending = json.loads(json.dumps(current))
+            try:
+                yield
+                if self._pending != current:
+                    self._save_config(self._pending)
+                    self._swap(self._pending)
+            finally:
+                self._pending = None
+    
+    def _swap(self, data: Dict):
+        """Replace the in-memory config and tell listeners if the secret keys changed"""
+        old_keys = self.get_secret_keys() if self._data is not None else None
+        self._data = data
+        if old_keys is not None and old_keys != self.get_secret_keys():
+            self._notify_secret_keys_changed()
+    
+    def reload_if_changed(self) -> bool:
+        """Pick up a config file rewritten by another process (e.g. config_manager.py)"""
+        if self._data is None:
+            return False
+        signature = file_signature(self.config_file)
+        if signature is None or signature == self._signature:
+            return False
+        
+        with self._load_lock:
+            if signature == self._signature:
+                return False
+            try:
+                with open(self.config_file, 'rb') as file:
+                    data = self._decrypt_data(file.read())
+            except Exception as e:
+                logger.error("❌ Error reloading encrypted config: %s", e)
+                # Don't retry the same broken file on every poll
+                self._signature = signature
+                return False
+            self._signature = signature
+            self._swap(data)
+        logger.info("🔄 Reloaded encrypted config")
+        return True
+    
+    def start_watcher(self, interval: float = 5.0):
+        """Poll the config file in a background thread and reload it when it changes"""
+        if interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.error("Error watching config: %s", e)
+        
+        self._watcher = threading.Thread(target=watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+    
+    def _lookup(self, data: Dict, section: str, key: str = None, index: int = 0) -> Any:
+        if section not in data:
+            return None
+        
+        section_data = data[section]
+        if isinstance(section_data, list) and len(section_data) > index:
+            item = section_data[index]
+            if key:
+                return item.get(key)
+            return item
+        elif isinstance(section_data, dict) and key:
+            return section_data.get(key)
+        
+        return section_data
     
     def get(self, section: str, key: str = None, index: int = 0) -> Any:
         """Get configuration value"""
         try:
-            if section not in self._config_data:
-                return None
-            
-            section_data = self._config_data[section]
-            if isinstance(section_data, list) and len(section_data) > index:
-                item = section_data[index]
-                if key:
-                    return item.get(key)
-                return item
-            elif isinstance(section_data, dict) and key:
-                return section_data.get(key)
-            
-            return section_data
+            return self._lookup(self._config_data, section, key, index)
         except Exception as e:
-            print(f"Error getting config value: {e}")
+            logger.error("Error getting config value: %s", e)
             return None
     
     def set(self, section: str, key: str, value: Any, index: int = 0):
-        """Set configuration value"""
+        """Set configuration value (written immediately unless inside a transaction)"""
         try:
-            if section not in self._config_data:
-                self._config_data[section] = [{}]
-            
-            if isinstance(self._config_data[section], list):
-                while len(self._config_data[section]) <= index:
-                    self._config_data[section].append({})
-                self._config_data[section][index][key] = value
-            else:
-                self._config_data[section][key] = value
+            with self.transaction():
+                data = self._pending
+                if section not in data:
+                    data[section] = [{}]
+                
+                if isinstance(data[section], list):
+                    while len(data[section]) <= index:
+                        data[section].append({})
+                    data[section][index][key] = value
+                else:
+                    data[section][key] = value
             
-            self._save_config(self._config_data)
-            print(f"✅ Updated config: {section}.{key}")
+            logger.info("✅ Updated config: %s.%s", section, key)
         except Exception as e:
-            print(f"Error setting config value: {e}")
+            logger.error("Error setting config value: %s", e)
     
     def get_email_config(self) -> Dict:
         """Get email configuration"""
+        # One snapshot, so a concurrent reload can't mix the old sender with the new password
+        data = self._config_data
         return {
-            "email_sender": self.get("verification", "email_sender"),
-            "password": self.get("verification", "password")
+            "email_sender": self._lookup(data, "verification", "email_sender"),
+            "password": self._lookup(data, "verification", "password")
         }
     
     def get_secret_keys(self) -> Dict:
         """Get secret keys"""
+        data = self._config_data
         return {
-            "user_key": self.get("SuperSecret", "SuperSecretKey"),
-            "admin_key": self.get("SuperSecret", "SuperSecretKeyAdmin")
+            "user_key": self._lookup(data, "SuperSecret", "SuperSecretKey"),
+            "admin_key": self._lookup(data, "SuperSecret", "SuperSecretKeyAdmin")
         }
     
     def update_email_config(self, email: str, password: str):
         """Update email configuration"""
-        self.set("verification", "email_sender", email)
-        self.set("verification", "password", password)
+        with self.transaction():
+            self.set("verification", "email_sender", email)
+            self.set("verification", "password", password)
+    
+    def on_secret_keys_changed(self, callback: Callable[[Dict], None]):
+        """Register a callback that receives the new secret keys after a rotation"""
+        self._secret_key_listeners.append(callback)
+    
+    def _notify_secret_keys_changed(self):
+        keys = self.get_secret_keys()
+        for callback in self._secret_key_listeners:
+            try:
+                callback(keys)
+            except Exception as e:
+                logger.error("Error in secret key listener: %s", e)
     
     def regenerate_secret_keys(self):
         """Generate new secret keys"""
         new_user_key = f"user_key_{Fernet.generate_key().decode()[:16]}"
         new_admin_key = f"admin_key_{Fernet.generate_key().decode()[:16]}"
         
-        self.set("SuperSecret", "SuperSecretKey", new_user_key)
-        self.set("SuperSecret", "SuperSecretKeyAdmin", new_admin_key)
+        # Listeners are notified when the transaction swaps the new keys in
+        with self.transaction():
+            self.set("SuperSecret", "SuperSecretKey", new_user_key)
+            self.set("SuperSecret", "SuperSecretKeyAdmin", new_admin_key)
         
-        print("🔑 Generated new secret keys!")
+        logger.info("🔑 Generated new secret keys!")
         return {
             "user_key": new_user_key,
             "admin_key": new_admin_key
@@ -0,0 +1,49 @@
+"""
+Compact encodings for the payloads stored inside encrypted files.
+
+Payloads are written as compact JSON (no indentation) or, when msgpack is installed
+and selected with ENCRYPTED_PAYLOAD_FORMAT=msgpack, as MessagePack. Reading detects
+the format from the first byte, so files in the old pretty-printed JSON, compact
+JSON and msgpack can all be mixed and switching formats needs no migration.
+"""
+
+import json
+import logging
+import os
+from typing import Any
+
+try:
+    import msgpack
+except ImportError:  # Optional: compact JSON is used instead
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("json", "msgpack")
+
+def default_format() -> str:
+    requested = os.environ.get("ENCRYPTED_PAYLOAD_FORMAT", "json").lower()
+    if requested == "msgpack" and msgpack is None:
+        logger.warning("⚠️ ENCRYPTED_PAYLOAD_FORMAT=msgpack but msgpack is not installed, using compact JSON")
+        return "json"
+    return requested if requested in FORMATS else "json"
+
+def dumps(data: Any, format: str = None) -> bytes:
+    """Encode data as compact JSON or msgpack"""
+    if (format or PAYLOAD_FORMAT) == "msgpack":
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+def loads(payload: bytes) -> Any:
+    """Decode a payload written by dumps (or by the old json.dumps(indent=2))"""
+    # JSON documents here always start with an object/array (possibly after whitespace);
+    # a msgpack map or array starts with a byte outside the ASCII range
+    stripped = payload.lstrip()
+    if not stripped or stripped[:1] in (b"{", b"["):
+        return json.loads(payload)
+    if msgpack is None:
+        raise ValueError("Payload is msgpack-encoded but msgpack is not installed")
+    return msgpack.unpackb(payload, raw=False)
+
+# Format chosen once per process
+PAYLOAD_FORMAT = default_format()
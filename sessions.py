@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from itsdangerous import BadData, URLSafeTimedSerializer
+from metrics import cache_lookup
+from profiling import span
+from secure_config import secure_config
+
+class SessionManager:
+    """
+    Issues and checks the signed session_token cookies.
+
+    Tokens that verified recently are remembered in a small LRU cache, so hot sessions
+    skip the HMAC check and decoding on every page view. Entries never outlive the
+    token's max age, expire after a short TTL, and are all dropped when the secret
+    keys rotate.
+    """
+
+    def __init__(self, config, max_age: int = 604800, cache_size: int = 2048, cache_ttl: float = 300):
+        self.config = config
+        self.max_age = max_age
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        # (serializer, cache) are swapped together on rotation so a lookup never mixes
+        # a new key with tokens verified under the old one
+        self._state = None
+        config.on_secret_keys_changed(self.rotate)
+
+    def _current(self):
+        state = self._state
+        if state is None:
+            with self._lock:
+                if self._state is None:
+                    serializer = URLSafeTimedSerializer(self.config.get_secret_keys()["user_key"])
+                    self._state = (serializer, OrderedDict())  # token -> (email, valid_until)
+                state = self._state
+        return state
+
+    def rotate(self, *_):
+        """Forget the serializer and every cached token (called when the keys change)"""
+        with self._lock:
+            self._state = None
+
+    def issue(self, email: str) -> str:
+        serializer, _ = self._current()
+        return serializer.dumps(email)
+
+    def verify(self, token: Optional[str]) -> Optional[str]:
+        """Return the email in a valid token, or None"""
+        if not token:
+            return None
+        serializer, cache = self._current()
+        now = time.time()
+
+        with self._lock:
+            entry = cache.get(token)
+            if entry is not None:
+                if entry[1] > now:
+                    cache.move_to_end(token)
+                    cache_lookup("sessions", True)
+                    return entry[0]
+                del cache[token]
+        cache_lookup("sessions", False)
+
+        try:
+            email, issued_at = serializer.loads(token, max_age=self.max_age, return_timestamp=True)
+        except BadData:
+            return None
+
+        # Never trust a cached entry past the point where the token itself expires
+        valid_until = min(now + self.cache_ttl, issued_at.timestamp() + self.max_age)
+        with self._lock:
+            if self._state is not None and self._state[1] is cache:
+                cache[token] = (email, valid_until)
+                cache.move_to_end(token)
+                while len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+        return email
+
+    def for_request(self, token: Optional[str]) -> "RequestAuth":
+        return RequestAuth(self, token)
+
+    def cache_info(self) -> dict:
+        state = self._state
+        return {"cached_tokens": len(state[1]) if state else 0, "max_age": self.max_age}
+
+class RequestAuth:
+    """
+    The session behind one request's session_token cookie.
+
+    Nothing is verified until a route asks for the email, so guest pages and requests
+    without the cookie never touch the signing key; the result is kept for the rest
+    of the request.
+    """
+
+    __slots__ = ("manager", "token", "_email", "_checked")
+
+    def __init__(self, manager: SessionManager, token: Optional[str]):
+        self.manager = manager
+        self.token = token
+        self._email = None
+        self._checked = False
+
+    @property
+    def has_session(self) -> bool:
+        """A session cookie was sent (not verified)"""
+        return bool(self.token)
+
+    @property
+    def email(self) -> Optional[str]:
+        """The signed-in user's email, or None for guests and invalid or expired tokens"""
+        if not self._checked:
+            if self.token:
+                # Recently verified tokens come from the session cache without redoing the HMAC check
+                with span("session decode"):
+                    self._email = self.manager.verify(self.token)
+            self._checked = True
+        return self._email
+
+# Global instance for easy access
+session_manager = SessionManager(
+    secure_config,
+    max_age=int(os.environ.get("SESSION_MAX_AGE", "604800")),
+    cache_size=int(os.environ.get("SESSION_CACHE_SIZE", "2048")),
+    cache_ttl=float(os.environ.get("SESSION_CACHE_SECONDS", "300"))
+)
@@ -0,0 +1,154 @@
+"""
+Process-safe access to the files the app shares between worker processes.
+
+Every worker keeps its own parsed copy of a JSON file and reuses it until the file
+changes on disk (inode, mtime or size differ), so a write by any worker invalidates
+the caches of all the others. Writers hold an exclusive lock on a sidecar .lock file
+for the whole read-modify-write and replace the file atomically.
+"""
+
+import contextvars
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+from metrics import board_file_seconds, cache_lookup
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+def get_worker_count() -> int:
+    """Number of worker processes requested through WEB_CONCURRENCY ("auto" = one per core)"""
+    value = os.environ.get("WEB_CONCURRENCY", "1").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return 1
+
+def is_multi_worker() -> bool:
+    return get_worker_count() > 1
+
+# File locking
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+# The locks held by the current holder: a thread, or an asyncio task (each task runs in
+# its own context, so coroutines on the event loop thread don't share their locks)
+_held_locks: contextvars.ContextVar[FrozenSet[str]] = contextvars.ContextVar("held_locks", default=frozenset())
+
+def _thread_lock(path: str) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(path, threading.Lock())
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock for `path` across threads and processes (re-entrant per holder)"""
+    lock_path = f"{os.path.abspath(path)}.lock"
+    held = _held_locks.get()
+    if lock_path in held:
+        # flock would block on a second descriptor for the lock this holder already has
+        yield
+        return
+
+    with _thread_lock(lock_path):
+        with open(lock_path, "a+b") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            token = _held_locks.set(held | {lock_path})
+            try:
+                yield
+            finally:
+                _held_locks.reset(token)
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def atomic_write_bytes(path: str, data: bytes):
+    """Write through a temporary file so readers never see a partial file"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+# JSON files
+_json_cache: Dict[str, Tuple[Tuple[int, int, int], Any]] = {}
+_json_cache_lock = threading.Lock()
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Cheap identity of a file's current contents; changes whenever any process rewrites it"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def read_json(path: str) -> Any:
+    """Parse a JSON file from disk, bypassing the cache (safe to mutate)"""
+    with board_file_seconds.time(file=os.path.basename(path), operation="load"):
+        with open(path, "r") as file:
+            return json.load(file)
+
+def load_cached(path: str, parse: Callable[[str], Any]) -> Any:
+    """
+    Return parse(path), reusing the cached result while the file is unchanged.
+
+    The returned object is shared: treat it as read-only.
+    """
+    signature = file_signature(path)
+    with _json_cache_lock:
+        cached = _json_cache.get(path)
+    if cached and signature and cached[0] == signature:
+        cache_lookup("files", True)
+        return cached[1]
+
+    cache_lookup("files", False)
+    data = parse(path)
+    if signature:
+        with _json_cache_lock:
+            _json_cache[path] = (signature, data)
+    return data
+
+def load_json(path: str) -> Any:
+    """
+    Return the parsed JSON file, reusing the cached copy while the file is unchanged.
+
+    The returned object is shared: treat it as read-only and use update_json to modify.
+    """
+    return load_cached(path, read_json)
+
+def save_json(path: str, data: Any, indent: int = 2):
+    """Atomically replace a JSON file (callers doing read-modify-write should use update_json)"""
+    with board_file_seconds.time(file=os.path.basename(path), operation="save"):
+        atomic_write_bytes(path, json.dumps(data, indent=indent).encode())
+    invalidate(path)
+
+@contextmanager
+def update_json(path: str, indent: int = 2):
+    """
+    Read-modify-write a JSON file under an exclusive cross-process lock.
+
+    The data is written back when the block exits normally; raising inside the block
+    leaves the file untouched.
+    """
+    with file_lock(path):
+        data = read_json(path)
+        yield data
+        save_json(path, data, indent=indent)
+
+def invalidate(path: str = None):
+    """Drop cached copies (all of them when no path is given)"""
+    with _json_cache_lock:
+        if path is None:
+            _json_cache.clear()
+        else:
+            _json_cache.pop(path, None)
@@ -2,18 +2,74 @@ const itemsPerPage = 10;
 let currentPage = 1;
 let announcements = [];
 
+// Archives are split into shards listed in a manifest; shards are fetched newest
+// first and only when a page actually needs them.
+const archiveDataPath = '/static/data/archives';
+let shardKeys = [];
+let shardFiles = {};
+let loadedShards = 0;
+let totalArchived = 0;
+
+async function fetchJson(url) {
+    const response = await fetch(`${url}?cache_bust=${new Date().getTime()}`);
+    return response.json();
+}
+
+async function loadShardsUntil(itemCount) {
+    while (loadedShards < shardKeys.length && announcements.length < itemCount) {
+        const shard = await fetchJson(`${archiveDataPath}/${shardFiles[shardKeys[loadedShards]]}`);
+        loadedShards++;
+        announcements = announcements.concat(
+            shard.important_announcements || [],
+            shard.upcoming_deadlines_events || [],
+            shard.milestones || []
+        );
+    }
+}
+
+async function showPage(page) {
+    await loadShardsUntil(page * itemsPerPage);
+    renderPage(page);
+}
+
+function goToPage(page, items) {
+    if (items === announcements) {
+        showPage(page);
+    } else {
+        renderPage(page, items);
+    }
+}
+
+// Newest first by the date range the manifest gives each shard; shards without one
+// ("undated") come last
+function compareShards(a, b) {
+    if (!a.end || !b.end) {
+        return (a.end ? 0 : 1) - (b.end ? 0 : 1);
+    }
+    return b.end.localeCompare(a.end) || b.start.localeCompare(a.start);
+}
+
 async function loadData() {
     try {
-        const response = await fetch(`/static/data/archived_data.json?cache_bust=${new Date().getTime()}`);
-        const data = await response.json();
-        announcements = data.important_announcements.concat(data.upcoming_deadlines_events, data.milestones);
-        renderPage(currentPage);
+        const manifest = await fetchJson(`${archiveDataPath}/manifest.json`);
+        shardKeys = Object.keys(manifest.shards).sort((a, b) => compareShards(manifest.shards[a], manifest.shards[b]));
+        shardKeys.forEach(key => {
+            shardFiles[key] = manifest.shards[key].file;
+        });
+        totalArchived = manifest.total;
+        await showPage(currentPage);
     } catch (error) {
         console.error("Error loading data:", error);
     }
 }
 
-function filterAnnouncements(query) {
+async function filterAnnouncements(query) {
+    if (!query) {
+        showPage(1);
+        return;
+    }
+    // Searching needs every shard
+    await loadShardsUntil(Infinity);
     const filteredItems = announcements.filter(item =>
         item.title.toLowerCase().includes(query.toLowerCase()) ||
         (item.date && item.date.toLowerCase().includes(query.toLowerCase()))
@@ -83,7 +139,8 @@ function renderPagination(currentPage, items = announcements) {
     });
     newPagination.appendChild(homeButton);
 
-    const totalPages = Math.ceil(items.length / itemsPerPage);
+    const itemCount = items === announcements ? Math.max(totalArchived, items.length) : items.length;
+    const totalPages = Math.ceil(itemCount / itemsPerPage);
     const maxVisibleButtons = 3; // Change this to 4 if you want 4 page buttons
     let startPage = Math.max(1, currentPage - Math.floor(maxVisibleButtons / 2));
     let endPage = Math.min(totalPages, startPage + maxVisibleButtons - 1);
@@ -97,7 +154,7 @@ function renderPagination(currentPage, items = announcements) {
         prevButton.className = 'pagination-button prev';
         prevButton.innerHTML = '<i class="bi bi-arrow-left"></i>';
         prevButton.addEventListener('click', () => {
-            renderPage(currentPage - 1, items);
+            goToPage(currentPage - 1, items);
         });
         newPagination.appendChild(prevButton);
     }
@@ -110,7 +167,7 @@ function renderPagination(currentPage, items = announcements) {
         }
         pageButton.textContent = i;
         pageButton.addEventListener('click', () => {
-            renderPage(i, items);
+            goToPage(i, items);
         });
         newPagination.appendChild(pageButton);
     }
@@ -120,7 +177,7 @@ function renderPagination(currentPage, items = announcements) {
         nextButton.className = 'pagination-button next';
         nextButton.innerHTML = '<i class="bi bi-arrow-right"></i>';
         nextButton.addEventListener('click', () => {
-            renderPage(currentPage + 1, items);
+            goToPage(currentPage + 1, items);
         });
         newPagination.appendChild(nextButton);
     }
@@ -0,0 +1,73 @@
+"""Comment moderation: leetspeak and masked words match, words inside other words don't"""
+
+import asyncio
+import pytest
+from moderation import DEFAULT_WORDLIST, ModerationEngine, WordMatcher, normalize, read_wordlist
+
+@pytest.fixture(scope="module")
+def matcher() -> WordMatcher:
+    return WordMatcher(["ass", "cunt", "shit", "fuck", "tang ina"])
+
+def test_normalize_keeps_positions():
+    assert normalize("$H1T") == "shit"
+    assert normalize("@$$") == "ass"
+    assert len(normalize("İstanbul")) == len("İstanbul")
+
+@pytest.mark.parametrize("text", [
+    "shit", "SHIT", "sh1t", "5hit", "$hit", "@ss", "4ss", "what the fuck!", "(fuck)", "tang ina mo", "t4ng 1na",
+])
+def test_leetspeak_matches(matcher, text):
+    assert matcher.find(text, first_only=True)
+
+@pytest.mark.parametrize("text", ["f*ck", "sh*t", "c*nt", "F*CK you"])
+def test_masked_words_match(matcher, text):
+    assert matcher.find(text, first_only=True)
+
+@pytest.mark.parametrize("text", [
+    "Scunthorpe", "class", "classic", "assessment", "passing", "bass guitar", "shitake", "fuckery",
+    "tangina", "f**k", "",
+])
+def test_no_match_inside_other_words(matcher, text):
+    assert matcher.find(text) == []
+
+def test_find_returns_every_span(matcher):
+    assert matcher.find("ass and sh1t") == [(0, 3), (8, 12)]
+
+def test_wordlist_adds_and_allows(tmp_path):
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("# comment\nGago\n!ass\nputang ina  # phrase\n", encoding="utf-8")
+
+    assert read_wordlist(str(wordlist)) == ({"gago", "putang ina"}, {"ass"})
+
+def test_engine_combines_lists_and_censors(tmp_path):
+    base = tmp_path / "base.txt"
+    base.write_text("ass\nshit\n", encoding="utf-8")
+    custom = tmp_path / "custom.txt"
+    custom.write_text("gago\n!ass\n", encoding="utf-8")
+    engine = ModerationEngine(wordlists=[str(base), str(custom), str(tmp_path / "missing.txt")])
+
+    assert engine.contains_profanity("ang g4go")
+    assert not engine.contains_profanity("kiss my ass")
+    assert engine.censor("oh sh1t, class") == "oh ****, class"
+
+def test_long_comments_are_checked_in_the_pool(tmp_path):
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("shit\n", encoding="utf-8")
+    engine = ModerationEngine(wordlists=[str(wordlist)], offload_chars=10, use_processes=False)
+    try:
+        assert asyncio.run(engine.check("a long enough comment about sh1t"))
+        assert not asyncio.run(engine.check("a long enough comment about class"))
+    finally:
+        engine.shutdown()
+
+@pytest.mark.skipif(DEFAULT_WORDLIST is None, reason="better_profanity is not installed")
+@pytest.mark.parametrize("text, expected", [
+    ("I grew up in Scunthorpe", False),
+    ("See you in class", False),
+    ("Assessment results are out", False),
+    ("f*ck this", True),
+    ("sh1t happens", True),
+    ("putangina", True),
+])
+def test_default_lists(text, expected):
+    assert ModerationEngine().contains_profanity(text) is expected
@@ -0,0 +1,108 @@
+"""Sliding-window limits and Retry-After on both rate limiter backends"""
+
+import asyncio
+import pytest
+from fastapi import HTTPException
+from metrics import Counter
+from rate_limiter import (MemoryRateLimitBackend, RateLimiter, SQLiteRateLimitBackend, parse_rule,
+                          sliding_window)
+
+# A window boundary for 60 second windows
+START = 6000.0
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteRateLimitBackend(str(tmp_path / "limits.db"))
+    return MemoryRateLimitBackend()
+
+def test_parse_rule():
+    assert parse_rule("5/minute") == (5, 60)
+    assert parse_rule("10/2 hours") == (10, 7200)
+    assert parse_rule("3/second") == (3, 1)
+
+def test_sliding_window_weights_the_previous_window():
+    state = None
+    for offset in range(3):
+        allowed, state, _ = sliding_window(state, 3, 60, START + offset)
+        assert allowed
+    allowed, state, retry_after = sliding_window(state, 3, 60, START + 3)
+    assert not allowed and retry_after == 57
+
+    # The full previous window still overlaps at the start of the next one
+    allowed, _, retry_after = sliding_window(state, 3, 60, START + 60)
+    assert not allowed and retry_after == 60
+    # A third of the way in, two of the three earlier hits still count
+    allowed, state, _ = sliding_window(state, 3, 60, START + 80)
+    assert allowed
+    allowed, _, _ = sliding_window(state, 3, 60, START + 81)
+    assert not allowed
+
+def test_sliding_window_forgets_after_two_windows():
+    _, state, _ = sliding_window(None, 1, 60, START)
+    assert not sliding_window(state, 1, 60, START + 30)[0]
+    assert sliding_window(state, 1, 60, START + 120)[0]
+
+def test_backend_blocks_after_the_limit(backend):
+    results = [backend.hit("login:1.2.3.4", 3, 60, START + offset) for offset in range(5)]
+
+    assert [allowed for allowed, _ in results] == [True, True, True, False, False]
+    assert [retry_after for _, retry_after in results] == [0, 0, 0, 57, 56]
+
+def test_backend_keys_are_independent(backend):
+    for offset in range(3):
+        backend.hit("login:1.2.3.4", 3, 60, START + offset)
+
+    assert backend.hit("login:5.6.7.8", 3, 60, START + 3) == (True, 0)
+    assert backend.hit("signup:1.2.3.4", 3, 60, START + 3) == (True, 0)
+    assert backend.hit("login:1.2.3.4", 3, 60, START + 3)[0] is False
+
+def test_backend_allows_again_as_the_window_slides(backend):
+    for offset in range(3):
+        backend.hit("login:1.2.3.4", 3, 60, START + offset)
+
+    assert backend.hit("login:1.2.3.4", 3, 60, START + 60)[0] is False
+    assert backend.hit("login:1.2.3.4", 3, 60, START + 80)[0] is True
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    first = SQLiteRateLimitBackend(str(tmp_path / "limits.db"))
+    second = SQLiteRateLimitBackend(str(tmp_path / "limits.db"))
+
+    first.hit("login:1.2.3.4", 2, 60, START)
+    second.hit("login:1.2.3.4", 2, 60, START + 1)
+    assert first.hit("login:1.2.3.4", 2, 60, START + 2)[0] is False
+
+def test_memory_backend_evicts_the_least_recently_seen_key():
+    backend = MemoryRateLimitBackend(max_keys=2)
+    for index in range(3):
+        backend.hit(f"login:10.0.0.{index}", 5, 60, START + index)
+
+    assert backend.tracked_keys() == 2
+    assert backend.evicted == 1
+    # The evicted client starts from zero again
+    assert backend.hit("login:10.0.0.0", 1, 60, START + 3) == (True, 0)
+
+def test_sqlite_backend_evicts_idle_keys(tmp_path):
+    backend = SQLiteRateLimitBackend(str(tmp_path / "limits.db"), cleanup_interval=60)
+    backend.hit("login:1.2.3.4", 5, 60, START)
+    assert backend.tracked_keys() == 1
+
+    # The next cleanup, two windows later, drops the idle key before counting
+    backend.hit("login:5.6.7.8", 5, 60, START + 120)
+    assert backend.evicted == 1
+    assert backend.tracked_keys() == 1
+
+def test_limiter_raises_429_with_retry_after(backend):
+    limiter = RateLimiter(backend, key_func=lambda request: "1.2.3.4", hits=Counter("test_hits", "test"))
+
+    async def attempt():
+        await limiter.check("read_login", None, 2, 60, "2/minute")
+
+    asyncio.run(attempt())
+    asyncio.run(attempt())
+    with pytest.raises(HTTPException) as blocked:
+        asyncio.run(attempt())
+
+    assert blocked.value.status_code == 429
+    assert 1 <= int(blocked.value.headers["Retry-After"]) <= 60
+    assert limiter.stats()["routes"] == {"read_login": {"allowed": 2, "blocked": 1}}
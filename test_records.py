@@ -0,0 +1,100 @@
+"""Board records: from_dict / to_dict round trips, key order and extra fields"""
+
+import json
+import os
+from datetime import date
+from records import ANNOUNCEMENTS, FEEDBACK, Announcement, Comment, Feedback, find_announcement
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "data")
+
+def load(name: str):
+    with open(os.path.join(DATA_DIR, name), "r") as file:
+        return json.load(file)
+
+def test_board_files_round_trip_unchanged():
+    # json.dumps keeps key order, so equal strings mean equal data in the same order
+    announcements = load("data.json")
+    assert json.dumps(ANNOUNCEMENTS.dump(ANNOUNCEMENTS.parse(announcements))) == json.dumps(announcements)
+
+    feedback = load("feedback.json")
+    assert json.dumps(FEEDBACK.dump(FEEDBACK.parse(feedback))) == json.dumps(feedback)
+
+def test_announcement_keeps_key_order_and_extra_fields():
+    data = {
+        "title": "Intramurals",
+        "pinned": True,
+        "announcement_id": 7,
+        "likes": {"amount": 1, "accounts": ["a@example.com"]},
+        "date": "March 3, 2025",
+        "sorting_date": "03/03/2025",
+        "link": "https://example.com",
+    }
+    announcement = Announcement.from_dict(data)
+
+    assert announcement.extra == {"pinned": True}
+    assert announcement.sorting_day == date(2025, 3, 3)
+    assert list(announcement.to_dict().items()) == list(data.items())
+
+def test_new_keys_go_last():
+    data = {"announcement_id": 7, "title": "Intramurals", "likes": {"amount": 0, "accounts": []}}
+    announcement = Announcement.from_dict(data)
+    announcement.add_comment(Comment("Ann", "See you there!", "2025-03-01 10:00:00", "ann@example.com"))
+
+    assert list(announcement.to_dict()) == ["announcement_id", "title", "likes", "comments"]
+
+def test_new_announcement_uses_the_canonical_order():
+    announcement = Announcement.from_dict({"sorting_date": "03/03/2025", "announcement_id": 7, "title": "T",
+                                           "date": "D", "description": "Body", "image_attachment": "/a.png"})
+    announcement.key_order = None
+
+    assert list(announcement.to_dict()) == ["date", "title", "announcement_id", "sorting_date", "likes",
+                                            "description", "image_attachment"]
+
+def test_partial_announcement_loads_and_writes_back_without_the_missing_fields():
+    announcement = Announcement.from_dict({"announcement_id": 9, "sorting_date": "not a date"})
+
+    assert announcement.title is None and announcement.date is None
+    assert announcement.sorting_day == date.max
+    assert announcement.likes.amount == 0
+    assert announcement.to_dict() == {"announcement_id": 9, "sorting_date": "not a date",
+                                      "likes": {"amount": 0, "accounts": []}}
+
+def test_comment_round_trip():
+    data = {"username": "Ann", "comment": "Hi", "date": "2025-03-01 10:00:00", "email": "ann@example.com"}
+    assert Comment.from_dict(data).to_dict() == data
+    assert Comment.from_dict(data).extra is None
+
+    with_extra = dict(data, edited=True)
+    assert Comment.from_dict(with_extra).to_dict() == with_extra
+
+    partial = {"comment": "legacy", "reply_to": 2}
+    comment = Comment.from_dict(partial)
+    assert comment.username is None and comment.extra == {"reply_to": 2}
+    assert comment.to_dict() == partial
+
+def test_feedback_round_trip():
+    data = {"email": "ann@example.com", "feedback_title": "Dark mode", "feedback_description": "Please",
+            "date": "2025-03-01 10:00:00", "feedback_id": 3, "image_attachment": "/static/images/Feedback/3.png",
+            "read": True, "priority": "low"}
+    feedback = Feedback.from_dict(data)
+
+    assert feedback.extra == {"priority": "low"}
+    assert list(feedback.to_dict().items()) == list(data.items())
+
+    partial = {"feedback_title": "No id"}
+    assert Feedback.from_dict(partial).feedback_id is None
+    assert Feedback.from_dict(partial).to_dict() == partial
+
+def test_likes_toggle():
+    announcement = Announcement.from_dict({"announcement_id": 1, "likes": {"amount": 1, "accounts": ["a@x.com"]}})
+
+    assert announcement.likes.toggle("b@x.com") == 2
+    assert announcement.likes.toggle("a@x.com") == 1
+    assert announcement.to_dict()["likes"] == {"amount": 1, "accounts": ["b@x.com"]}
+
+def test_find_announcement():
+    board = ANNOUNCEMENTS.parse({"important_announcements": [{"announcement_id": 1}],
+                                 "milestones": [{"announcement_id": 2}, {"title": "no id"}]})
+
+    assert find_announcement(board, 2).announcement_id == 2
+    assert find_announcement(board, 3) is None
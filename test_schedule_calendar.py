@@ -0,0 +1,115 @@
+"""Opening hours: is_open and next_transition across exceptions, midnight and horizon edges"""
+
+from datetime import date, datetime, time
+import pytest
+import pytz
+from schedule_calendar import ScheduleCalendar, parse_dates, parse_days, parse_windows
+
+# No daylight saving time, so every local day is 24 hours long
+MANILA = pytz.timezone("Asia/Manila")
+
+def at(year, month, day, hour=0, minute=0, second=0) -> datetime:
+    return MANILA.localize(datetime(year, month, day, hour, minute, second))
+
+@pytest.fixture
+def office_hours() -> ScheduleCalendar:
+    # 2025-01-06 is a Monday
+    return ScheduleCalendar.from_rules(
+        MANILA,
+        "mon-fri 07:00-12:00,13:00-19:00; sat 08:00-12:00",
+        "2025-01-08 closed; 2025-01-09..2025-01-10 06:00-22:00"
+    )
+
+def test_parsing():
+    assert parse_windows("07:30-12:00,13:00-24:00") == [(450, 720), (780, 1440)]
+    assert parse_windows("closed") == []
+    assert parse_days("fri-mon") == [4, 5, 6, 0]
+    assert parse_days("weekends") == [5, 6]
+    assert parse_dates("2025-02-27..2025-03-02") == [date(2025, 2, 27), date(2025, 2, 28),
+                                                     date(2025, 3, 1), date(2025, 3, 2)]
+
+def test_windows_open_at_their_start_and_close_at_their_end(office_hours):
+    assert not office_hours.is_open(at(2025, 1, 6, 6, 59, 59))
+    assert office_hours.is_open(at(2025, 1, 6, 7))
+    assert office_hours.is_open(at(2025, 1, 6, 11, 59, 59))
+    assert not office_hours.is_open(at(2025, 1, 6, 12))
+    assert office_hours.is_open(at(2025, 1, 6, 13))
+    assert not office_hours.is_open(at(2025, 1, 6, 19))
+    assert not office_hours.is_open(at(2025, 1, 12, 10))  # Sunday
+
+def test_next_transition_within_a_day(office_hours):
+    assert office_hours.next_transition(at(2025, 1, 6, 6)) == at(2025, 1, 6, 7)
+    assert office_hours.next_transition(at(2025, 1, 6, 7)) == at(2025, 1, 6, 12)
+    assert office_hours.next_transition(at(2025, 1, 6, 12)) == at(2025, 1, 6, 13)
+    assert office_hours.next_transition(at(2025, 1, 6, 15)) == at(2025, 1, 6, 19)
+
+def test_exceptions_replace_the_weekly_rule(office_hours):
+    # Wednesday is closed all day, so Tuesday evening waits until Thursday's longer hours
+    assert not office_hours.is_open(at(2025, 1, 8, 10))
+    assert office_hours.next_transition(at(2025, 1, 7, 19)) == at(2025, 1, 9, 6)
+    assert office_hours.is_open(at(2025, 1, 9, 12, 30))
+    assert office_hours.next_transition(at(2025, 1, 10, 12)) == at(2025, 1, 10, 22)
+    # Back to the weekly rule on Saturday
+    assert office_hours.next_transition(at(2025, 1, 10, 22)) == at(2025, 1, 11, 8)
+
+def test_weekend_gap(office_hours):
+    assert office_hours.next_transition(at(2025, 1, 11, 12)) == at(2025, 1, 13, 7)
+
+def test_queries_in_another_timezone(office_hours):
+    # 23:30 UTC on Monday is 07:30 on Tuesday in Manila
+    moment = pytz.utc.localize(datetime(2025, 1, 6, 23, 30))
+    assert office_hours.is_open(moment)
+    assert office_hours.next_transition(moment) == at(2025, 1, 7, 12)
+
+def test_overnight_window_runs_into_the_next_day():
+    calendar = ScheduleCalendar.from_rules(MANILA, "fri 22:00-02:00")
+
+    assert calendar.is_open(at(2025, 1, 10, 23))
+    assert calendar.is_open(at(2025, 1, 11, 1, 59))
+    assert not calendar.is_open(at(2025, 1, 11, 2))
+    assert calendar.next_transition(at(2025, 1, 10, 23)) == at(2025, 1, 11, 2)
+
+def test_adjacent_windows_merge_across_midnight():
+    calendar = ScheduleCalendar.from_rules(MANILA, "mon 18:00-24:00; tue 00:00-06:00")
+
+    assert calendar.is_open(at(2025, 1, 7, 0))
+    assert calendar.next_transition(at(2025, 1, 6, 20)) == at(2025, 1, 7, 6)
+
+def test_always_open_has_no_transition():
+    calendar = ScheduleCalendar.from_rules(MANILA, "daily 00:00-24:00")
+
+    assert calendar.is_open(at(2025, 1, 6, 3))
+    assert calendar.next_transition(at(2025, 1, 6, 3), max_days=30) is None
+
+def test_transition_beyond_the_compiled_horizon():
+    calendar = ScheduleCalendar.from_rules(MANILA, "sun 10:00-11:00", "2025-01-12..2025-01-26 closed",
+                                           horizon_days=7)
+
+    assert calendar.next_transition(at(2025, 1, 6)) == at(2025, 2, 2, 10)
+    # A query far from the last compilation recompiles around it
+    assert calendar.is_open(at(2025, 3, 2, 10, 30))
+    assert not calendar.is_open(at(2025, 1, 19, 10, 30))
+
+def test_horizon_is_never_shorter_than_the_minimum():
+    calendar = ScheduleCalendar.from_rules(MANILA, "daily 07:00-19:00", horizon_days=1)
+
+    assert calendar.next_transition(at(2025, 1, 6, 20)) == at(2025, 1, 7, 7)
+
+def test_from_hours():
+    classic = ScheduleCalendar.from_hours(MANILA, time(7), time(19), weekdays_only=True)
+    assert classic.is_open(at(2025, 1, 6, 7))
+    assert not classic.is_open(at(2025, 1, 11, 10))
+
+    overnight = ScheduleCalendar.from_hours(MANILA, time(22), time(6))
+    assert overnight.is_open(at(2025, 1, 6, 5))
+    assert overnight.is_open(at(2025, 1, 6, 23))
+    assert not overnight.is_open(at(2025, 1, 6, 12))
+
+    # Equal hours mean closed
+    closed = ScheduleCalendar.from_hours(MANILA, time(7), time(7))
+    assert not closed.is_open(at(2025, 1, 6, 7))
+    assert closed.next_transition(at(2025, 1, 6), max_days=30) is None
+
+def test_open_seconds(office_hours):
+    # Monday: 5 + 6 hours
+    assert office_hours.open_seconds(at(2025, 1, 6), 1) == 11 * 3600
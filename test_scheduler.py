@@ -27,7 +27,7 @@ def test_scheduler():
     
     print("=== Schedule Configuration ===")
     print(f"Timezone: {schedule_info['timezone']}")
-    print(f"Operating Hours: {schedule_info['start_time']} - {schedule_info['end_time']}")
+    print(f"Operating Hours: {schedule_info['hours']}")
     print(f"Schedule Type: {schedule_info['schedule_type']}")
     print(f"Daily Hours: {schedule_info['daily_hours']}")
     print(f"Monthly Hours: {schedule_info['monthly_hours']}")
@@ -47,6 +47,8 @@ def test_scheduler():
     print(f"RUNTIME_START_HOUR: {os.environ.get('RUNTIME_START_HOUR', 'Not set (using default)')}")
     print(f"RUNTIME_END_HOUR: {os.environ.get('RUNTIME_END_HOUR', 'Not set (using default)')}")
     print(f"RUNTIME_WEEKDAYS_ONLY: {os.environ.get('RUNTIME_WEEKDAYS_ONLY', 'Not set (using default)')}")
+    print(f"RUNTIME_SCHEDULE: {os.environ.get('RUNTIME_SCHEDULE', 'Not set (using hours above)')}")
+    print(f"RUNTIME_EXCEPTIONS: {os.environ.get('RUNTIME_EXCEPTIONS', 'Not set')}")
 
 if __name__ == "__main__":
     test_scheduler()
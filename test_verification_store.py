@@ -0,0 +1,94 @@
+"""Verification codes: TTL, expiry and purpose namespacing on both backends"""
+
+import pytest
+import verification_store
+from verification_store import MemoryVerificationBackend, SQLiteVerificationBackend, VerificationStore
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(verification_store, "time", fake)
+    return fake
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, clock, monkeypatch):
+    if request.param == "sqlite":
+        backend = SQLiteVerificationBackend(str(tmp_path / "codes.db"), max_entries=3)
+    else:
+        backend = MemoryVerificationBackend(max_entries=3)
+    store = VerificationStore(backend, ttl_seconds=600)
+    # The tests expire entries by moving the clock, not through the sweeper thread
+    monkeypatch.setattr(store, "_ensure_sweeper", lambda: None)
+    return store
+
+def test_verify_returns_payload_for_the_right_code(store):
+    store.put("signup", "Ann@Example.com", "123456", payload={"fullName": "Ann"})
+
+    assert store.verify("signup", "ann@example.com", "000000") is None
+    assert store.verify("signup", "ann@example.com", "") is None
+    assert store.verify("signup", " ANN@example.com ", "123456") == {"fullName": "Ann"}
+
+def test_entries_expire_after_the_ttl(store, clock):
+    store.put("signup", "ann@example.com", "123456")
+
+    clock.now += 599
+    assert store.get("signup", "ann@example.com") == {"code": "123456", "payload": {}}
+    clock.now += 1
+    assert store.get("signup", "ann@example.com") is None
+    assert store.verify("signup", "ann@example.com", "123456") is None
+    assert not store.update_payload("signup", "ann@example.com", {"verified": True})
+
+def test_per_entry_ttl_and_purge(store, clock):
+    store.put("reset", "short@example.com", "1", ttl_seconds=30)
+    store.put("reset", "long@example.com", "2")
+
+    clock.now += 30
+    assert store.purge_expired() == 1
+    assert len(store.backend) == 1
+    assert store.get("reset", "long@example.com")["code"] == "2"
+
+def test_purposes_do_not_see_each_other(store):
+    store.put("signup", "ann@example.com", "111111", payload={"fullName": "Ann"})
+    store.put("reset", "ann@example.com", "222222")
+
+    assert store.verify("signup", "ann@example.com", "222222") is None
+    assert store.verify("reset", "ann@example.com", "111111") is None
+
+    store.discard("reset", "ann@example.com")
+    assert store.get("reset", "ann@example.com") is None
+    assert store.verify("signup", "ann@example.com", "111111") == {"fullName": "Ann"}
+
+def test_confirm_updates_the_payload_without_extending_the_ttl(store, clock):
+    store.put("reset", "ann@example.com", "123456")
+    clock.now += 300
+
+    assert not store.confirm("reset", "ann@example.com", "654321", {"verified": True})
+    assert store.get("reset", "ann@example.com")["payload"] == {}
+    assert store.confirm("reset", "ann@example.com", "123456", {"verified": True})
+    assert store.get("reset", "ann@example.com") == {"code": "123456", "payload": {"verified": True}}
+
+    clock.now += 300
+    assert store.get("reset", "ann@example.com") is None
+
+def test_putting_again_replaces_the_code(store):
+    store.put("signup", "ann@example.com", "111111")
+    store.put("signup", "ann@example.com", "222222")
+
+    assert store.verify("signup", "ann@example.com", "111111") is None
+    assert store.verify("signup", "ann@example.com", "222222") == {}
+
+def test_over_capacity_drops_the_entry_closest_to_expiring(store, clock):
+    for index in range(4):
+        store.put("signup", f"user{index}@example.com", str(index))
+        clock.now += 1
+
+    assert len(store.backend) == 3
+    assert store.get("signup", "user0@example.com") is None
+    assert store.get("signup", "user3@example.com")["code"] == "3"
@@ -0,0 +1,254 @@
+import heapq
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from shared_state import is_multi_worker
+
+logger = logging.getLogger(__name__)
+
+class MemoryVerificationBackend:
+    """In-process backend: a dict of entries plus a heap ordered by expiry time"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[Dict, float]] = {}
+        self._expiry_heap = []  # (expires_at, key); stale items are skipped lazily
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Dict, float]]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key: str, value: Dict, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            # Over capacity: drop whatever is closest to expiring anyway
+            while len(self._entries) > self.max_entries:
+                self._pop_next()
+
+    def update_payload(self, key: str, payload: Dict, now: float) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or entry[1] <= now:
+                return False
+            value, expires_at = entry
+            # Same expiry time, so the entry's heap item still matches it
+            self._entries[key] = ({"code": value["code"], "payload": payload}, expires_at)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge_expired(self, now: float) -> int:
+        removed = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                if self._pop_next():
+                    removed += 1
+        return removed
+
+    def next_expiry(self) -> Optional[float]:
+        with self._lock:
+            return self._expiry_heap[0][0] if self._expiry_heap else None
+
+    def _pop_next(self) -> bool:
+        """Remove the heap head; returns True if it was a live entry"""
+        expires_at, key = heapq.heappop(self._expiry_heap)
+        entry = self._entries.get(key)
+        if entry and entry[1] == expires_at:
+            del self._entries[key]
+            return True
+        return False
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteVerificationBackend:
+    """File backend shared by every worker process on the host"""
+
+    def __init__(self, db_path: str, max_entries: int):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS verification_codes ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_verification_expires ON verification_codes (expires_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection that commits on success and always closes"""
+        connection = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key: str) -> Optional[Tuple[Dict, float]]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value, expires_at FROM verification_codes WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Dict, expires_at: float):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO verification_codes (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            connection.execute(
+                "DELETE FROM verification_codes WHERE key IN ("
+                "SELECT key FROM verification_codes ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def update_payload(self, key: str, payload: Dict, now: float) -> bool:
+        # One statement, so a concurrent put() or expiry can't be overwritten
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE verification_codes SET value = json_set(value, '$.payload', json(?)) "
+                "WHERE key = ? AND expires_at > ?",
+                (json.dumps(payload), key, now)
+            ).rowcount == 1
+
+    def delete(self, key: str):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM verification_codes WHERE key = ?", (key,))
+
+    def purge_expired(self, now: float) -> int:
+        with self._connect() as connection:
+            return connection.execute(
+                "DELETE FROM verification_codes WHERE expires_at <= ?", (now,)
+            ).rowcount
+
+    def next_expiry(self) -> Optional[float]:
+        with self._connect() as connection:
+            row = connection.execute("SELECT MIN(expires_at) FROM verification_codes").fetchone()
+        return row[0] if row else None
+
+    def __len__(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM verification_codes").fetchone()[0]
+
+class VerificationStore:
+    """
+    Short-lived verification codes for signup and password reset.
+
+    Entries are namespaced by purpose so the two flows never see each other's data,
+    expire after a TTL, and are capped in number. A background sweeper removes
+    expired entries as they come due.
+
+    Calls may wait on the SQLite file, so async code runs them with asyncio.to_thread.
+    """
+
+    def __init__(self, backend, ttl_seconds: int = 600, sweep_interval: float = 60.0):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._sweeper = None
+        self._sweeper_lock = threading.Lock()
+
+    def _key(self, purpose: str, email: str) -> str:
+        return f"{purpose}:{email.strip().lower()}"
+
+    def put(self, purpose: str, email: str, code: str, payload: Dict = None, ttl_seconds: int = None):
+        """Store a code (and optional payload) for an email, replacing any previous one"""
+        self._ensure_sweeper()
+        expires_at = time.time() + (ttl_seconds or self.ttl_seconds)
+        self.backend.set(self._key(purpose, email), {"code": code, "payload": payload or {}}, expires_at)
+
+    def get(self, purpose: str, email: str) -> Optional[Dict]:
+        """Return the live entry ({"code", "payload"}) for an email, or None"""
+        entry = self.backend.get(self._key(purpose, email))
+        if not entry:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            self.backend.delete(self._key(purpose, email))
+            return None
+        return value
+
+    def verify(self, purpose: str, email: str, code: str) -> Optional[Dict]:
+        """Return the stored payload if the code matches, otherwise None"""
+        value = self.get(purpose, email)
+        if not value or not code:
+            return None
+        if not hmac.compare_digest(str(value["code"]), str(code)):
+            return None
+        return value["payload"]
+
+    def update_payload(self, purpose: str, email: str, payload: Dict) -> bool:
+        """Replace the payload of a live entry without extending its lifetime"""
+        return self.backend.update_payload(self._key(purpose, email), payload, time.time())
+
+    def confirm(self, purpose: str, email: str, code: str, payload: Dict) -> bool:
+        """Replace the payload if the code matches (verify and update_payload in one call)"""
+        if self.verify(purpose, email, code) is None:
+            return False
+        return self.update_payload(purpose, email, payload)
+
+    def discard(self, purpose: str, email: str):
+        self.backend.delete(self._key(purpose, email))
+
+    def purge_expired(self) -> int:
+        return self.backend.purge_expired(time.time())
+
+    def _ensure_sweeper(self):
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        with self._sweeper_lock:
+            if self._sweeper and self._sweeper.is_alive():
+                return
+            self._sweeper = threading.Thread(target=self._sweep_forever, name="verification-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            try:
+                self.purge_expired()
+                next_expiry = self.backend.next_expiry()
+            except Exception as e:
+                logger.error("Error sweeping verification codes: %s", e)
+                next_expiry = None
+
+            # Wake up when the next entry expires, but never sleep longer than the interval
+            delay = self.sweep_interval
+            if next_expiry is not None:
+                delay = min(delay, max(next_expiry - time.time(), 0.5))
+            time.sleep(delay)
+
+def create_verification_store() -> VerificationStore:
+    """Build the store from environment settings"""
+    # Separate worker processes can only see each other's codes through the SQLite file
+    default_backend = "sqlite" if is_multi_worker() else "memory"
+    backend_name = os.environ.get("VERIFICATION_BACKEND", default_backend).lower()
+    max_entries = int(os.environ.get("VERIFICATION_MAX_ENTRIES", "10000"))
+    ttl_seconds = int(os.environ.get("VERIFICATION_CODE_TTL_SECONDS", "600"))
+
+    if backend_name == "sqlite":
+        db_path = os.environ.get("VERIFICATION_DB_PATH", os.path.join("runtime_data", "verification_codes.db"))
+        backend = SQLiteVerificationBackend(db_path, max_entries)
+    else:
+        backend = MemoryVerificationBackend(max_entries)
+
+    return VerificationStore(backend, ttl_seconds=ttl_seconds)
+
+# Global instance for easy access
+verification_store = create_verification_store()